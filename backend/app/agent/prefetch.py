@@ -0,0 +1,133 @@
+import re
+import time
+import asyncio
+import threading
+from typing import Callable, List, Optional
+
+# CJK characters count as one token each, other scripts split on word boundaries
+TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]|[^\W\u4e00-\u9fff]+")
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "to", "for", "and", "or",
+    "what", "which", "who", "how", "why", "when", "where", "do", "does", "did", "can", "could",
+    "about", "with", "my", "me", "i", "you", "please", "tell", "find", "search", "any",
+    "的", "了", "是", "吗", "呢", "什", "么", "请", "我",
+}
+
+
+def _tokens(text: str) -> set:
+    tokens = {t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS}
+    return tokens or set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def query_similarity(a: str, b: str) -> float:
+    """
+    Jaccard similarity of content tokens. A narrower or broader query scores below
+    1.0, so a one-word search isn't served results retrieved for a whole message.
+    """
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+class PrefetchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"started": 0, "hits": 0, "misses": 0, "unused": 0}
+        self.saved_ms_total = 0.0
+        self.wasted_ms_total = 0.0
+        # End-to-end turn latency by outcome, to compare prefetch hits against everything else
+        self.turn_ms = {"hit": [0, 0.0], "other": [0, 0.0]}
+
+    def record(self, outcome: str, saved_ms: float = 0.0, wasted_ms: float = 0.0):
+        with self._lock:
+            self.counts[outcome] += 1
+            self.saved_ms_total += saved_ms
+            self.wasted_ms_total += wasted_ms
+
+    def record_turn(self, hit: bool, elapsed_ms: float):
+        with self._lock:
+            bucket = self.turn_ms["hit" if hit else "other"]
+            bucket[0] += 1
+            bucket[1] += elapsed_ms
+
+    def info(self) -> dict:
+        with self._lock:
+            decided = self.counts["hits"] + self.counts["misses"] + self.counts["unused"]
+            return {
+                **self.counts,
+                "hit_rate": round(self.counts["hits"] / decided, 3) if decided else 0.0,
+                "saved_ms_total": round(self.saved_ms_total, 1),
+                "avg_saved_ms_per_hit": round(self.saved_ms_total / self.counts["hits"], 1) if self.counts["hits"] else 0.0,
+                "wasted_ms_total": round(self.wasted_ms_total, 1),
+                "avg_turn_ms_on_hit": round(self.turn_ms["hit"][1] / self.turn_ms["hit"][0], 1) if self.turn_ms["hit"][0] else None,
+                "avg_turn_ms_otherwise": round(self.turn_ms["other"][1] / self.turn_ms["other"][0], 1) if self.turn_ms["other"][0] else None,
+            }
+
+
+prefetch_stats = PrefetchStats()
+
+
+class RetrievalPrefetch:
+    """
+    Runs document retrieval for the raw user message while the first LLM call is in flight.
+
+    If the model then asks for search_documents with a similar query and the same
+    document scope, claim() hands back the prefetched result instead of searching again.
+    """
+
+    def __init__(self, search: Callable[[str, Optional[List[str]]], str], query: str,
+                 selected_doc_ids: Optional[List[str]], threshold: float):
+        self.query = query
+        self.selected_doc_ids = selected_doc_ids
+        self.threshold = threshold
+        self.claimed = False
+        self.hit = False
+        self.saved_ms = 0.0
+        self._duration_ms: Optional[float] = None
+        self._started = time.perf_counter()
+        self._task = asyncio.get_running_loop().create_task(asyncio.to_thread(self._run, search))
+        prefetch_stats.record("started")
+
+    def _run(self, search) -> str:
+        try:
+            return search(self.query, self.selected_doc_ids)
+        finally:
+            self._duration_ms = (time.perf_counter() - self._started) * 1000
+
+    async def claim(self, query: str, selected_doc_ids: Optional[List[str]] = None) -> Optional[str]:
+        """Prefetched result if it answers this search, else None (caller searches normally)."""
+        if self.claimed:
+            return None
+        self.claimed = True
+
+        same_scope = sorted(selected_doc_ids or self.selected_doc_ids or []) == sorted(self.selected_doc_ids or [])
+        if not same_scope or query_similarity(query, self.query) < self.threshold:
+            prefetch_stats.record("misses", wasted_ms=self._duration_ms or 0.0)
+            return None
+
+        waited_from = time.perf_counter()
+        try:
+            result = await self._task
+        except Exception as e:
+            print(f"Prefetched retrieval failed: {e}")
+            prefetch_stats.record("misses")
+            return None
+        waited_ms = (time.perf_counter() - waited_from) * 1000
+
+        # Without the prefetch the search would have started now and taken its full duration
+        self.hit = True
+        self.saved_ms = max((self._duration_ms or 0.0) - waited_ms, 0.0)
+        prefetch_stats.record("hits", saved_ms=self.saved_ms)
+        return result
+
+    def finish(self):
+        """Call once the turn is over; a prefetch nobody asked for counts as unused."""
+        if not self.claimed:
+            self.claimed = True
+            self._task.add_done_callback(self._record_unused)
+
+    def _record_unused(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            print(f"Prefetched retrieval failed: {task.exception()}")
+        prefetch_stats.record("unused", wasted_ms=self._duration_ms or 0.0)
@@ -0,0 +1,96 @@
+import threading
+from typing import Dict, List, Optional
+
+from backend.app.core.config import AppSettings
+
+TOOL_ROUTE = "tool"
+ANSWER_ROUTE = "answer"
+
+
+class RouteStats:
+    """Latency per route plus escalation counts by reason."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._latencies: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self.escalations: Dict[str, int] = {}
+
+    def record(self, route: str, model: str, elapsed_ms: float):
+        key = f"{route}:{model}"
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            samples = self._latencies.setdefault(key, [])
+            samples.append(elapsed_ms)
+            if len(samples) > self._window:
+                del samples[0]
+
+    def record_escalation(self, reason: str):
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+
+    def info(self) -> dict:
+        with self._lock:
+            routes = {}
+            for key, samples in self._latencies.items():
+                ordered = sorted(samples)
+                routes[key] = {
+                    "calls": self._counts[key],
+                    "avg_ms": round(sum(ordered) / len(ordered), 1),
+                    "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 1),
+                }
+            return {"routes": routes, "escalations": dict(self.escalations)}
+
+
+route_stats = RouteStats()
+
+
+class ModelRouter:
+    """
+    Picks the model for each step of one agent turn.
+
+    Tool-selection steps go to routing_tool_model. When that model stops calling
+    tools, its draft is discarded and the main model writes the final answer.
+    The turn escalates to the main model for good when:
+      - the fast model errors or asks for a tool that doesn't exist
+      - routing_max_fast_turns fast steps have been used
+      - the prompt grows past routing_escalate_prompt_tokens
+    """
+
+    def __init__(self, settings: AppSettings, main_model: str):
+        self.main_model = main_model
+        self.fast_model = settings.routing_tool_model if settings.routing_enabled else None
+        if self.fast_model == main_model:
+            self.fast_model = None
+        self.max_fast_turns = settings.routing_max_fast_turns
+        self.escalate_prompt_tokens = settings.routing_escalate_prompt_tokens
+        self.fast_turns = 0
+        self.escalated: Optional[str] = None
+        self.answering = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.fast_model is not None
+
+    def next_route(self, prompt_tokens: int) -> tuple:
+        """(route, model) for the next step."""
+        if not self.enabled or self.escalated or self.answering:
+            return ANSWER_ROUTE, self.main_model
+        if self.fast_turns >= self.max_fast_turns:
+            self.escalate("max_fast_turns")
+            return ANSWER_ROUTE, self.main_model
+        if prompt_tokens > self.escalate_prompt_tokens:
+            self.escalate("prompt_too_long")
+            return ANSWER_ROUTE, self.main_model
+        self.fast_turns += 1
+        return TOOL_ROUTE, self.fast_model
+
+    def start_answer(self):
+        """The fast model stopped calling tools: the main model takes over from here."""
+        self.answering = True
+
+    def escalate(self, reason: str):
+        if not self.escalated:
+            self.escalated = reason
+            route_stats.record_escalation(reason)
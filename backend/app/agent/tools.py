@@ -1,9 +1,9 @@
 from typing import List, Optional
 from langchain_core.tools import tool
 from backend.app.api.deps import get_services
-from backend.app.models import GlobalMemory
-from backend.app.core.database import SessionLocal
-from datetime import datetime, timezone
+from backend.app.chat.memory import get_memory_store
+
+MEMORY_LIST_LIMIT = 50  # newest facts listed by read_global_memory without a query
 
 @tool
 def search_documents(query: str, selected_doc_ids: Optional[List[str]] = None) -> str:
@@ -45,36 +45,32 @@ def search_chat_history(query: str, chat_id: Optional[str] = None) -> str:
     return "\n\n".join([f"Role: {doc.metadata.get('role')}\nContent: {doc.page_content}\nDate: {doc.metadata.get('timestamp')}" for doc in docs])
 
 @tool
-def read_global_memory() -> str:
-    """Read the user's global memory/preferences."""
-    db = SessionLocal()
+def read_global_memory(query: Optional[str] = None) -> str:
+    """Read what is remembered about the user. Pass a query to get only the related facts."""
+    store = get_memory_store()
     try:
-        memory = db.query(GlobalMemory).first()
-        return memory.content if memory else "No global memory set."
-    finally:
-        db.close()
+        if query:
+            facts = store.relevant(query)
+        else:
+            facts = [f.content for f in store.facts()]
+    except Exception as e:
+        return f"Failed to read memory: {str(e)}"
+    if not facts:
+        return "No global memory set."
+    if len(facts) > MEMORY_LIST_LIMIT:
+        omitted = len(facts) - MEMORY_LIST_LIMIT
+        return store.render(facts[-MEMORY_LIST_LIMIT:]) + f"\n({omitted} older facts not shown, pass a query to search them)"
+    return store.render(facts)
 
 @tool
 def update_global_memory(content: str) -> str:
-    """Append new information to the global memory."""
-    db = SessionLocal()
+    """Remember one fact about the user. A fact that restates an existing one replaces it."""
     try:
-        memory = db.query(GlobalMemory).first()
-        if not memory:
-            memory = GlobalMemory(content=content)
-            db.add(memory)
-        else:
-            # Append with timestamp
-            timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-            if memory.content:
-                memory.content += f"\n[{timestamp}] {content}"
-            else:
-                memory.content = f"[{timestamp}] {content}"
-            memory.updated_at = datetime.now(timezone.utc)
-        
-        db.commit()
-        return "Global memory updated successfully."
+        _, action = get_memory_store().add(content)
     except Exception as e:
         return f"Failed to update memory: {str(e)}"
-    finally:
-        db.close()
+    if action == "duplicate":
+        return "Already remembered."
+    if action == "merged":
+        return "Global memory updated (merged with an existing fact)."
+    return "Global memory updated successfully."
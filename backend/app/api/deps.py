@@ -1,44 +1,238 @@
-from typing import Optional, Dict
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from backend.app.rag.store import VectorStore
 from backend.app.chat.llm import LLMService
+from backend.app.core.singleflight import get_group
+from backend.app.core.config import on_config_change
+
+LLM_COMPONENT = "llm"
+
+
+class ServiceGeneration:
+    """
+    The services built for one configuration: vector stores per collection and the
+    LLM client. Each component is built once; concurrent first users of a component
+    share a single build. Handles pin a generation, so it lives on after a swap
+    until the requests using it are done.
+    """
+
+    def __init__(self, number: int):
+        self.number = number
+        self.components: Dict[str, Any] = {}
+        self.init_errors: Dict[str, str] = {}  # component -> last initialization error
+        self.refs = 0
+        self.retired = False
+
+    def get(self, component: str, factory: Callable[[], Any]) -> Optional[Any]:
+        value = self.components.get(component)
+        if value is not None:
+            return value
+        try:
+            return get_group("service_init").do((self.number, component), self._build, component, factory)
+        except Exception as e:
+            print(f"Failed to init {component}: {e}")
+            return None
+
+    def _build(self, component: str, factory: Callable[[], Any]) -> Any:
+        # A caller that lost the race to the previous build finds the result here
+        if component in self.components:
+            return self.components[component]
+        try:
+            value = factory()
+        except Exception as e:
+            self.init_errors[component] = str(e)
+            raise
+        self.components[component] = value
+        self.init_errors.pop(component, None)
+        return value
+
+
+class ServiceRegistry:
+    """Hands out handles on the current generation and swaps generations atomically."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reload_lock = threading.Lock()  # one reload at a time, each builds on the last
+        self._current = ServiceGeneration(1)
+        self._draining: List[ServiceGeneration] = []
+        self.stats = {"swaps": 0, "drained": 0}
+
+    def acquire(self) -> "ServiceContainer":
+        with self._lock:
+            generation = self._current
+            generation.refs += 1
+        return ServiceContainer(self, generation)
+
+    def release(self, generation: ServiceGeneration):
+        with self._lock:
+            generation.refs -= 1
+            if generation.retired and generation.refs == 0 and generation in self._draining:
+                self._draining.remove(generation)
+                self.stats["drained"] += 1
+                print(f"Services generation {generation.number} drained")
+
+    def swap(self, generation: Optional[ServiceGeneration] = None) -> ServiceGeneration:
+        """
+        Make a new generation current. Requests holding the old one keep using it;
+        it is dropped once the last handle is released.
+        """
+        with self._lock:
+            old = self._current
+            self._current = generation or ServiceGeneration(old.number + 1)
+            old.retired = True
+            if old.refs:
+                self._draining.append(old)
+            else:
+                self.stats["drained"] += 1
+            self.stats["swaps"] += 1
+            return self._current
+
+    @property
+    def current(self) -> ServiceGeneration:
+        return self._current
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "generation": self._current.number,
+                "components": sorted(self._current.components),
+                "active_handles": self._current.refs,
+                "draining": [{"generation": g.number, "handles": g.refs} for g in self._draining],
+                "init_errors": dict(self._current.init_errors),
+            }
+
 
 class ServiceContainer:
-    _vector_stores: Dict[str, VectorStore] = {}
-    llm_service: Optional[LLMService] = None
+    """
+    A handle on one service generation, held for as long as a request (or a
+    get_services() expression) uses it. The reference is released when the handle
+    is released or garbage collected.
+    """
+
+    def __init__(self, registry: ServiceRegistry, generation: ServiceGeneration):
+        self.generation = generation
+        self._finalizer = weakref.finalize(self, registry.release, generation)
+
+    def release(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
 
     def get_vector_store(self, collection_name: str = "documents") -> Optional[VectorStore]:
-        if collection_name not in self._vector_stores:
-            try:
-                self._vector_stores[collection_name] = VectorStore(collection_name=collection_name)
-                print(f"VectorStore '{collection_name}' initialized")
-            except Exception as e:
-                print(f"Failed to init VectorStore '{collection_name}': {e}")
-                return None
-        return self._vector_stores[collection_name]
+        return self.generation.get(f"collection:{collection_name}", lambda: _build_vector_store(collection_name))
+
+    def get_llm_service(self) -> Optional[LLMService]:
+        return self.generation.get(LLM_COMPONENT, _build_llm_service)
 
     @property
     def vector_store(self) -> Optional[VectorStore]:
         return self.get_vector_store("documents")
 
-_services = ServiceContainer()
+    @property
+    def llm_service(self) -> Optional[LLMService]:
+        return self.get_llm_service()
+
+    @property
+    def init_errors(self) -> Dict[str, str]:
+        errors = self.generation.init_errors
+        # Collections are keyed 'collection:<name>' internally
+        return {key.split(":", 1)[-1]: value for key, value in errors.items()}
+
+
+def _build_vector_store(collection_name: str) -> VectorStore:
+    store = VectorStore(collection_name=collection_name)
+    print(f"VectorStore '{collection_name}' initialized")
+    return store
+
+def _build_llm_service() -> LLMService:
+    service = LLMService()
+    print("LLMService initialized")
+    return service
+
+
+_registry = ServiceRegistry()
 
 def get_services() -> ServiceContainer:
-    global _services
+    services = _registry.acquire()
     # Trigger default vector store init for backward compatibility check
-    if not _services.vector_store:
-        pass 
+    if not services.vector_store:
+        pass
 
-    if not _services.llm_service:
-        try:
-            _services.llm_service = LLMService()
-            print("LLMService initialized")
-        except Exception as e:
-            print(f"Failed to init LLMService: {e}")
-        
-    return _services
+    services.get_llm_service()
+    return services
+
+def get_container() -> ServiceContainer:
+    """A handle without get_services()' implicit initialization (warmup builds components itself)."""
+    return _registry.acquire()
+
+def get_registry() -> ServiceRegistry:
+    return _registry
 
 def reset_services():
-    global _services
-    _services._vector_stores = {}
-    _services.llm_service = None
+    _registry.swap()
     print("Services reset")
+
+def _factory(component: str) -> Callable[[], Any]:
+    if component == LLM_COMPONENT:
+        return _build_llm_service
+    collection_name = component.split(":", 1)[1]
+    return lambda: _build_vector_store(collection_name)
+
+def _is_stale(component: str, changed: Iterable[str]) -> bool:
+    # Every vector store carries its own embedding client and vector server connection
+    if component == LLM_COMPONENT:
+        return "llm" in changed
+    return component.startswith("collection:") and bool({"embeddings", "vector_store"} & set(changed))
+
+def reload_services(changed: Iterable[str]) -> dict:
+    """
+    Rebuild only the components whose inputs changed ("llm", "embeddings",
+    "vector_store"; see config.component_inputs). Replacements are built before
+    the swap, so requests never wait on them, and unaffected components carry over
+    to the new generation.
+    """
+    changed = set(changed)
+    return rebuild_components(key for key in _registry.current.components if _is_stale(key, changed))
+
+def rebuild_components(components: Iterable[str]) -> dict:
+    """Rebuild the given components that are built (e.g. 'collection:documents') and swap them in."""
+    components = set(components)
+    started = time.perf_counter()
+    with _registry.reload_lock:
+        current = _registry.current
+        built = dict(current.components)
+        stale = sorted(key for key in built if key in components)
+        if not stale:
+            # Components not built yet will be built from the new settings when first used
+            return {"reloaded": [], "kept": sorted(built), "failed": {}, "seconds": 0.0}
+
+        generation = ServiceGeneration(current.number + 1)
+        generation.components = {key: value for key, value in built.items() if key not in stale}
+        for key in stale:
+            generation.get(key, _factory(key))
+        _registry.swap(generation)
+
+    seconds = round(time.perf_counter() - started, 4)
+    print(f"Services reloaded in {seconds}s: {', '.join(stale)}")
+    return {
+        "reloaded": [key for key in stale if key in generation.components],
+        "kept": sorted(key for key in generation.components if key not in stale),
+        "failed": {key: generation.init_errors[key] for key in stale if key in generation.init_errors},
+        "seconds": seconds,
+    }
+
+def _reload_on_config_change(changes: dict):
+    # Settings saved by another worker: rebuild off the request that noticed the change
+    if changes["components"]:
+        threading.Thread(
+            target=reload_services, args=(changes["components"],), name="services-reload", daemon=True,
+        ).start()
+
+on_config_change(_reload_on_config_change)
@@ -0,0 +1,36 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Any, row_id: str) -> str:
+    """Opaque keyset cursor: the sort key (a timestamp, number or string) and id of the last row on the page."""
+    payload = json.dumps([key.isoformat() if isinstance(key, datetime) else key, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse: Optional[Callable[[Any], Any]] = datetime.fromisoformat) -> Tuple[Any, str]:
+    """Inverse of encode_cursor. `parse` turns the stored key back into its type; timestamps by default."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (parse(key) if key is not None and parse else key), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, key_attr: str) -> list:
+    """
+    Trim a limit+1 query result to the page and, when there is more, put the
+    cursor for the next page in the X-Next-Cursor header.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, key_attr), last.id)
+    return rows
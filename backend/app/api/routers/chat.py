@@ -1,82 +1,99 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, AsyncGenerator
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, AsyncGenerator, Optional
 import json
+import time
 import asyncio
 
-from backend.app.core.database import get_db
-from backend.app.models import Chat as ChatModel, Message as MessageModel, GlobalMemory
+from backend.app.core.database import get_async_db
+from backend.app.models import Chat as ChatModel, Message as MessageModel
 from backend.app.schemas import ChatRequest, MessageCreate
 from backend.app.agent.tools import search_documents, search_chat_history, read_global_memory, update_global_memory
+from backend.app.agent.prefetch import RetrievalPrefetch, prefetch_stats
+from backend.app.agent.routing import ModelRouter, ANSWER_ROUTE, route_stats
 from backend.app.core.config import get_settings
+from backend.app.chat.context import ContextBuilder
+from backend.app.chat.context_cache import ChatContext, get_context_cache, load_chat_context
+from backend.app.chat.memory import get_memory_store
+from backend.app.chat.summarizer import get_summarizer
+from backend.app.chat.indexer import get_indexer
+from backend.app.chat.cache import get_response_cache, make_cache_key
+from backend.app.core.tracing import Trace, get_trace_buffer, set_current_trace
+from backend.app.core.resilience import get_policy, set_deadline
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage, BaseMessage
 from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+def ChatOpenAI(**kwargs):
+    """langchain_openai.ChatOpenAI, imported on the first chat turn (it pulls in openai and tiktoken)."""
+    from langchain_openai import ChatOpenAI as _ChatOpenAI
+    return _ChatOpenAI(**kwargs)
 
 router = APIRouter()
 
 @router.post("/")
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
     settings = get_settings()
+    trace = Trace("chat")
+    
+    recent = settings.context_recent_messages
+    # Other workers write to the same chats, so a per-process copy could be stale
+    context_cache = get_context_cache() if settings.context_cache_enabled and not settings.multi_worker else None
+    memory_store = get_memory_store()
+    # Memory facts relevant to this message are looked up while the chat context loads
+    memory_lookup = asyncio.create_task(asyncio.to_thread(memory_store.relevant, request.message))
     
     # 1. Handle Chat Session
     chat_id = request.chat_id
     if not chat_id:
-        # Create new chat
-        new_chat = ChatModel(title=request.message[:30])
-        db.add(new_chat)
-        db.commit()
-        db.refresh(new_chat)
-        chat_id = new_chat.id
-    else:
-        chat = db.query(ChatModel).filter(ChatModel.id == chat_id).first()
-        if not chat:
-            raise HTTPException(404, "Chat not found")
+        with trace.span("chat_session"):
+            # Create new chat
+            new_chat = ChatModel(title=request.message[:30])
+            db.add(new_chat)
+            await db.commit()
+            chat_id = new_chat.id
+    trace.attrs["chat_id"] = chat_id
             
-    # 2. Build Context
-    # Global Memory
-    memory = db.query(GlobalMemory).first()
-    memory_content = memory.content if memory else ""
-    
-    # Chat Summary
-    chat_obj = db.query(ChatModel).filter(ChatModel.id == chat_id).first()
-    chat_summary = chat_obj.summary if chat_obj else ""
-    
-    # Recent Messages (Last 5 rounds = 10 messages)
-    recent_messages_db = db.query(MessageModel).filter(
-        MessageModel.chat_id == chat_id
-    ).order_by(MessageModel.created_at.desc()).limit(10).all()
-    recent_messages_db.reverse()
-    
-    # 3. Construct LangChain Messages
-    lc_messages: List[BaseMessage] = []
-    
-    system_prompt = f"""You are an intelligent assistant for a personal knowledge base.
-    
-    Global Memory (User Preferences & Facts):
-    {memory_content}
-    
-    Previous Conversation Summary:
-    {chat_summary or 'No summary yet.'}
-    
-    Instructions:
-    - Use the available tools to answer the user's question.
-    - You can search documents, search chat history, or read/update global memory.
-    - Always verify information with tools if you are unsure.
-    - If you update global memory, do it only for important user preferences or facts.
-    """
-    
-    lc_messages.append(SystemMessage(content=system_prompt))
+    # 2. Load Context: hot chats come from the cache, otherwise summary + recent messages in one query
+    with trace.span("context_query") as span:
+        context = context_cache.get(chat_id, recent) if context_cache and request.chat_id else None
+        span.set(cached=context is not None)
+        if context is None:
+            version = context_cache.version(chat_id) if context_cache else None
+            if request.chat_id:
+                context = await load_chat_context(db, chat_id, recent)
+                if context is None:
+                    memory_lookup.cancel()
+                    raise HTTPException(404, "Chat not found")
+            else:
+                context = ChatContext(None, [])
+            if context_cache:
+                context_cache.store(chat_id, context, recent, version)
+
+    with trace.span("memory_lookup") as span:
+        try:
+            memory_facts = await memory_lookup
+        except Exception as e:
+            print(f"Memory lookup failed: {e}")
+            memory_facts = []
+        span.set(facts=len(memory_facts))
     
-    for m in recent_messages_db:
-        if m.role == 'user':
-            lc_messages.append(HumanMessage(content=m.content))
-        elif m.role == 'assistant':
-            lc_messages.append(AIMessage(content=m.content))
-            
-    lc_messages.append(HumanMessage(content=request.message))
+    # 3. Construct LangChain Messages within the token budget
+    with trace.span("context_build") as span:
+        context_builder = ContextBuilder(
+            model=settings.openai_model or "gpt-4o",
+            budget=settings.context_token_budget,
+            tool_output_tokens=settings.tool_output_token_limit,
+        )
+        lc_messages: List[BaseMessage] = context_builder.build(
+            memory=memory_store.render(memory_facts),
+            summary=context.summary or "",
+            history=context.history,
+            user_message=request.message,
+        )
+        span.set(prompt_tokens=context_builder.breakdown["prompt_total"])
     
     # 4. Prepare Tools
     # If selected_doc_ids provided, wrap the search tool
@@ -97,19 +114,122 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         tools.append(search_documents)
 
     # 5. Initialize LLM
-    llm = ChatOpenAI(
-        api_key=settings.openai_api_key,
-        base_url=settings.openai_base_url,
-        model=settings.openai_model or "gpt-4o", # Use a smart model for agent
-        temperature=0,
-        streaming=True
-    )
+    model_name = settings.openai_model or "gpt-4o" # Use a smart model for agent
+    model_router = ModelRouter(settings, model_name)
+    tool_names = {t.name for t in tools}
+    bound_llms: Dict[str, Any] = {}
+
+    def get_llm(model: str):
+        # Built on first use so a turn that never routes to the fast model doesn't create its client
+        if model not in bound_llms:
+            llm = ChatOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                model=model,
+                temperature=0,
+                streaming=True,
+                stream_usage=True,
+                max_retries=0  # retried by the "llm" resilience policy
+            )
+            bound_llms[model] = llm.bind_tools(tools)
+        return bound_llms[model]
+
+    # Optional response cache; identical prompts replay the stored reply
+    response_cache = get_response_cache() if request.use_cache else None
+    tool_specs = [convert_to_openai_tool(t) for t in tools] if response_cache else None
+
+    # Per-turn accounting persisted on the assistant message; calls to the tool-selection
+    # model are also tallied on their own so usage by model isn't all charged to the main one
+    turn_usage = {"prompt_tokens": 0, "completion_tokens": 0, "iterations": 0, "tool_calls": 0}
+    tool_usage = {"prompt_tokens": 0, "completion_tokens": 0, "iterations": 0, "latency_ms": 0.0}
+
+    async def call_llm(messages: List[BaseMessage], iteration: int,
+                       model: str = model_name, route: str = ANSWER_ROUTE) -> BaseMessage:
+        turn_usage["iterations"] += 1
+        if model != model_name:
+            tool_usage["iterations"] += 1
+        with trace.span("llm", iteration=iteration, model=model, route=route) as span:
+            key = make_cache_key(messages, model, tool_specs, temperature=0) if response_cache else None
+            if key:
+                cached = response_cache.get(key)
+                if cached is not None:
+                    span.set(cached=True)
+                    return cached.model_copy()
+
+            # Stream so time-to-first-token can be measured, then assemble the full message
+            async def stream_once():
+                attempt_started = time.perf_counter()
+                ttft_ms, message = None, None
+                async for chunk in get_llm(model).astream(messages):
+                    if message is None:
+                        ttft_ms = round((time.perf_counter() - attempt_started) * 1000, 2)
+                        message = chunk
+                    else:
+                        message = message + chunk
+                return message, ttft_ms
+
+            started = time.perf_counter()
+            response, ttft_ms = await get_policy("llm").call(stream_once)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            span.set(ttft_ms=ttft_ms)
+            route_stats.record(route, model, elapsed_ms)
+
+            usage = getattr(response, "usage_metadata", None) or {}
+            prompt_tokens = usage.get("input_tokens") or context_builder.counter.count_messages(messages)
+            completion_tokens = usage.get("output_tokens") or context_builder.counter.count_message(response)
+            # Cache hits cost nothing upstream, so only real calls are counted
+            turn_usage["prompt_tokens"] += prompt_tokens
+            turn_usage["completion_tokens"] += completion_tokens
+            if model != model_name:
+                tool_usage["prompt_tokens"] += prompt_tokens
+                tool_usage["completion_tokens"] += completion_tokens
+                tool_usage["latency_ms"] += elapsed_ms
+            span.set(cached=False, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            if key:
+                response_cache.set(key, response)
+            return response
+
+    async def agent_step(messages: List[BaseMessage], iteration: int) -> BaseMessage:
+        route, step_model = model_router.next_route(context_builder.counter.count_messages(messages))
+        if route == ANSWER_ROUTE:
+            return await call_llm(messages, iteration, step_model, route)
+
+        try:
+            response = await call_llm(messages, iteration, step_model, route)
+        except Exception as e:
+            print(f"Fast model {step_model} failed, escalating: {e}")
+            model_router.escalate("fast_model_error")
+            return await call_llm(messages, iteration)
+
+        if not response.tool_calls:
+            # Done picking tools: drop the fast model's draft and let the main model answer
+            model_router.start_answer()
+            return await call_llm(messages, iteration)
+        if any(tc["name"] not in tool_names for tc in response.tool_calls):
+            model_router.escalate("unknown_tool")
+            return await call_llm(messages, iteration)
+        return response
+
+    # Speculative retrieval: search for the raw message while the model decides what to do
+    rag_enabled = bool(request.rag_config and request.rag_config.enabled)
+    selected_doc_ids = request.rag_config.selected_doc_ids if request.rag_config else None
     
-    llm_with_tools = llm.bind_tools(tools)
+    def prefetch_search(query: str, doc_ids: Optional[List[str]]) -> str:
+        return search_documents.invoke({"query": query, "selected_doc_ids": doc_ids})
     
     # 6. Generator for SSE
     async def event_generator():
+        turn_started = time.perf_counter()
+        prefetch = None
+        set_current_trace(trace)
+        # Every LLM and embedding call of this turn shares one deadline
+        set_deadline(settings.chat_deadline_seconds)
         try:
+            if rag_enabled and settings.speculative_retrieval:
+                prefetch = RetrievalPrefetch(
+                    prefetch_search, request.message, selected_doc_ids, settings.speculative_retrieval_threshold
+                )
+            
             # Yield chat_id first so frontend knows where we are
             yield f"data: {json.dumps({'type': 'meta', 'chat_id': chat_id})}\n\n"
             
@@ -118,9 +238,9 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
             
             # Agent Loop (Simple ReAct)
             # We'll do max 5 turns to prevent infinite loops
-            for _ in range(5):
+            for iteration in range(5):
                 # Call LLM
-                response_message = await llm_with_tools.ainvoke(current_messages)
+                response_message = await agent_step(current_messages, iteration)
                 current_messages.append(response_message)
                 
                 # Check for tool calls
@@ -131,6 +251,7 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
                         thought_steps_log.append({"type": "thought", "content": response_message.content})
 
                     # Yield tool calls
+                    turn_usage["tool_calls"] += len(response_message.tool_calls)
                     for tool_call in response_message.tool_calls:
                         yield f"data: {json.dumps({'type': 'tool_call', 'name': tool_call['name'], 'args': tool_call['args']})}\n\n"
                         thought_steps_log.append({"type": "tool_call", "name": tool_call['name'], "args": tool_call['args']})
@@ -139,23 +260,31 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
                         tool_name = tool_call['name']
                         tool_args = tool_call['args']
                         
-                        selected_tool = next((t for t in tools if t.name == tool_name), None)
-                        if selected_tool:
-                            try:
-                                # Invoke tool
-                                tool_result = selected_tool.invoke(tool_args)
-                            except Exception as e:
-                                tool_result = f"Error executing tool: {str(e)}"
-                        else:
-                            tool_result = "Tool not found."
+                        with trace.span("tool", tool=tool_name, iteration=iteration) as span:
+                            # Serve a search from the speculative prefetch when it matches
+                            tool_result = None
+                            if prefetch and tool_name == "search_documents":
+                                tool_result = await prefetch.claim(tool_args.get("query", ""), tool_args.get("selected_doc_ids"))
+                                span.set(prefetched=tool_result is not None)
+                            
+                            if tool_result is None:
+                                selected_tool = next((t for t in tools if t.name == tool_name), None)
+                                if selected_tool:
+                                    try:
+                                        # Invoke tool
+                                        tool_result = selected_tool.invoke(tool_args)
+                                    except Exception as e:
+                                        tool_result = f"Error executing tool: {str(e)}"
+                                else:
+                                    tool_result = "Tool not found."
                             
                         yield f"data: {json.dumps({'type': 'tool_output', 'content': str(tool_result)})}\n\n"
                         thought_steps_log.append({"type": "tool_output", "content": str(tool_result)})
                         
-                        # Append tool result to messages
+                        # Append tool result to messages (clipped to the per-result token budget)
                         current_messages.append(ToolMessage(
                             tool_call_id=tool_call['id'],
-                            content=str(tool_result),
+                            content=context_builder.fit_tool_output(str(tool_result)),
                             name=tool_name
                         ))
                 else:
@@ -176,6 +305,12 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
                     yield f"data: {json.dumps({'type': 'answer', 'content': response_message.content})}\n\n"
                     break
             
+            # Report where the prompt tokens went
+            yield f"data: {json.dumps({'type': 'context', 'tokens': context_builder.breakdown})}\n\n"
+            
+            if rag_enabled:
+                prefetch_stats.record_turn(bool(prefetch and prefetch.hit), (time.perf_counter() - turn_started) * 1000)
+            
             # Save to DB
             # User message
             user_msg = MessageModel(chat_id=chat_id, role="user", content=request.message)
@@ -189,16 +324,38 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
                     chat_id=chat_id, 
                     role="assistant", 
                     content=ai_content,
-                    thought_steps=json.dumps(thought_steps_log) if thought_steps_log else None
+                    thought_steps=json.dumps(thought_steps_log) if thought_steps_log else None,
+                    model=model_name,
+                    prompt_tokens=turn_usage["prompt_tokens"],
+                    completion_tokens=turn_usage["completion_tokens"],
+                    agent_iterations=turn_usage["iterations"],
+                    tool_calls=turn_usage["tool_calls"],
+                    latency_ms=round(trace.elapsed_ms(), 2)
                 )
+                if tool_usage["iterations"]:
+                    ai_msg.tool_model = model_router.fast_model
+                    ai_msg.tool_prompt_tokens = tool_usage["prompt_tokens"]
+                    ai_msg.tool_completion_tokens = tool_usage["completion_tokens"]
+                    ai_msg.tool_iterations = tool_usage["iterations"]
+                    ai_msg.tool_latency_ms = round(tool_usage["latency_ms"], 2)
                 db.add(ai_msg)
                 
                 # Update Chat Title if it's new (first 2 messages)
                 # Simple heuristic or use LLM later
                 
-                db.commit()
+                with trace.span("db_commit"):
+                    await db.commit()
+                if context_cache:
+                    context_cache.append(chat_id, [("user", request.message), ("assistant", ai_content)])
                 
-                # TODO: Trigger Background Task for Summarization
+                # Fold older messages into the chat summary off the request path
+                get_summarizer().schedule(chat_id)
+                # Make the turn searchable through search_chat_history
+                get_indexer().enqueue([user_msg, ai_msg])
+            
+            if request.include_timing:
+                trace.finish()
+                yield f"data: {json.dumps({'type': 'timing', **trace.to_dict()})}\n\n"
                 
             yield "data: [DONE]\n\n"
             
@@ -206,5 +363,10 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
             print(f"Error in chat generator: {e}")
             yield f"data: {json.dumps({'type': 'answer', 'content': f'Error: {str(e)}'})}\n\n"
             yield "data: [DONE]\n\n"
+        finally:
+            if prefetch:
+                prefetch.finish()
+            trace.finish()
+            get_trace_buffer().add(trace)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
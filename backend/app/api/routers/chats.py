@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from backend.app.core.database import get_db
+from backend.app.api.pagination import decode_cursor, set_next_cursor
 from backend.app.models import Chat as ChatModel, Message as MessageModel
 from backend.app.schemas import Chat, ChatCreate, Message
+from backend.app.chat.indexer import get_indexer
+from backend.app.chat.context_cache import get_context_cache
 from uuid import uuid4
 from datetime import datetime, timezone
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Chat])
-def get_chats(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    chats = db.query(ChatModel).order_by(ChatModel.updated_at.desc()).offset(skip).limit(limit).all()
-    return chats
+def get_chats(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    # Pass the X-Next-Cursor header back as ?cursor= for the next page; skip still works but scans
+    query = db.query(ChatModel).order_by(ChatModel.updated_at.desc(), ChatModel.id.desc())
+    if cursor:
+        updated_at, chat_id = decode_cursor(cursor)
+        query = query.filter(tuple_(ChatModel.updated_at, ChatModel.id) < (updated_at, chat_id))
+    else:
+        query = query.offset(skip)
+    return set_next_cursor(response, query.limit(limit + 1).all(), limit, "updated_at")
 
 @router.post("/", response_model=Chat)
 def create_chat(chat: ChatCreate, db: Session = Depends(get_db)):
@@ -22,6 +32,18 @@ def create_chat(chat: ChatCreate, db: Session = Depends(get_db)):
     db.refresh(db_chat)
     return db_chat
 
+@router.get("/index/status")
+def get_index_status():
+    return get_indexer().status()
+
+@router.post("/index/backfill")
+def backfill_index():
+    try:
+        indexed = get_indexer().backfill()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"indexed": indexed, **get_indexer().status()}
+
 @router.get("/{chat_id}", response_model=Chat)
 def get_chat(chat_id: str, db: Session = Depends(get_db)):
     chat = db.query(ChatModel).filter(ChatModel.id == chat_id).first()
@@ -42,6 +64,7 @@ def update_chat(chat_id: str, chat_update: ChatCreate, db: Session = Depends(get
     
     db.commit()
     db.refresh(chat)
+    get_context_cache().invalidate(chat_id)
     return chat
 
 @router.delete("/{chat_id}")
@@ -52,9 +75,22 @@ def delete_chat(chat_id: str, db: Session = Depends(get_db)):
     
     db.delete(chat)
     db.commit()
+    get_context_cache().invalidate(chat_id)
+    try:
+        get_indexer().delete_chat(chat_id)
+    except Exception as e:
+        print(f"Error deleting chat {chat_id} from the history index: {e}")
     return {"ok": True}
 
 @router.get("/{chat_id}/messages", response_model=List[Message])
-def get_chat_messages(chat_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    messages = db.query(MessageModel).filter(MessageModel.chat_id == chat_id).order_by(MessageModel.created_at.asc()).offset(skip).limit(limit).all()
-    return messages
+def get_chat_messages(chat_id: str, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                      db: Session = Depends(get_db)):
+    query = db.query(MessageModel).filter(MessageModel.chat_id == chat_id).order_by(
+        MessageModel.created_at.asc(), MessageModel.id.asc()
+    )
+    if cursor:
+        created_at, message_id = decode_cursor(cursor)
+        query = query.filter(tuple_(MessageModel.created_at, MessageModel.id) > (created_at, message_id))
+    else:
+        query = query.offset(skip)
+    return set_next_cursor(response, query.limit(limit + 1).all(), limit, "created_at")
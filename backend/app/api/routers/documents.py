@@ -1,29 +1,144 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
+from sqlalchemy import case, func, tuple_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from backend.app import models, schemas
 from backend.app.core.database import get_db
 from backend.app.api.deps import ServiceContainer, get_services
+from backend.app.api.pagination import decode_cursor, set_next_cursor
+from backend.app.rag.deletion import ACTIVE, delete_documents, get_reconciler
 
 router = APIRouter()
 
+# Sortable columns (each has a (column, id) index) and how to read their cursor key back
+SORT_COLUMNS = {
+    "created_at": (models.Document.created_at, datetime.fromisoformat),
+    "name": (models.Document.name, None),
+    "byte_size": (models.Document.byte_size, None),
+    "chunk_count": (models.Document.chunk_count, None),
+}
+
 @router.get("", response_model=List[schemas.Document])
-def get_documents(db: Session = Depends(get_db)):
-    return db.query(models.Document).all()
+def get_documents(
+    response: Response,
+    type: Optional[str] = None,
+    q: Optional[str] = None,
+    embedding_model: Optional[str] = None,
+    min_bytes: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    min_chunks: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "asc",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Documents filtered and sorted on the columns recorded at ingest. Without a limit
+    every match is returned; with one, pass X-Next-Cursor back as ?cursor= for the next page.
+    """
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    Document = models.Document
+    column, parse = SORT_COLUMNS[sort]
+
+    # Documents being deleted are hidden while their chunks are purged
+    query = db.query(Document).filter(Document.status == ACTIVE)
+    if type:
+        query = query.filter(Document.type == type)
+    if q:
+        query = query.filter(Document.name.contains(q))
+    if embedding_model:
+        query = query.filter(Document.embedding_model == embedding_model)
+    if min_bytes is not None:
+        query = query.filter(Document.byte_size >= min_bytes)
+    if max_bytes is not None:
+        query = query.filter(Document.byte_size <= max_bytes)
+    if min_chunks is not None:
+        query = query.filter(Document.chunk_count >= min_chunks)
+    if max_chunks is not None:
+        query = query.filter(Document.chunk_count <= max_chunks)
+    if created_after:
+        query = query.filter(Document.created_at >= created_after)
+    if created_before:
+        query = query.filter(Document.created_at < created_before)
+
+    if cursor:
+        key, doc_id = decode_cursor(cursor, parse)
+        position = tuple_(column, Document.id)
+        query = query.filter(position > (key, doc_id) if order == "asc" else position < (key, doc_id))
+    if order == "asc":
+        query = query.order_by(column.asc(), Document.id.asc())
+    else:
+        query = query.order_by(column.desc(), Document.id.desc())
+
+    if limit is None:
+        return query.all()
+    return set_next_cursor(response, query.limit(limit + 1).all(), limit, sort)
+
+@router.get("/stats", response_model=schemas.DocumentStats)
+def get_document_stats(db: Session = Depends(get_db)):
+    """Totals and ingest throughput from the per-document columns, without touching the vector store."""
+    Document = models.Document
+    timed = Document.ingest_ms.isnot(None)
+    rows = db.query(
+        Document.type,
+        func.count().label("documents"),
+        func.coalesce(func.sum(Document.byte_size), 0).label("total_bytes"),
+        func.coalesce(func.sum(Document.char_count), 0).label("total_chars"),
+        func.coalesce(func.sum(Document.chunk_count), 0).label("total_chunks"),
+        func.count(Document.ingest_ms).label("timed"),
+        func.coalesce(func.sum(Document.ingest_ms), 0).label("ingest_ms"),
+        func.coalesce(func.sum(case((timed, Document.byte_size), else_=0)), 0).label("timed_bytes"),
+        func.coalesce(func.sum(case((timed, Document.chunk_count), else_=0)), 0).label("timed_chunks"),
+    ).filter(Document.status == ACTIVE).group_by(Document.type).order_by(Document.type).all()
+
+    total = lambda field: sum(getattr(r, field) for r in rows)
+    documents, timed_count, ingest_seconds = total("documents"), total("timed"), total("ingest_ms") / 1000
+    return schemas.DocumentStats(
+        documents=documents,
+        total_bytes=total("total_bytes"),
+        total_chars=total("total_chars"),
+        total_chunks=total("total_chunks"),
+        without_stats=documents - timed_count,
+        avg_ingest_ms=round(total("ingest_ms") / timed_count, 2) if timed_count else None,
+        bytes_per_second=round(total("timed_bytes") / ingest_seconds, 2) if ingest_seconds else None,
+        chunks_per_second=round(total("timed_chunks") / ingest_seconds, 2) if ingest_seconds else None,
+        by_type=[
+            schemas.DocumentTypeStats(type=r.type, documents=r.documents, total_bytes=r.total_bytes, total_chunks=r.total_chunks)
+            for r in rows
+        ],
+    )
+
+@router.post("/bulk-delete")
+def bulk_delete_documents(request: schemas.DocumentBulkDelete, db: Session = Depends(get_db), svcs: ServiceContainer = Depends(get_services)):
+    """
+    Delete many documents with batched vector-store deletes. Documents whose chunks
+    could not be removed are reported as pending and finished by the reconciler.
+    """
+    return delete_documents(db, svcs.vector_store, request.doc_ids)
+
+@router.post("/reconcile")
+def reconcile_documents():
+    """Finish pending deletes and purge chunks whose document no longer exists."""
+    try:
+        report = get_reconciler().run_once()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**report, "stats": get_reconciler().stats}
 
 @router.delete("/{doc_id}")
 def delete_document(doc_id: str, db: Session = Depends(get_db), svcs: ServiceContainer = Depends(get_services)):
-    db_doc = db.query(models.Document).filter(models.Document.id == doc_id).first()
-    if not db_doc:
+    result = delete_documents(db, svcs.vector_store, [doc_id])
+    if result["not_found"]:
         raise HTTPException(status_code=404, detail="Document not found")
-    
-    # Delete from DB
-    db.delete(db_doc)
-    db.commit()
-    
-    # Delete from VectorStore
-    if svcs.vector_store:
-        svcs.vector_store.delete_document(doc_id)
-        
+    if result["pending"]:
+        return {"message": "Document deletion pending", "pending": True}
     return {"message": "Document deleted"}
@@ -0,0 +1,144 @@
+import json
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.app.core.database import get_db, get_async_db
+from backend.app.models import Chat as ChatModel, Message as MessageModel
+from backend.app.chat.context_cache import get_context_cache
+
+router = APIRouter()
+
+FORMAT_VERSION = 1
+CHAT_TABLE = ChatModel.__table__
+MESSAGE_TABLE = MessageModel.__table__
+# is_indexed describes this instance's vector store, an import has to index again
+MESSAGE_COLUMNS = [c for c in MESSAGE_TABLE.columns if c.name != "is_indexed"]
+DATETIME_FIELDS = {"created_at", "updated_at"}
+
+def _dumps(record: dict) -> str:
+    compact = {
+        k: (v.isoformat() if isinstance(v, datetime) else v)
+        for k, v in record.items() if v is not None
+    }
+    return json.dumps(compact, separators=(",", ":"), ensure_ascii=False)
+
+def _export_lines(db: Session, chat_id: Optional[str], rows_per_chunk: int = 500) -> Iterator[str]:
+    yield _dumps({"type": "meta", "version": FORMAT_VERSION, "exported_at": datetime.now(timezone.utc)}) + "\n"
+
+    chats = select(CHAT_TABLE).order_by(CHAT_TABLE.c.id)
+    messages = select(*MESSAGE_COLUMNS).order_by(MESSAGE_TABLE.c.chat_id, MESSAGE_TABLE.c.created_at, MESSAGE_TABLE.c.id)
+    if chat_id:
+        chats = chats.where(CHAT_TABLE.c.id == chat_id)
+        messages = messages.where(MESSAGE_TABLE.c.chat_id == chat_id)
+
+    # Server-side cursors: rows are fetched yield_per at a time and never turned into ORM objects
+    for kind, statement in (("chat", chats), ("message", messages)):
+        buffer = []
+        for row in db.execute(statement.execution_options(yield_per=1000)).mappings():
+            buffer.append(_dumps({"type": kind, **row}))
+            if len(buffer) >= rows_per_chunk:
+                yield "\n".join(buffer) + "\n"
+                buffer = []
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+
+@router.get("/export")
+def export_history(chat_id: Optional[str] = None, db: Session = Depends(get_db)):
+    """All chats and messages (or one chat) as NDJSON: a meta line, then chats, then messages."""
+    filename = f"history-{chat_id or 'all'}.ndjson"
+    return StreamingResponse(
+        _export_lines(db, chat_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def _column_default(column):
+    default = column.default
+    if default is None:
+        return None
+    # Callable defaults are wrapped by SQLAlchemy to take an (unused here) execution context
+    return default.arg(None) if default.is_callable else default.arg
+
+def _parse_row(record: dict, columns: list) -> dict:
+    """Export lines leave out null columns; batched inserts need every row to carry every column."""
+    row = {}
+    for column in columns:
+        if column.name in record:
+            value = record[column.name]
+            row[column.name] = datetime.fromisoformat(value) if column.name in DATETIME_FIELDS and value else value
+        else:
+            row[column.name] = _column_default(column)
+    return row
+
+class _Importer:
+    """Buffers parsed rows and writes them in batches, one transaction per batch."""
+
+    def __init__(self, db: AsyncSession, batch_size: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.pending = {"chat": [], "message": []}
+        self.stats = {"chats": 0, "messages": 0, "skipped": 0, "errors": 0}
+        self.error_samples: List[str] = []
+        self.columns = {"chat": list(CHAT_TABLE.columns), "message": MESSAGE_COLUMNS}
+
+    async def add_line(self, line: bytes, line_no: int):
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+            kind = record.get("type")
+            if kind == "meta":
+                return
+            if kind not in self.pending or "id" not in record:
+                raise ValueError(f"unknown record type {kind!r}" if kind not in self.pending else "missing id")
+            self.pending[kind].append(_parse_row(record, self.columns[kind]))
+        except Exception as e:
+            self.stats["errors"] += 1
+            if len(self.error_samples) < 10:
+                self.error_samples.append(f"line {line_no}: {e}")
+            return
+        if len(self.pending[kind]) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        # Chats go first so a batch of messages never lands before its chat
+        for kind, table, key in (("chat", CHAT_TABLE, "chats"), ("message", MESSAGE_TABLE, "messages")):
+            rows = self.pending[kind]
+            if not rows:
+                continue
+            # Rows that already exist (same id) are kept as they are
+            result = await self.db.execute(insert(table).on_conflict_do_nothing(index_elements=["id"]), rows)
+            inserted = max(result.rowcount, 0)
+            self.stats[key] += inserted
+            self.stats["skipped"] += len(rows) - inserted
+            self.pending[kind] = []
+        await self.db.commit()
+
+@router.post("/import")
+async def import_history(request: Request, batch_size: int = 5000, db: AsyncSession = Depends(get_async_db)):
+    """
+    Load an NDJSON export. The body is read as a stream and inserted in batches of
+    batch_size rows; existing ids are skipped, so re-running an import is safe.
+    Imported messages are not in the search index until /api/chats/index/backfill runs.
+    """
+    importer = _Importer(db, max(batch_size, 1))
+    remainder, line_no = b"", 0
+    async for chunk in request.stream():
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            line_no += 1
+            await importer.add_line(line, line_no)
+    if remainder:
+        await importer.add_line(remainder, line_no + 1)
+    await importer.flush()
+    # Imported messages may belong to chats that are cached
+    get_context_cache().clear()
+    return {**importer.stats, "error_samples": importer.error_samples}
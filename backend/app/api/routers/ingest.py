@@ -1,21 +1,25 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import shutil
 import os
+import time
 import uuid
 from langchain_core.documents import Document as LangChainDocument
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from backend.app import models, schemas
-from backend.app.core.database import get_db
+from backend.app.core.database import get_db, get_async_db
 from backend.app.core.config import get_settings
 from backend.app.api.deps import ServiceContainer, get_services
+from backend.app.core.singleflight import get_group
 from backend.app.ingestion.web_loader import WebLoader
 from backend.app.ingestion.file_loader import FileLoader
 
 router = APIRouter()
 
 def get_text_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
     settings = get_settings()
     return RecursiveCharacterTextSplitter(
         chunk_size=settings.chunk_size,
@@ -26,66 +30,87 @@ def get_text_splitter():
 @router.post("/url")
 def ingest_url(request: schemas.IngestURLRequest, db: Session = Depends(get_db), svcs: ServiceContainer = Depends(get_services)):
     try:
-        loader = WebLoader()
-        content = loader.load(request.url)
-        
-        # Save to DB
-        db_doc = models.Document(name=request.url, source=request.url, type="url")
-        db.add(db_doc)
-        db.commit()
-        db.refresh(db_doc)
-        
-        # Split text into chunks
-        text_splitter = get_text_splitter()
-        chunks = text_splitter.split_text(content)
-        
-        # Create documents for each chunk
-        docs = []
-        for i, chunk in enumerate(chunks):
-            doc = LangChainDocument(
-                page_content=chunk, 
-                metadata={
-                    "source": request.url, 
-                    "type": "url",
-                    "doc_id": str(db_doc.id),
-                    "chunk_index": i
-                }
-            )
-            docs.append(doc)
-
-        # Save to VectorStore with metadata
-        if svcs.vector_store:
-            svcs.vector_store.add_documents(docs)
-        else:
-            raise HTTPException(status_code=500, detail="Vector store not initialized. Check configuration.")
-            
-        return {"message": "URL ingested successfully", "doc_id": db_doc.id, "length": len(content), "chunks": len(docs)}
+        # Concurrent requests for the same URL (double clicks, retries) share one fetch and ingest
+        return get_group("ingest_url").do(request.url, _ingest_url, request.url, db, svcs)
     except Exception as e:
         print(f"Ingest URL error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+def _embedding_model(svcs: ServiceContainer):
+    return getattr(svcs.vector_store.embeddings, "model", None) if svcs.vector_store else None
+
+def _ingest_url(url: str, db: Session, svcs: ServiceContainer) -> dict:
+    started = time.perf_counter()
+    loader = WebLoader()
+    content = loader.load(url)
+    
+    # Save to DB
+    db_doc = models.Document(
+        name=url, source=url, type="url",
+        byte_size=len(content.encode("utf-8")), char_count=len(content),
+        embedding_model=_embedding_model(svcs),
+    )
+    db.add(db_doc)
+    db.commit()
+    db.refresh(db_doc)
+    
+    # Split text into chunks
+    text_splitter = get_text_splitter()
+    chunks = text_splitter.split_text(content)
+    
+    # Create documents for each chunk
+    docs = []
+    for i, chunk in enumerate(chunks):
+        doc = LangChainDocument(
+            page_content=chunk, 
+            metadata={
+                "source": url, 
+                "type": "url",
+                "doc_id": str(db_doc.id),
+                "chunk_index": i
+            }
+        )
+        docs.append(doc)
+
+    # Save to VectorStore with metadata
+    if svcs.vector_store:
+        svcs.vector_store.add_documents(docs)
+    else:
+        raise HTTPException(status_code=500, detail="Vector store not initialized. Check configuration.")
+
+    db_doc.chunk_count = len(docs)
+    db_doc.ingest_ms = round((time.perf_counter() - started) * 1000, 2)
+    db.commit()
+        
+    return {"message": "URL ingested successfully", "doc_id": db_doc.id, "length": len(content), "chunks": len(docs)}
+
 @router.post("/file")
-async def ingest_file(file: UploadFile = File(...), db: Session = Depends(get_db), svcs: ServiceContainer = Depends(get_services)):
+async def ingest_file(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db), svcs: ServiceContainer = Depends(get_services)):
+    started = time.perf_counter()
     file_ext = os.path.splitext(file.filename)[1].lower()
     temp_path = f"temp_{uuid.uuid4()}{file_ext}"
     try:
         with open(temp_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
             
+        # Parsing and embedding are blocking, keep them off the event loop
         loader = FileLoader()
         content = ""
         if file_ext == ".pdf":
-            content = loader.load_pdf(temp_path)
+            content = await asyncio.to_thread(loader.load_pdf, temp_path)
         elif file_ext in [".md", ".txt"]:
-            content = loader.load_markdown(temp_path)
+            content = await asyncio.to_thread(loader.load_markdown, temp_path)
         else:
             raise HTTPException(status_code=400, detail="Unsupported file type")
             
         # Save to DB
-        db_doc = models.Document(name=file.filename, source=file.filename, type="file")
+        db_doc = models.Document(
+            name=file.filename, source=file.filename, type="file",
+            byte_size=os.path.getsize(temp_path), char_count=len(content),
+            embedding_model=_embedding_model(svcs),
+        )
         db.add(db_doc)
-        db.commit()
-        db.refresh(db_doc)
+        await db.commit()
         
         # Split text into chunks
         text_splitter = get_text_splitter()
@@ -107,9 +132,13 @@ async def ingest_file(file: UploadFile = File(...), db: Session = Depends(get_db
         
         # Save to VectorStore
         if svcs.vector_store:
-            svcs.vector_store.add_documents(docs)
+            await asyncio.to_thread(svcs.vector_store.add_documents, docs)
         else:
             raise HTTPException(status_code=500, detail="Vector store not initialized. Check configuration.")
+
+        db_doc.chunk_count = len(docs)
+        db_doc.ingest_ms = round((time.perf_counter() - started) * 1000, 2)
+        await db.commit()
             
         return {"message": "File ingested successfully", "doc_id": db_doc.id, "length": len(content), "chunks": len(docs)}
     except Exception as e:
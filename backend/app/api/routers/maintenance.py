@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+
+from backend.app.rag.maintenance import get_maintenance
+
+router = APIRouter()
+
+@router.get("")
+def read_maintenance():
+    """Totals over all runs and the last run's report."""
+    maintenance = get_maintenance()
+    return {"stats": maintenance.stats, "last_report": maintenance.last_report}
+
+@router.post("/run")
+def run_maintenance():
+    """Run maintenance now: temp files, orphaned chunks, index rebuilds, VACUUM/ANALYZE."""
+    try:
+        return get_maintenance().run_once()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -1,33 +1,47 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from backend.app.core.database import get_db
-from backend.app.models import GlobalMemory as GlobalMemoryModel
-from backend.app.schemas import GlobalMemory, GlobalMemoryBase
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from backend.app.schemas import GlobalMemory, GlobalMemoryBase, MemoryFact, MemoryFactCreate, MemoryFactWrite
+from backend.app.chat.memory import get_memory_store
 from datetime import datetime, timezone
 
 router = APIRouter()
 
+def _as_global_memory(facts) -> GlobalMemory:
+    # The memory used to be one text blob; it is still offered that way, one fact per line
+    store = get_memory_store()
+    updated_at = max((f.updated_at for f in facts), default=None) or datetime.now(timezone.utc)
+    return GlobalMemory(id=1, content=store.render([f.content for f in facts]), updated_at=updated_at)
+
 @router.get("/", response_model=GlobalMemory)
-def get_global_memory(db: Session = Depends(get_db)):
-    memory = db.query(GlobalMemoryModel).first()
-    if not memory:
-        # Initialize if not exists
-        memory = GlobalMemoryModel(content="")
-        db.add(memory)
-        db.commit()
-        db.refresh(memory)
-    return memory
+def get_global_memory():
+    return _as_global_memory(get_memory_store().facts())
 
 @router.put("/", response_model=GlobalMemory)
-def update_global_memory(memory_update: GlobalMemoryBase, db: Session = Depends(get_db)):
-    memory = db.query(GlobalMemoryModel).first()
-    if not memory:
-        memory = GlobalMemoryModel(content=memory_update.content)
-        db.add(memory)
-    else:
-        memory.content = memory_update.content
-        memory.updated_at = datetime.now(timezone.utc)
-    
-    db.commit()
-    db.refresh(memory)
-    return memory
+def update_global_memory(memory_update: GlobalMemoryBase):
+    """Replace all facts with the lines of `content`."""
+    store = get_memory_store()
+    store.replace(memory_update.content)
+    return _as_global_memory(store.facts())
+
+@router.get("/facts", response_model=List[MemoryFact])
+def list_memory_facts():
+    return get_memory_store().facts()
+
+@router.post("/facts", response_model=MemoryFactWrite)
+def add_memory_fact(fact: MemoryFactCreate):
+    try:
+        fact_id, action = get_memory_store().add(fact.content, source="user")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MemoryFactWrite(fact_id=fact_id, action=action)
+
+@router.delete("/facts/{fact_id}")
+def delete_memory_fact(fact_id: str):
+    if not get_memory_store().delete(fact_id):
+        raise HTTPException(status_code=404, detail="Fact not found")
+    return {"message": "Fact deleted"}
+
+@router.get("/search", response_model=List[str])
+def search_memory(q: str, k: Optional[int] = None):
+    """The facts a chat turn with this message would get."""
+    return get_memory_store().relevant(q, k)
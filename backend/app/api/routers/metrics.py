@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from backend.app.chat.cache import cache_info
+from backend.app.chat.summarizer import get_summarizer
+from backend.app.chat.context_cache import get_context_cache
+from backend.app.chat.memory import get_memory_store
+from backend.app.core.singleflight import singleflight_stats
+from backend.app.agent.prefetch import prefetch_stats
+from backend.app.agent.routing import route_stats
+from backend.app.core.tracing import get_trace_buffer
+from backend.app.core.resilience import resilience_stats
+from backend.app.rag.deletion import get_reconciler
+from backend.app.api.deps import get_registry
+from backend.app.rag.reembed import get_reembedder
+
+router = APIRouter()
+
+@router.get("/llm-cache")
+def get_llm_cache_metrics():
+    return cache_info()
+
+@router.get("/context-cache")
+def get_context_cache_metrics():
+    return get_context_cache().info()
+
+@router.get("/memory")
+def get_memory_metrics():
+    return get_memory_store().info()
+
+@router.get("/summarizer")
+def get_summarizer_metrics():
+    return get_summarizer().stats
+
+@router.get("/singleflight")
+def get_singleflight_metrics():
+    return singleflight_stats()
+
+@router.get("/prefetch")
+def get_prefetch_metrics():
+    return prefetch_stats.info()
+
+@router.get("/routing")
+def get_routing_metrics():
+    return route_stats.info()
+
+@router.get("/breakers")
+def get_breaker_metrics():
+    return resilience_stats()
+
+@router.get("/services")
+def get_services_metrics():
+    return get_registry().info()
+
+@router.get("/reconciler")
+def get_reconciler_metrics():
+    return get_reconciler().stats
+
+@router.get("/reembed")
+def get_reembed_metrics():
+    """Active version and embedding model per collection, and re-embedding progress with ETA."""
+    return get_reembedder().info()
+
+@router.get("/traces")
+def list_traces(limit: int = 50, name: Optional[str] = None):
+    return get_trace_buffer().list(limit=limit, name=name)
+
+@router.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    trace = get_trace_buffer().get(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
@@ -3,6 +3,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 
 from backend.app.api.deps import ServiceContainer, get_services
+from backend.app.core.singleflight import get_group
 
 router = APIRouter()
 
@@ -36,7 +37,11 @@ def search_documents(request: SearchRequest, svcs: ServiceContainer = Depends(ge
         # If we want scores, we need to update the wrapper.
         # Let's check store.py first.
         
-        docs = svcs.vector_store.similarity_search(request.query, k=request.k, filter=filter_dict)
+        # Identical searches running at the same time share one embedding + Chroma query
+        key = (request.query, request.k, tuple(sorted(request.selected_doc_ids or [])))
+        docs = get_group("search").do(
+            key, svcs.vector_store.similarity_search, request.query, k=request.k, filter=filter_dict
+        )
         
         results = []
         for doc in docs:
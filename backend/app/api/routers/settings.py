@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from backend.app.core.config import AppSettings, get_settings, save_settings
-from backend.app.api.deps import ServiceContainer, get_services, reset_services
+from backend.app.api.deps import reload_services
+from backend.app.rag.reembed import get_reembedder
 
 router = APIRouter()
 
@@ -14,9 +15,21 @@ def read_settings():
 @router.post("")
 def update_settings(settings: AppSettings):
     try:
-        save_settings(settings)
-        # Reset services to force reload with new settings
-        reset_services()
-        return {"message": "Settings updated"}
+        changes = save_settings(settings)
+        # Only services whose inputs changed are rebuilt; the others keep running
+        reload = reload_services(changes["components"])
+        # Vectors from the old model stay in use until the collections are re-embedded
+        reembed = {}
+        if "embedding_model" in changes["fields"] and settings.reembed_on_model_change:
+            reembed = get_reembedder().start_all(settings.embedding_model)
+        return {"message": "Settings updated", "changed": changes["fields"], **reload, "reembed": reembed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/reembed")
+def reembed_collections():
+    """Re-embed collections not yet on the configured embedding model (e.g. after a failed job)."""
+    try:
+        return get_reembedder().start_all()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+
+from backend.app.rag.snapshot import SnapshotConflict, SnapshotError, create_snapshot, restore_snapshot
+
+router = APIRouter()
+
+def _temp_path() -> str:
+    fd, path = tempfile.mkstemp(suffix=".snapshot")
+    os.close(fd)
+    return path
+
+@router.post("")
+def download_snapshot(background_tasks: BackgroundTasks):
+    """
+    The whole knowledge base, embeddings included, as one compressed archive. Take it
+    while no uploads, deletes or chats are in flight: writes meanwhile may leave rows
+    and chunks that don't match.
+    """
+    path = _temp_path()
+    try:
+        report = create_snapshot(path)
+    except Exception as e:
+        os.remove(path)
+        raise HTTPException(status_code=500, detail=str(e))
+    background_tasks.add_task(os.remove, path)
+    name = f"info-get-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.snapshot"
+    return FileResponse(path, filename=name, media_type="application/zip",
+                        headers={"X-Snapshot-Rows": str(report["rows"]), "X-Snapshot-Chunks": str(report["chunks"])})
+
+@router.post("/restore")
+def upload_snapshot(file: UploadFile = File(...), replace: bool = False):
+    """Load an archive from POST /api/snapshot; no embedding calls are made."""
+    path = _temp_path()
+    try:
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        return restore_snapshot(path, replace=replace)
+    except SnapshotConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(path)
@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case, literal, union_all
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+
+from backend.app.core.database import get_db
+from backend.app.models import Message as MessageModel
+from backend.app.schemas import UsageRollup
+
+router = APIRouter()
+
+def _turns(filters: list):
+    """One row per assistant turn, whatever models it used."""
+    return select(
+        MessageModel.created_at,
+        MessageModel.chat_id,
+        MessageModel.model,
+        MessageModel.prompt_tokens,
+        MessageModel.completion_tokens,
+        MessageModel.tool_calls,
+        MessageModel.agent_iterations,
+        MessageModel.latency_ms,
+    ).where(*filters).subquery()
+
+def _model_calls(filters: list):
+    """
+    Turns split by model: routed turns give their tool-selection model's share
+    (the tool_* columns) its own row, and the main model the rest.
+    """
+    def rest(total, part):
+        return total - func.coalesce(part, 0)
+
+    main = select(
+        MessageModel.created_at,
+        MessageModel.chat_id,
+        MessageModel.model.label("model"),
+        rest(MessageModel.prompt_tokens, MessageModel.tool_prompt_tokens).label("prompt_tokens"),
+        rest(MessageModel.completion_tokens, MessageModel.tool_completion_tokens).label("completion_tokens"),
+        MessageModel.tool_calls,
+        rest(MessageModel.agent_iterations, MessageModel.tool_iterations).label("agent_iterations"),
+        rest(MessageModel.latency_ms, MessageModel.tool_latency_ms).label("latency_ms"),
+    ).where(*filters)
+    routed = select(
+        MessageModel.created_at,
+        MessageModel.chat_id,
+        MessageModel.tool_model.label("model"),
+        MessageModel.tool_prompt_tokens.label("prompt_tokens"),
+        MessageModel.tool_completion_tokens.label("completion_tokens"),
+        literal(0).label("tool_calls"),
+        MessageModel.tool_iterations.label("agent_iterations"),
+        MessageModel.tool_latency_ms.label("latency_ms"),
+    ).where(*filters, MessageModel.tool_model.isnot(None))
+    return union_all(main, routed).subquery()
+
+def _rollup(db: Session, keys: List[str], days: Optional[int], model: Optional[str],
+            order_by: str, limit: Optional[int] = None) -> List[UsageRollup]:
+    """
+    Aggregate assistant-turn accounting in a single SQL statement.
+
+    p95 latency uses the nearest-rank method with window functions: rows are
+    ranked by latency within each group, and the smallest latency ranked at or
+    above 95% of the group size is the p95.
+    """
+    filters = [MessageModel.role == "assistant", MessageModel.latency_ms.isnot(None)]
+    if days:
+        filters.append(MessageModel.created_at >= datetime.now(timezone.utc) - timedelta(days=days))
+    per_model = "model" in keys or model is not None
+    source = _model_calls(filters) if per_model else _turns(filters)
+
+    columns = {"day": func.date(source.c.created_at), "model": source.c.model, "chat_id": source.c.chat_id}
+    partition = [columns[k] for k in keys]
+    ranked = select(
+        *[columns[k].label(k) for k in keys],
+        source.c.prompt_tokens,
+        source.c.completion_tokens,
+        source.c.tool_calls,
+        source.c.agent_iterations,
+        source.c.latency_ms,
+        func.row_number().over(partition_by=partition, order_by=source.c.latency_ms).label("latency_rank"),
+        func.count().over(partition_by=partition).label("group_size"),
+    ).where(*([source.c.model == model] if model else [])).subquery()
+
+    prompt_tokens = func.coalesce(func.sum(ranked.c.prompt_tokens), 0)
+    completion_tokens = func.coalesce(func.sum(ranked.c.completion_tokens), 0)
+    group = [ranked.c[k] for k in keys]
+    stmt = select(
+        *group,
+        func.count().label("turns"),
+        prompt_tokens.label("prompt_tokens"),
+        completion_tokens.label("completion_tokens"),
+        (prompt_tokens + completion_tokens).label("total_tokens"),
+        func.coalesce(func.sum(ranked.c.tool_calls), 0).label("tool_calls"),
+        func.avg(ranked.c.agent_iterations).label("avg_iterations"),
+        func.avg(ranked.c.latency_ms).label("avg_latency_ms"),
+        func.min(case(
+            (ranked.c.latency_rank >= ranked.c.group_size * 0.95, ranked.c.latency_ms)
+        )).label("p95_latency_ms"),
+    ).group_by(*group)
+
+    if order_by == "total_tokens":
+        stmt = stmt.order_by((prompt_tokens + completion_tokens).desc())
+    else:
+        stmt = stmt.order_by(*group)
+    if limit:
+        stmt = stmt.limit(limit)
+
+    return [UsageRollup(**row._mapping) for row in db.execute(stmt)]
+
+@router.get("/daily", response_model=List[UsageRollup])
+def usage_by_day(days: int = 30, model: Optional[str] = None, per_model: bool = False, db: Session = Depends(get_db)):
+    keys = ["day", "model"] if per_model else ["day"]
+    return _rollup(db, keys, days, model, order_by="key")
+
+@router.get("/models", response_model=List[UsageRollup])
+def usage_by_model(days: Optional[int] = None, db: Session = Depends(get_db)):
+    return _rollup(db, ["model"], days, None, order_by="key")
+
+@router.get("/chats", response_model=List[UsageRollup])
+def most_expensive_chats(days: Optional[int] = None, limit: int = 20, db: Session = Depends(get_db)):
+    return _rollup(db, ["chat_id"], days, None, order_by="total_tokens", limit=limit)
@@ -0,0 +1,157 @@
+import asyncio
+import importlib
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import engine
+from backend.app.api.deps import get_container
+
+PENDING, WARMING, READY, FAILED, SKIPPED = "pending", "warming", "ready", "failed", "skipped"
+
+# Imported on first use rather than at startup; warmup loads them ahead of that use
+LAZY_MODULES = ("langchain_openai", "langchain_text_splitters", "pypdf", "bs4")
+
+
+class Readiness:
+    """Per-component warmup state, as reported by /ready."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, dict] = {}
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+
+    def reset(self, names):
+        with self._lock:
+            self._components = {name: {"state": PENDING} for name in names}
+            self.started_at = datetime.now(timezone.utc).isoformat()
+            self.finished_at = None
+
+    def update(self, name: str, state: str, **fields):
+        with self._lock:
+            self._components[name] = {"state": state, **fields}
+
+    def finish(self):
+        with self._lock:
+            self.finished_at = datetime.now(timezone.utc).isoformat()
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return self.finished_at is not None and all(
+                c["state"] in (READY, SKIPPED) for c in self._components.values()
+            )
+
+    def report(self) -> dict:
+        ready = self.is_ready()
+        with self._lock:
+            if ready:
+                status = "ready"
+            elif self.finished_at is not None:
+                status = "degraded"
+            else:
+                status = "warming" if self.started_at else "not_started"
+            return {
+                "status": status,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "components": {name: dict(c) for name, c in self._components.items()},
+            }
+
+
+_readiness = Readiness()
+
+def get_readiness() -> Readiness:
+    return _readiness
+
+
+def _warm_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _warm_imports():
+    for module in LAZY_MODULES:
+        importlib.import_module(module)
+    return {"modules": list(LAZY_MODULES)}
+
+
+def _warm_collection(name: str):
+    container = get_container()
+    store = container.get_vector_store(name)
+    if store is None:
+        raise RuntimeError(container.init_errors.get(name) or "VectorStore init failed")
+    return {"chunks": store.count()}
+
+
+def _warm_embeddings():
+    store = get_container().get_vector_store("documents")
+    if store is None:
+        raise RuntimeError("Embedding client comes with the 'documents' collection, which failed to init")
+    store.embeddings.embed_query("warmup")
+    return {"model": store.embeddings.model}
+
+
+async def _warm_llm(probe: bool):
+    container = get_container()
+    service = await asyncio.to_thread(container.get_llm_service)
+    if service is None:
+        raise RuntimeError(container.init_errors.get("llm") or "LLMService init failed")
+    if probe:
+        await service.client.models.list()
+    return {"model": service.model}
+
+
+async def _timed(name: str, warm: Callable[[], Awaitable[Optional[dict]]]):
+    readiness = get_readiness()
+    readiness.update(name, WARMING)
+    started = time.perf_counter()
+    try:
+        details = await warm()
+    except Exception as e:
+        readiness.update(name, FAILED, seconds=round(time.perf_counter() - started, 4), error=str(e))
+        print(f"Warmup of {name} failed: {e}")
+        return
+    readiness.update(name, READY, seconds=round(time.perf_counter() - started, 4), **(details or {}))
+
+
+async def warm_up():
+    """
+    Build the database connection, configured collections and the LLM client, and
+    import the modules loaded lazily (LAZY_MODULES), in parallel. With
+    warmup_probe_upstream, also send one embedding request and list the LLM's
+    models so connections are open before the first user request.
+    """
+    settings = get_settings()
+    probe = settings.warmup_probe_upstream
+    collections = list(dict.fromkeys(settings.warmup_collections))
+    readiness = get_readiness()
+    readiness.reset(["database", "imports", "llm"] + [f"collection:{c}" for c in collections] + ["embeddings"])
+
+    # Collections are built in their own threads. The embedding probe reuses the
+    # 'documents' store, so it waits for that one rather than building it twice.
+    tasks = {
+        f"collection:{name}": asyncio.create_task(
+            _timed(f"collection:{name}", lambda name=name: asyncio.to_thread(_warm_collection, name))
+        )
+        for name in collections
+    }
+    tasks["database"] = asyncio.create_task(_timed("database", lambda: asyncio.to_thread(_warm_database)))
+    tasks["imports"] = asyncio.create_task(_timed("imports", lambda: asyncio.to_thread(_warm_imports)))
+    tasks["llm"] = asyncio.create_task(_timed("llm", lambda: _warm_llm(probe)))
+
+    if probe:
+        documents = tasks.get("collection:documents")
+        if documents:
+            await documents
+        tasks["embeddings"] = asyncio.create_task(_timed("embeddings", lambda: asyncio.to_thread(_warm_embeddings)))
+    else:
+        readiness.update("embeddings", SKIPPED, reason="client is built with the 'documents' collection")
+
+    await asyncio.gather(*tasks.values())
+    readiness.finish()
+    return readiness.report()
@@ -0,0 +1,113 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, List
+
+from langchain_core.messages import BaseMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from backend.app.core.config import get_settings
+
+
+def _normalize_message(message: Any) -> dict:
+    if isinstance(message, BaseMessage):
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+        normalized = {"role": message.type, "content": content.strip()}
+        # Tool call ids are random per generation; only what was called matters
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            normalized["tool_calls"] = [{"name": tc["name"], "args": tc["args"]} for tc in tool_calls]
+        if message.type == "tool":
+            normalized["name"] = getattr(message, "name", None)
+        return normalized
+
+    normalized = {"role": message.get("role"), "content": (message.get("content") or "").strip()}
+    if message.get("tool_calls"):
+        normalized["tool_calls"] = message["tool_calls"]
+    return normalized
+
+
+def make_cache_key(messages: List[Any], model: str, tools: Optional[list] = None, **params) -> str:
+    """Stable hash of everything that determines the model's reply."""
+    payload = {
+        "model": model,
+        "messages": [_normalize_message(m) for m in messages],
+        "tools": [convert_to_openai_tool(t) for t in tools] if tools else [],
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU cache of model replies with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def configure(self, max_entries: int, ttl_seconds: float):
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self._evict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+_response_cache = ResponseCache()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The shared cache, or None when llm_cache_enabled is off."""
+    settings = get_settings()
+    if not settings.llm_cache_enabled:
+        return None
+    if (_response_cache.max_entries, _response_cache.ttl_seconds) != (settings.llm_cache_max_entries, settings.llm_cache_ttl_seconds):
+        _response_cache.configure(settings.llm_cache_max_entries, settings.llm_cache_ttl_seconds)
+    return _response_cache
+
+def cache_info() -> dict:
+    return {"enabled": get_settings().llm_cache_enabled, **_response_cache.info()}
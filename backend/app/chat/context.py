@@ -0,0 +1,219 @@
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
+
+SYSTEM_PROMPT_TEMPLATE = """You are an intelligent assistant for a personal knowledge base.
+
+    Global Memory (User Preferences & Facts related to this message):
+    {memory}
+
+    Previous Conversation Summary:
+    {summary}
+
+    Instructions:
+    - Use the available tools to answer the user's question.
+    - You can search documents, search chat history, or read/update global memory.
+    - Always verify information with tools if you are unsure.
+    - If you update global memory, do it only for important user preferences or facts, one fact per update.
+    """
+
+# Every chat message carries a few tokens of role/separator framing
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = "\n...[truncated]...\n"
+BUDGET_EXHAUSTED = "[Tool output omitted: the context budget is used up]"
+
+
+@lru_cache(maxsize=32)
+def _get_encoding(model: str):
+    # Resolved once per model: tiktoken may need to download its BPE files,
+    # and we never want to pay that (or its failure) on every request.
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Tokenizer unavailable for '{model}', using estimate: {e}")
+        return None
+
+
+@lru_cache(maxsize=8192)
+def _count_tokens(model: str, text: str) -> int:
+    # History, memory and summary texts repeat on every turn of a chat; count each once
+    return len(_get_encoding(model).encode(text, disallowed_special=()))
+
+
+class TokenCounter:
+    """Counts tokens with the model's tokenizer, falling back to a ~4 chars/token estimate."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding_model = model or "gpt-3.5-turbo"
+        self.encoding = _get_encoding(self._encoding_model)
+
+    def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return _count_tokens(self._encoding_model, text)
+        return (len(text) + 3) // 4
+
+    def count_message(self, message: BaseMessage) -> int:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        tokens = self.count(content) + MESSAGE_OVERHEAD_TOKENS
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            tokens += self.count(tool_call.get("name", "")) + self.count(str(tool_call.get("args", "")))
+        return tokens
+
+    def count_messages(self, messages: List[BaseMessage]) -> int:
+        return sum(self.count_message(m) for m in messages)
+
+    def truncate(self, text: Optional[str], max_tokens: int, keep: str = "head") -> str:
+        """Trim text to at most max_tokens. keep='tail' keeps the most recent end of the text."""
+        if not text or max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        budget = max(max_tokens - self.count(TRUNCATION_MARKER), 0)
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            kept = tokens[-budget:] if keep == "tail" else tokens[:budget]
+            clipped = self.encoding.decode(kept) if budget else ""
+        else:
+            chars = budget * 4
+            clipped = text[-chars:] if keep == "tail" and chars else text[:chars]
+
+        return TRUNCATION_MARKER.lstrip() + clipped if keep == "tail" else clipped + TRUNCATION_MARKER.rstrip()
+
+    def truncate_lines(self, text: Optional[str], max_tokens: int) -> str:
+        """Keep the most recent whole lines that fit in max_tokens, dropping the oldest first."""
+        if not text or max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        budget = max_tokens - self.count(TRUNCATION_MARKER.lstrip())
+        kept: List[str] = []
+        used = 0
+        for line in reversed(text.splitlines()):
+            tokens = self.count(line + "\n")
+            if used + tokens > budget:
+                break
+            kept.insert(0, line)
+            used += tokens
+        if not kept:
+            # Not even the newest line fits: better part of it than no memory at all
+            return self.truncate(text, max_tokens, keep="tail")
+        return TRUNCATION_MARKER.lstrip() + "\n".join(kept)
+
+
+class ContextBuilder:
+    """
+    Assembles the agent prompt inside a token budget.
+
+    Priority when the budget is tight (highest first):
+      1. Instructions and the current user message (never dropped)
+      2. Global memory, capped at memory_share of the budget (oldest lines trimmed first)
+      3. Chat summary, capped at summary_share of the budget (oldest part trimmed first)
+      4. Recent history, newest messages first, with whatever is left
+    Tool outputs produced during the agent loop are clipped to tool_output_tokens each,
+    and to what the prompt and earlier tool outputs left of the budget.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        budget: int,
+        tool_output_tokens: int,
+        memory_share: float = 0.25,
+        summary_share: float = 0.25,
+    ):
+        self.counter = TokenCounter(model)
+        self.budget = budget
+        self.tool_output_tokens = tool_output_tokens
+        self.memory_share = memory_share
+        self.summary_share = summary_share
+        self.breakdown: Dict[str, Any] = {}
+
+    def build(
+        self,
+        memory: Optional[str],
+        summary: Optional[str],
+        history: List[Tuple[str, str]],
+        user_message: str,
+    ) -> List[BaseMessage]:
+        counter = self.counter
+
+        fixed = counter.count(SYSTEM_PROMPT_TEMPLATE.format(memory="", summary="")) + MESSAGE_OVERHEAD_TOKENS
+        user_tokens = counter.count(user_message) + MESSAGE_OVERHEAD_TOKENS
+        remaining = max(self.budget - fixed - user_tokens, 0)
+
+        # Memory is one fact per line, so it's cut between facts
+        memory_text = counter.truncate_lines(memory, min(int(self.budget * self.memory_share), remaining))
+        memory_tokens = counter.count(memory_text)
+        remaining -= memory_tokens
+
+        summary_text = counter.truncate(summary, min(int(self.budget * self.summary_share), remaining), keep="tail")
+        summary_tokens = counter.count(summary_text)
+        remaining -= summary_tokens
+
+        history_messages: List[BaseMessage] = []
+        history_tokens = 0
+        for role, content in reversed(history):
+            if role == "user":
+                message = HumanMessage(content=content)
+            elif role == "assistant":
+                message = AIMessage(content=content)
+            else:
+                continue
+            tokens = counter.count_message(message)
+            if tokens > remaining:
+                break
+            history_messages.insert(0, message)
+            history_tokens += tokens
+            remaining -= tokens
+
+        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+            memory=memory_text,
+            summary=summary_text or "No summary yet.",
+        )
+
+        self.breakdown = {
+            "model": counter.model,
+            "budget": self.budget,
+            "instructions": fixed,
+            "memory": memory_tokens,
+            "memory_truncated": memory_text != (memory or ""),
+            "summary": summary_tokens,
+            "summary_truncated": summary_text != (summary or ""),
+            "history": history_tokens,
+            "history_messages": len(history_messages),
+            "history_dropped": len([h for h in history if h[0] in ("user", "assistant")]) - len(history_messages),
+            "user": user_tokens,
+            "tool_results": 0,
+            "tool_results_truncated": 0,
+        }
+        self.breakdown["prompt_total"] = fixed + memory_tokens + summary_tokens + history_tokens + user_tokens
+
+        return [SystemMessage(content=system_prompt), *history_messages, HumanMessage(content=user_message)]
+
+    def fit_tool_output(self, output: str) -> str:
+        """
+        Clip a tool result to the per-result budget, or to what is left of the whole
+        budget after the prompt and earlier tool results, and account for it. Room
+        for the BUDGET_EXHAUSTED notice is always kept, so a later result that no
+        longer fits is replaced by the notice without going over the budget.
+        """
+        used = self.breakdown.get("prompt_total", 0) + self.breakdown.get("tool_results", 0)
+        reserved = self.counter.count(BUDGET_EXHAUSTED) + MESSAGE_OVERHEAD_TOKENS
+        left = self.budget - used - MESSAGE_OVERHEAD_TOKENS - reserved
+        clipped = self.counter.truncate(output, min(self.tool_output_tokens, left))
+        if not clipped and output:
+            clipped = BUDGET_EXHAUSTED
+        if clipped != output:
+            self.breakdown["tool_results_truncated"] = self.breakdown.get("tool_results_truncated", 0) + 1
+        self.breakdown["tool_results"] = self.breakdown.get("tool_results", 0) + self.counter.count(clipped) + MESSAGE_OVERHEAD_TOKENS
+        return clipped
@@ -0,0 +1,146 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.core.config import get_settings
+from backend.app.models import Chat as ChatModel, Message as MessageModel
+
+
+class ChatContext:
+    """What a turn needs from the chat's rows besides the new message; memory facts are looked up per message."""
+
+    def __init__(self, summary: Optional[str], history: List[Tuple[str, str]]):
+        self.summary = summary
+        self.history = history  # (role, content), oldest first, unsummarized only
+
+
+async def load_chat_context(db: AsyncSession, chat_id: str, recent: int) -> Optional[ChatContext]:
+    """
+    Chat summary and the last `recent` unsummarized messages in one query. None
+    when the chat does not exist.
+    """
+    recent_messages = select(
+        MessageModel.id, MessageModel.role, MessageModel.content, MessageModel.created_at,
+    ).where(
+        MessageModel.chat_id == chat_id,
+        MessageModel.is_summarized == False,
+    ).order_by(MessageModel.created_at.desc()).limit(recent).subquery()
+
+    rows = (await db.execute(
+        select(ChatModel.summary, recent_messages)
+        .select_from(ChatModel)
+        .outerjoin(recent_messages, true())
+        .where(ChatModel.id == chat_id)
+    )).all()
+    if not rows:
+        return None
+
+    messages = sorted((r for r in rows if r.id is not None), key=lambda r: (r.created_at, r.id))
+    return ChatContext(rows[0].summary, [(r.role, r.content) for r in messages])
+
+
+class ContextCache:
+    """
+    Per-chat copy of the turn context (summary + recent messages).
+
+    Writers keep it current instead of expiring it: a committed turn is appended,
+    and anything else that rewrites a chat
+    (summarization, edits, deletes, imports) invalidates that chat. Each write
+    takes the next sequence number, so a load that raced with a write is not stored.
+
+    The last write of only max_chats chats is remembered; an older one is known
+    only to be at or below _floor, so a load that started before the floor is
+    not stored either.
+    """
+
+    def __init__(self, max_chats: int = 256):
+        self.max_chats = max_chats
+        self._lock = threading.Lock()
+        self._chats: "OrderedDict[str, Tuple[int, Optional[str], List[Tuple[str, str]]]]" = OrderedDict()
+        self._writes: "OrderedDict[str, int]" = OrderedDict()  # chat_id -> sequence number of its last write
+        self._seq = 0
+        self._floor = 0
+        self.stats = {"hits": 0, "misses": 0, "appends": 0, "invalidations": 0}
+
+    def get(self, chat_id: str, recent: int) -> Optional[ChatContext]:
+        with self._lock:
+            entry = self._chats.get(chat_id)
+            if entry is None or entry[0] != recent:
+                self.stats["misses"] += 1
+                return None
+            self._chats.move_to_end(chat_id)
+            self.stats["hits"] += 1
+            return ChatContext(entry[1], list(entry[2]))
+
+    def version(self, chat_id: Optional[str]) -> int:
+        """Snapshot to pass to store() after loading from the database."""
+        with self._lock:
+            return self._seq
+
+    def _written(self, chat_id: str):
+        # Caller holds the lock
+        self._seq += 1
+        self._writes[chat_id] = self._seq
+        self._writes.move_to_end(chat_id)
+        while len(self._writes) > self.max_chats:
+            _, seq = self._writes.popitem(last=False)
+            self._floor = max(self._floor, seq)
+
+    def store(self, chat_id: str, context: ChatContext, recent: int, version: int):
+        with self._lock:
+            if self._writes.get(chat_id, self._floor) > version:
+                return
+            self._chats[chat_id] = (recent, context.summary, list(context.history[-recent:] if recent else []))
+            self._chats.move_to_end(chat_id)
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+
+    def append(self, chat_id: str, messages: List[Tuple[str, str]]):
+        """A turn was committed: extend the cached history, keeping the newest `recent`."""
+        with self._lock:
+            self._written(chat_id)
+            entry = self._chats.get(chat_id)
+            if entry is None:
+                return
+            recent, summary, history = entry
+            history = (history + messages)[-recent:] if recent else []
+            self._chats[chat_id] = (recent, summary, history)
+            self.stats["appends"] += 1
+
+    def invalidate(self, chat_id: str):
+        with self._lock:
+            self._written(chat_id)
+            if self._chats.pop(chat_id, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            # Touches chats that aren't cached too: no load in flight may be stored
+            self._seq += 1
+            self._floor = self._seq
+            self._writes.clear()
+            self.stats["invalidations"] += len(self._chats)
+            self._chats.clear()
+
+    def info(self) -> dict:
+        with self._lock:
+            looked_up = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / looked_up, 3) if looked_up else 0.0,
+                "chats": len(self._chats),
+                "tracked_writes": len(self._writes),
+                "max_chats": self.max_chats,
+            }
+
+
+_context_cache = ContextCache()
+
+def get_context_cache() -> ContextCache:
+    size = get_settings().context_cache_max_chats
+    if _context_cache.max_chats != size:
+        _context_cache.max_chats = size
+    return _context_cache
@@ -0,0 +1,219 @@
+import sys
+import time
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import SessionLocal
+from backend.app.models import Message as MessageModel
+from backend.app.api.deps import get_services
+
+INDEXED_ROLES = ("user", "assistant")
+
+# (message_id, chat_id, role, content, created_at)
+PendingMessage = Tuple[str, str, str, str, Optional[datetime]]
+
+
+def _as_utc(ts: Optional[datetime]) -> datetime:
+    if ts is None:
+        return datetime.now(timezone.utc)
+    # SQLite hands back naive datetimes even for timezone-aware columns
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class ChatHistoryIndexer:
+    """
+    Embeds committed chat messages into the 'chats' vector collection in the background.
+
+    Messages are queued by the chat endpoint after commit and written by a
+    single worker thread in batches (up to chat_index_batch_size, or whatever
+    arrived within chat_index_flush_seconds). Vector ids are message ids, so
+    re-indexing is an idempotent upsert. Rows are flagged is_indexed once stored.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[Tuple[PendingMessage, float]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {
+            "enqueued": 0,
+            "indexed": 0,
+            "batches": 0,
+            "failures": 0,
+            "last_batch_seconds": 0.0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "last_indexed_at": None,
+        }
+
+    def enqueue(self, messages: List[MessageModel]):
+        pending = [
+            (m.id, m.chat_id, m.role, m.content, m.created_at)
+            for m in messages
+            if m.role in INDEXED_ROLES and m.content
+        ]
+        if not pending:
+            return
+        now = time.monotonic()
+        for item in pending:
+            self._queue.put((item, now))
+        self.stats["enqueued"] += len(pending)
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="chat-history-indexer", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            settings = get_settings()
+            deadline = time.monotonic() + settings.chat_index_flush_seconds
+            while len(batch) < settings.chat_index_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self.index_batch([item for item, _ in batch])
+            except Exception as e:
+                # Rows stay is_indexed=False, so a backfill picks them up later
+                self.stats["failures"] += 1
+                print(f"Chat history indexing failed for {len(batch)} messages: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def index_batch(self, items: List[PendingMessage]) -> int:
+        if not items:
+            return 0
+        store = get_services().get_vector_store("chats")
+        if not store:
+            raise RuntimeError("Chat history store not available.")
+
+        started = time.perf_counter()
+        # Messages of chats deleted while queued must not come back as search results
+        items = self._existing(items)
+        if not items:
+            return 0
+        docs = [
+            Document(
+                page_content=content,
+                metadata={
+                    "chat_id": chat_id,
+                    "role": role,
+                    "timestamp": _as_utc(created_at).isoformat(),
+                    "message_id": message_id,
+                },
+            )
+            for message_id, chat_id, role, content, created_at in items
+        ]
+        store.add_documents(docs, ids=[item[0] for item in items])
+        self._mark_indexed([item[0] for item in items])
+
+        now = datetime.now(timezone.utc)
+        lag = max((now - _as_utc(item[4])).total_seconds() for item in items)
+        self.stats["indexed"] += len(items)
+        self.stats["batches"] += 1
+        self.stats["last_batch_seconds"] = round(time.perf_counter() - started, 4)
+        self.stats["last_lag_seconds"] = round(lag, 3)
+        self.stats["max_lag_seconds"] = max(self.stats["max_lag_seconds"], round(lag, 3))
+        self.stats["last_indexed_at"] = now.isoformat()
+        return len(items)
+
+    def _existing(self, items: List[PendingMessage]) -> List[PendingMessage]:
+        db = SessionLocal()
+        try:
+            found = {row[0] for row in db.query(MessageModel.id).filter(MessageModel.id.in_([item[0] for item in items]))}
+        finally:
+            db.close()
+        return [item for item in items if item[0] in found]
+
+    def delete_chat(self, chat_id: str):
+        """Remove a deleted chat's messages from the 'chats' collection."""
+        store = get_services().get_vector_store("chats")
+        if not store:
+            raise RuntimeError("Chat history store not available.")
+        store.delete_where("chat_id", [chat_id])
+
+    def _mark_indexed(self, message_ids: List[str]):
+        db = SessionLocal()
+        try:
+            db.query(MessageModel).filter(MessageModel.id.in_(message_ids)).update(
+                {MessageModel.is_indexed: True}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def backfill(self, batch_size: Optional[int] = None) -> int:
+        """Index every committed message that is not in the vector store yet. Runs synchronously."""
+        batch_size = batch_size or get_settings().chat_index_batch_size
+        total = 0
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.query(MessageModel).filter(
+                    MessageModel.is_indexed == False,
+                    MessageModel.role.in_(INDEXED_ROLES),
+                ).order_by(MessageModel.created_at.asc()).limit(batch_size).all()
+                items = [(m.id, m.chat_id, m.role, m.content or "", m.created_at) for m in rows]
+            finally:
+                db.close()
+            if not items:
+                return total
+
+            # Empty messages carry nothing to search, mark them done without embedding
+            empty = [item[0] for item in items if not item[3]]
+            if empty:
+                self._mark_indexed(empty)
+            total += self.index_batch([item for item in items if item[3]])
+
+    def status(self) -> dict:
+        db = SessionLocal()
+        try:
+            backlog = db.query(MessageModel).filter(
+                MessageModel.is_indexed == False,
+                MessageModel.role.in_(INDEXED_ROLES),
+            ).count()
+        finally:
+            db.close()
+
+        # Peek at the oldest queued item without consuming it
+        with self._queue.mutex:
+            oldest = self._queue.queue[0][1] if self._queue.queue else None
+            depth = len(self._queue.queue)
+
+        return {
+            **self.stats,
+            "queue_depth": depth,
+            "oldest_pending_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            "unindexed_messages": backlog,
+        }
+
+
+_indexer = ChatHistoryIndexer()
+
+def get_indexer() -> ChatHistoryIndexer:
+    return _indexer
+
+
+if __name__ == "__main__":
+    # python -m backend.app.chat.indexer backfill
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("Usage: python -m backend.app.chat.indexer backfill")
+        sys.exit(1)
+    started = time.perf_counter()
+    count = _indexer.backfill()
+    print(f"Indexed {count} messages in {time.perf_counter() - started:.2f}s")
@@ -1,7 +1,8 @@
 import os
 from typing import List, Dict, Any, AsyncGenerator
-from openai import AsyncOpenAI
 from backend.app.core.config import get_settings
+from backend.app.chat.cache import get_response_cache, make_cache_key
+from backend.app.core.resilience import get_policy
 
 class LLMService:
     def __init__(self, api_key: str = None, base_url: str = None, model: str = None):
@@ -12,38 +13,62 @@ class LLMService:
         self.base_url = base_url or settings.openai_base_url or os.getenv("OPENAI_BASE_URL")
         self.model = model or settings.openai_model or "gpt-3.5-turbo"
 
+        # Retries and timeouts come from the shared "llm" resilience policy
+        from openai import AsyncOpenAI
         self.client = AsyncOpenAI(
             api_key=self.api_key,
-            base_url=self.base_url
+            base_url=self.base_url,
+            max_retries=0
         )
 
-    async def chat(self, messages: List[Dict[str, str]], stream: bool = False) -> Any:
+    async def chat(self, messages: List[Dict[str, str]], stream: bool = False, use_cache: bool = True) -> Any:
+        # Streams can't be replayed from the completion cache, see stream_chat
+        cache = get_response_cache() if use_cache and not stream else None
+        key = make_cache_key(messages, self.model, kind="completion") if cache else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                stream=stream
+            # A hedged duplicate of a stream would leave the losing response open
+            response = await get_policy("llm").call(
+                lambda: self.client.chat.completions.create(model=self.model, messages=messages, stream=stream),
+                hedge=False if stream else None,
             )
+            if cache:
+                cache.set(key, response)
             return response
         except Exception as e:
             print(f"Error calling LLM: {e}")
             raise e
 
-    async def stream_chat(self, messages: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
+    async def stream_chat(self, messages: List[Dict[str, str]], use_cache: bool = True) -> AsyncGenerator[str, None]:
+        cache = get_response_cache() if use_cache else None
+        key = make_cache_key(messages, self.model, kind="stream") if cache else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                for piece in cached:
+                    yield piece
+                return
         try:
+            pieces = []
             response = await self.chat(messages, stream=True)
             async for chunk in response:
                 if chunk.choices and chunk.choices[0].delta.content:
+                    pieces.append(chunk.choices[0].delta.content)
                     yield chunk.choices[0].delta.content
+            if cache:
+                cache.set(key, pieces)
         except Exception as e:
             print(f"Error streaming LLM: {e}")
             yield f"Error: {str(e)}"
 
-    async def generate_response(self, prompt: str, system_prompt: str = None) -> str:
+    async def generate_response(self, prompt: str, system_prompt: str = None, use_cache: bool = True) -> str:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        response = await self.chat(messages)
+        response = await self.chat(messages, use_cache=use_cache)
         return response.choices[0].message.content
@@ -0,0 +1,336 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import SessionLocal
+from backend.app.models import GlobalMemory, MemoryFact
+from backend.app.api.deps import get_services
+
+COLLECTION = "memories"
+
+# "[2024-01-01 10:00:00] " prefixes written by the old append-only memory tool
+_TIMESTAMP_PREFIX = re.compile(r"^\[\d{4}-\d{2}-\d{2}[^\]]*\]\s*")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def split_facts(content: Optional[str]) -> List[str]:
+    """One fact per non-empty line, legacy timestamps and list bullets stripped."""
+    facts = []
+    for line in (content or "").splitlines():
+        fact = _TIMESTAMP_PREFIX.sub("", line.strip()).lstrip("-* ").strip()
+        if fact:
+            facts.append(fact)
+    return facts
+
+
+class MemoryStore:
+    """
+    Global memory as individual facts, each embedded into the 'memories' collection.
+
+    Writes are deduplicated: an exact repeat only bumps the fact's mention count, and
+    a near duplicate (relevance >= memory_merge_threshold) replaces the older wording.
+    A prompt gets the memory_top_k facts most relevant to the message instead of the
+    whole memory; while there are no more facts than that, all are used without a
+    lookup. Fact texts are kept in process, so a turn costs one similarity search
+    (with multi_worker they are re-read from the database on each use).
+    """
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or SessionLocal
+        self._lock = threading.Lock()  # guards the in-process facts
+        self._write_lock = threading.Lock()  # one writer at a time, so dedup sees every fact
+        self._facts: "Optional[OrderedDict[str, str]]" = None  # id -> content, least recently written first
+        self._unindexed: set = set()
+        self.stats = {"added": 0, "merged": 0, "duplicates": 0, "lookups": 0, "lookups_skipped": 0, "index_failures": 0}
+
+    def _vector_store(self):
+        return get_services().get_vector_store(COLLECTION)
+
+    def _loaded(self) -> "OrderedDict[str, str]":
+        # With several workers, facts written by the others are only in the database
+        reload = get_settings().multi_worker
+        with self._lock:
+            if self._facts is None or reload:
+                self._facts = self._load()
+            return self._facts
+
+    def _load(self) -> "OrderedDict[str, str]":
+        db = self.session_factory()
+        try:
+            legacy = db.query(GlobalMemory).first()
+            if legacy and legacy.content and legacy.content.strip():
+                self._migrate_legacy(db, legacy)
+            rows = db.query(MemoryFact).order_by(MemoryFact.updated_at, MemoryFact.id).all()
+            self._unindexed = {r.id for r in rows if not r.is_indexed}
+            return OrderedDict((r.id, r.content) for r in rows)
+        finally:
+            db.close()
+
+    def _migrate_legacy(self, db, legacy: GlobalMemory):
+        """
+        One-time move from the append-only text blob: one fact per line, exact repeats
+        dropped. The facts are embedded on the next write or lookup.
+        """
+        seen = {_normalize(content) for (content,) in db.query(MemoryFact.content).all()}
+        moved = 0
+        for fact in split_facts(legacy.content):
+            if _normalize(fact) in seen:
+                continue
+            seen.add(_normalize(fact))
+            db.add(MemoryFact(content=fact, source="legacy"))
+            moved += 1
+        legacy.content = ""
+        db.commit()
+        print(f"Moved {moved} global memory lines into memory facts")
+
+    def _index(self, store, facts: List[Tuple[str, str]]) -> bool:
+        try:
+            store.add_documents(
+                [Document(page_content=content, metadata={"fact_id": fact_id}) for fact_id, content in facts],
+                ids=[fact_id for fact_id, _ in facts],
+            )
+        except Exception as e:
+            # Left is_indexed=False and retried on the next write or lookup
+            self.stats["index_failures"] += 1
+            print(f"Failed to index {len(facts)} memory facts: {e}")
+            return False
+
+        ids = [fact_id for fact_id, _ in facts]
+        db = self.session_factory()
+        try:
+            # updated_at orders the facts; being embedded is not a write to them
+            db.query(MemoryFact).filter(MemoryFact.id.in_(ids)).update(
+                {MemoryFact.is_indexed: True, MemoryFact.updated_at: MemoryFact.updated_at}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self._unindexed.difference_update(ids)
+        return True
+
+    def _catch_up(self, store):
+        """Embed facts written while the vector store was unavailable, or migrated from the blob."""
+        with self._lock:
+            pending = [(fact_id, self._facts[fact_id]) for fact_id in self._unindexed if fact_id in self._facts]
+        if pending:
+            self._index(store, pending)
+
+    def _search(self, store, query: str, k: int) -> Optional[List[Tuple[Document, float]]]:
+        try:
+            return store.similarity_search_with_relevance(query, k=k)
+        except Exception as e:
+            print(f"Memory lookup failed: {e}")
+            return None
+
+    def _touch(self, fact_id: str, content: Optional[str] = None) -> bool:
+        """Count another mention of a fact, optionally with newer wording. False if it's gone."""
+        db = self.session_factory()
+        try:
+            fact = db.get(MemoryFact, fact_id)
+            if fact is None:
+                # Deleted by another worker since the facts were loaded
+                with self._lock:
+                    self._facts.pop(fact_id, None)
+                    self._unindexed.discard(fact_id)
+                return False
+            fact.mentions = (fact.mentions or 1) + 1
+            fact.updated_at = datetime.now(timezone.utc)
+            if content is not None:
+                fact.content = content
+                fact.is_indexed = False
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            if content is not None:
+                self._facts[fact_id] = content
+                self._unindexed.add(fact_id)
+            self._facts.move_to_end(fact_id)
+        return True
+
+    def add(self, content: str, source: str = "agent") -> Tuple[str, str]:
+        """Remember a fact. Returns (fact_id, action), action being 'added', 'merged' or 'duplicate'."""
+        content = content.strip()
+        if not content:
+            raise ValueError("Memory fact is empty")
+        normalized = _normalize(content)
+
+        with self._write_lock:
+            facts = self._loaded()
+            with self._lock:
+                duplicate = next((i for i, c in facts.items() if _normalize(c) == normalized), None)
+            if duplicate and self._touch(duplicate):
+                self.stats["duplicates"] += 1
+                return duplicate, "duplicate"
+
+            store = self._vector_store()
+            if store:
+                self._catch_up(store)
+                threshold = get_settings().memory_merge_threshold
+                for doc, score in self._search(store, content, 1) or []:
+                    fact_id = doc.metadata.get("fact_id")
+                    if fact_id in facts and score >= threshold and self._touch(fact_id, content):
+                        self._index(store, [(fact_id, content)])
+                        self.stats["merged"] += 1
+                        return fact_id, "merged"
+
+            db = self.session_factory()
+            try:
+                fact = MemoryFact(content=content, source=source)
+                db.add(fact)
+                db.commit()
+                fact_id = fact.id
+            finally:
+                db.close()
+            with self._lock:
+                facts[fact_id] = content
+                self._unindexed.add(fact_id)
+            if store:
+                self._index(store, [(fact_id, content)])
+            self.stats["added"] += 1
+            return fact_id, "added"
+
+    def delete(self, fact_id: str) -> bool:
+        with self._write_lock:
+            db = self.session_factory()
+            try:
+                deleted = db.query(MemoryFact).filter(MemoryFact.id == fact_id).delete()
+                db.commit()
+            finally:
+                db.close()
+            if not deleted:
+                return False
+            with self._lock:
+                if self._facts is not None:
+                    self._facts.pop(fact_id, None)
+                self._unindexed.discard(fact_id)
+            store = self._vector_store()
+            if store:
+                try:
+                    store.delete([fact_id])
+                except Exception as e:
+                    print(f"Failed to delete memory fact {fact_id} from vector store: {e}")
+            return True
+
+    def replace(self, content: str, source: str = "user") -> int:
+        """
+        Make each line of `content` a fact and forget the rest, in one write. Lines
+        that are already facts are kept as they are; new lines are stored as typed,
+        without near-duplicate merging. Vector writes are one delete and one add.
+        """
+        wanted: "OrderedDict[str, str]" = OrderedDict()
+        for fact in split_facts(content):
+            wanted.setdefault(_normalize(fact), fact)
+
+        with self._write_lock:
+            facts = self._loaded()
+            with self._lock:
+                existing = {_normalize(c): i for i, c in facts.items()}
+            kept = {i for n, i in existing.items() if n in wanted}
+            removed = [i for i in facts if i not in kept]
+
+            db = self.session_factory()
+            try:
+                if removed:
+                    db.query(MemoryFact).filter(MemoryFact.id.in_(removed)).delete(synchronize_session=False)
+                # Facts are ordered by updated_at; keep the order the lines were typed in
+                now = datetime.now(timezone.utc)
+                rows = [
+                    MemoryFact(content=fact, source=source, created_at=now + timedelta(microseconds=n),
+                               updated_at=now + timedelta(microseconds=n))
+                    for n, fact in enumerate(f for key, f in wanted.items() if key not in existing)
+                ]
+                db.add_all(rows)
+                db.commit()
+                added = [(row.id, row.content) for row in rows]
+            finally:
+                db.close()
+
+            with self._lock:
+                for fact_id in removed:
+                    facts.pop(fact_id, None)
+                    self._unindexed.discard(fact_id)
+                for fact_id, fact in added:
+                    facts[fact_id] = fact
+                    self._unindexed.add(fact_id)
+                count = len(facts)
+
+            store = self._vector_store()
+            if store:
+                if removed:
+                    try:
+                        store.delete(removed)
+                    except Exception as e:
+                        print(f"Failed to delete {len(removed)} memory facts from vector store: {e}")
+                if added:
+                    self._index(store, added)
+            self.stats["added"] += len(added)
+            return count
+
+    def facts(self) -> List[MemoryFact]:
+        self._loaded()
+        db = self.session_factory()
+        try:
+            return db.query(MemoryFact).order_by(MemoryFact.updated_at, MemoryFact.id).all()
+        finally:
+            db.close()
+
+    def relevant(self, query: str, k: Optional[int] = None) -> List[str]:
+        """Facts related to `query`, at most k (memory_top_k), least recently written first."""
+        settings = get_settings()
+        k = k or settings.memory_top_k
+        facts = self._loaded()
+        with self._lock:
+            snapshot = list(facts.items())
+        if len(snapshot) <= k:
+            self.stats["lookups_skipped"] += 1
+            return [content for _, content in snapshot]
+
+        store = self._vector_store()
+        hits = None
+        if store:
+            self._catch_up(store)
+            hits = self._search(store, query, k)
+        if hits is None:
+            # Nothing to rank with: the most recently written facts are the best guess
+            return [content for _, content in snapshot[-k:]]
+
+        self.stats["lookups"] += 1
+        matched = {
+            doc.metadata.get("fact_id") for doc, score in hits
+            if score >= settings.memory_min_relevance
+        }
+        # Keep write order so the prompt's memory truncation still drops the oldest first
+        return [content for fact_id, content in snapshot if fact_id in matched]
+
+    def render(self, facts: List[str]) -> str:
+        return "\n".join(f"- {fact}" for fact in facts)
+
+    def clear(self):
+        """Drop the in-process facts; they are reloaded from the database on next use."""
+        with self._lock:
+            self._facts = None
+            self._unindexed = set()
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "facts": len(self._facts) if self._facts is not None else None,
+                "unindexed": len(self._unindexed),
+            }
+
+
+_memory_store = MemoryStore()
+
+def get_memory_store() -> MemoryStore:
+    return _memory_store
@@ -0,0 +1,145 @@
+import asyncio
+from typing import Dict, Optional, Set, List
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import SessionLocal
+from backend.app.models import Chat as ChatModel, Message as MessageModel
+from backend.app.chat.context import TokenCounter
+from backend.app.chat.context_cache import get_context_cache
+from backend.app.api.deps import get_services
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a rolling summary of a conversation between a user and an assistant.
+Merge the new messages into the existing summary. Keep facts, decisions, open questions and user preferences.
+Drop greetings and filler. Write plain prose, no more than {max_tokens} tokens."""
+
+SUMMARY_PROMPT_TEMPLATE = """Existing summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+class ConversationSummarizer:
+    """
+    Folds old, unsummarized messages of a chat into Chat.summary in the background.
+
+    - Runs after a turn has been committed, never on the request path.
+    - At most one run per chat at a time; requests arriving while a run is
+      pending or in progress are coalesced into a single follow-up run.
+    - A semaphore bounds how many chats are summarized concurrently.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"scheduled": 0, "coalesced": 0, "runs": 0, "folded_messages": 0, "failures": 0}
+
+    def schedule(self, chat_id: str):
+        """Request a summarization pass for chat_id. Must be called from the event loop."""
+        settings = get_settings()
+        if not settings.summary_enabled:
+            return
+
+        self.stats["scheduled"] += 1
+        if chat_id in self._tasks:
+            self._dirty.add(chat_id)
+            self.stats["coalesced"] += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(max(settings.summary_max_concurrency, 1))
+            self._loop = loop
+        self._tasks[chat_id] = loop.create_task(self._run(chat_id))
+
+    async def _run(self, chat_id: str):
+        try:
+            # Short debounce so a burst of turns lands in one pass
+            await asyncio.sleep(get_settings().summary_debounce_seconds)
+            while True:
+                self._dirty.discard(chat_id)
+                async with self._semaphore:
+                    try:
+                        await self.summarize(chat_id)
+                    except Exception as e:
+                        self.stats["failures"] += 1
+                        print(f"Summarization failed for chat {chat_id}: {e}")
+                if chat_id not in self._dirty:
+                    break
+        finally:
+            self._tasks.pop(chat_id, None)
+
+    async def wait_idle(self):
+        """Wait until all scheduled summarization runs have finished."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def summarize(self, chat_id: str) -> int:
+        """Fold eligible messages of one chat into its summary. Returns the number folded."""
+        settings = get_settings()
+        loaded = await asyncio.to_thread(self._load_foldable, chat_id, settings.context_recent_messages)
+        if not loaded:
+            return 0
+        summary, foldable = loaded
+        if len(foldable) < settings.summary_min_batch:
+            return 0
+
+        counter = TokenCounter(settings.openai_model)
+        transcript = "\n".join(
+            f"{role}: {counter.truncate(content, settings.tool_output_token_limit)}" for _, role, content in foldable
+        )
+        prompt = SUMMARY_PROMPT_TEMPLATE.format(summary=summary or "(none)", messages=transcript)
+        system_prompt = SUMMARY_SYSTEM_PROMPT.format(max_tokens=settings.summary_max_tokens)
+
+        llm_service = get_services().llm_service
+        if not llm_service:
+            raise RuntimeError("LLM service not available")
+        new_summary = await llm_service.generate_response(prompt, system_prompt=system_prompt)
+
+        folded = await asyncio.to_thread(self._store_summary, chat_id, new_summary, [m[0] for m in foldable])
+        self.stats["runs"] += 1
+        self.stats["folded_messages"] += folded
+        return folded
+
+    def _load_foldable(self, chat_id: str, keep_recent: int):
+        db = SessionLocal()
+        try:
+            chat = db.query(ChatModel).filter(ChatModel.id == chat_id).first()
+            if not chat:
+                return None
+            unsummarized = db.query(MessageModel).filter(
+                MessageModel.chat_id == chat_id,
+                MessageModel.is_summarized == False,
+            ).order_by(MessageModel.created_at.asc()).all()
+            # The newest messages stay verbatim in the prompt, only older ones are folded
+            foldable = unsummarized[:-keep_recent] if keep_recent > 0 else unsummarized
+            return chat.summary, [(m.id, m.role, m.content) for m in foldable]
+        finally:
+            db.close()
+
+    def _store_summary(self, chat_id: str, summary: str, message_ids: List[str]) -> int:
+        db = SessionLocal()
+        try:
+            chat = db.query(ChatModel).filter(ChatModel.id == chat_id).first()
+            if not chat:
+                return 0
+            chat.summary = summary
+            folded = db.query(MessageModel).filter(
+                MessageModel.id.in_(message_ids),
+            ).update({MessageModel.is_summarized: True}, synchronize_session=False)
+            db.commit()
+            # Summary and recent history both changed
+            get_context_cache().invalidate(chat_id)
+            return folded
+        finally:
+            db.close()
+
+
+_summarizer = ConversationSummarizer()
+
+def get_summarizer() -> ConversationSummarizer:
+    return _summarizer
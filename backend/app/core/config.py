@@ -1,7 +1,10 @@
 import json
 import os
+import tempfile
+import threading
+import time
 from pydantic import BaseModel
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load .env file
@@ -18,6 +21,105 @@ class AppSettings(BaseModel):
     embedding_base_url: Optional[str] = None
     chunk_size: int = 1000
     chunk_overlap: int = 200
+    # Prompt assembly (token budget for memory + summary + history + current message)
+    context_token_budget: int = 4000
+    tool_output_token_limit: int = 1000
+    context_recent_messages: int = 10  # newest messages kept verbatim, older ones are summarized
+    context_cache_enabled: bool = True  # keep hot chats' summary/history in process
+    context_cache_max_chats: int = 256
+    # Global memory facts: only the ones relevant to the message go into the prompt
+    memory_top_k: int = 8
+    memory_min_relevance: float = 0.25
+    memory_merge_threshold: float = 0.9  # a new fact this close to an existing one replaces it
+    # Background conversation summarization
+    summary_enabled: bool = True
+    summary_min_batch: int = 4  # fold only once this many messages are eligible
+    summary_max_tokens: int = 500
+    summary_max_concurrency: int = 2
+    summary_debounce_seconds: float = 2.0
+    # Document deletion: chunks removed per vector-store call, background orphan cleanup (0 disables)
+    doc_delete_batch_size: int = 100
+    doc_reconcile_interval_seconds: float = 600.0
+    # Chat history vector indexing
+    chat_index_batch_size: int = 32
+    chat_index_flush_seconds: float = 1.0
+    # LLM response cache (keyed by normalized messages, model and tools)
+    llm_cache_enabled: bool = False
+    llm_cache_ttl_seconds: float = 3600
+    llm_cache_max_entries: int = 512
+    # Start document retrieval alongside the first LLM call when RAG is on
+    speculative_retrieval: bool = False
+    speculative_retrieval_threshold: float = 0.6  # query overlap needed to reuse the prefetched result
+    trace_buffer_size: int = 200
+    # Build services in the background at boot instead of on the first request
+    warmup_enabled: bool = True
+    warmup_collections: List[str] = ["documents", "chats", "memories"]
+    warmup_probe_upstream: bool = False  # also send one embedding request and list models
+    # Cheaper model for tool-selection steps; the main model still writes the answer
+    routing_enabled: bool = False
+    routing_tool_model: Optional[str] = None
+    routing_max_fast_turns: int = 3
+    routing_escalate_prompt_tokens: int = 6000  # longer prompts go straight to the main model
+    # Upstream resilience shared by LLM and embedding calls
+    llm_timeout_seconds: float = 60.0
+    embedding_timeout_seconds: float = 20.0
+    embedding_batch_size: int = 64  # texts per upstream embedding request; each gets its own timeout and retries
+    chat_deadline_seconds: float = 180.0  # whole agent turn, all LLM and tool calls included
+    upstream_max_retries: int = 2
+    upstream_retry_backoff_seconds: float = 0.5
+    hedge_enabled: bool = False  # duplicate a request still running past the recent p95
+    hedge_min_delay_ms: float = 200.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30.0
+    # Changing embedding_model re-embeds these collections into new versions in the background;
+    # the old version serves queries until the new one is complete
+    reembed_on_model_change: bool = True
+    reembed_collections: List[str] = ["documents", "chats", "memories"]
+    reembed_batch_size: int = 64
+    reembed_max_chunks_per_second: float = 50.0  # leaves embedding capacity for live traffic; 0 is unthrottled
+    # Scheduled maintenance (0 disables): stale temp uploads, orphaned chunks, vector index
+    # rebuilds and SQLite VACUUM/ANALYZE
+    maintenance_interval_seconds: float = 86400.0
+    maintenance_collections: List[str] = ["documents", "chats", "memories"]
+    maintenance_rebuild_dead_ratio: float = 0.3  # rebuild an index once this share of its entries are deleted
+    maintenance_temp_max_age_seconds: float = 3600.0  # younger temp uploads may still be parsing
+    # Multi-worker deployment (uvicorn --workers N): vector collections are served by one
+    # Chroma server process instead of each worker opening ./chroma_db, and config.json
+    # changes made by any worker are picked up by the others within config_poll_seconds
+    vector_store_host: Optional[str] = None  # unset: embedded Chroma persisted to ./chroma_db
+    vector_store_port: int = 8001
+    multi_worker: bool = False  # skip in-process caches of database rows other workers may change
+    config_poll_seconds: float = 1.0  # 0 disables watching config.json
+    leader_lease_seconds: float = 30.0  # a stopped worker's background jobs move to another one after this
+
+def component_inputs(settings: AppSettings) -> Dict[str, tuple]:
+    """
+    What each long-lived service is built from. Everything else is read from the
+    settings on every use, so changing it needs no rebuild.
+    """
+    return {
+        "llm": (settings.openai_api_key, settings.openai_base_url, settings.openai_model),
+        # Vector stores embed with these; empty embedding credentials fall back to the OpenAI ones
+        "embeddings": (
+            settings.embedding_api_key or settings.openai_api_key,
+            settings.embedding_base_url or settings.openai_base_url,
+            settings.embedding_model,
+        ),
+        "vector_store": (settings.vector_store_host, settings.vector_store_port),
+    }
+
+_listeners: List[Callable[[dict], None]] = []
+
+def on_config_change(callback: Callable[[dict], None]):
+    """Call `callback` with the diff when another process rewrites config.json."""
+    _listeners.append(callback)
+
+def _file_version() -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
 
 class ConfigManager:
     _instance = None
@@ -30,14 +132,15 @@ class ConfigManager:
         return cls._instance
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self._version = _file_version()
+        self._checked_at = time.monotonic()
         self._settings = self._load_config()
 
     def _load_config(self) -> AppSettings:
         if os.path.exists(CONFIG_FILE):
             try:
-                with open(CONFIG_FILE, "r") as f:
-                    data = json.load(f)
-                    return AppSettings(**data)
+                return self._read_config()
             except Exception as e:
                 print(f"Error loading config: {e}")
                 return AppSettings()
@@ -49,16 +152,69 @@ class ConfigManager:
             openai_model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
         )
 
-    def save_config(self, settings: AppSettings):
-        self._settings = settings
-        with open(CONFIG_FILE, "w") as f:
-            f.write(settings.model_dump_json(indent=2))
+    def _read_config(self) -> AppSettings:
+        with open(CONFIG_FILE, "r") as f:
+            return AppSettings(**json.load(f))
+
+    def save_config(self, settings: AppSettings) -> dict:
+        """Persist new settings; returns what changed (see diff)."""
+        with self._lock:
+            changes = self.diff(self._settings, settings)
+            self._settings = settings
+            # Written to a temp file and renamed, so other workers never read half a file
+            directory = os.path.dirname(os.path.abspath(CONFIG_FILE))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".config-", suffix=".json")
+            with os.fdopen(fd, "w") as f:
+                f.write(settings.model_dump_json(indent=2))
+            os.replace(temp_path, CONFIG_FILE)
+            self._version = _file_version()
+        return changes
+
+    def _refresh(self):
+        """Reload config.json if another process rewrote it since it was last read."""
+        poll = self._settings.config_poll_seconds
+        now = time.monotonic()
+        if poll <= 0 or now - self._checked_at < poll:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = _file_version()
+            if version is None or version == self._version:
+                return
+            self._version = version
+            try:
+                settings = self._read_config()
+            except Exception as e:
+                # A typo or a file still being written: keep serving with the settings we have
+                print(f"Error reloading config, keeping current settings: {e}")
+                return
+            old, self._settings = self._settings, settings
+            changes = self.diff(old, self._settings)
+        if not changes["fields"]:
+            return
+        print(f"Config reloaded from {CONFIG_FILE}: {', '.join(changes['fields'])}")
+        for callback in list(_listeners):
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"Config change listener failed: {e}")
+
+    @staticmethod
+    def diff(old: Optional[AppSettings], new: AppSettings) -> dict:
+        """Changed field names, and the services whose inputs changed with them."""
+        old = old or AppSettings()
+        old_values, new_values = old.model_dump(), new.model_dump()
+        fields = sorted(k for k in new_values if old_values.get(k) != new_values[k])
+        old_inputs, new_inputs = component_inputs(old), component_inputs(new)
+        components = sorted(name for name in new_inputs if old_inputs[name] != new_inputs[name])
+        return {"fields": fields, "components": components}
 
     def get_settings(self) -> AppSettings:
+        self._refresh()
         return self._settings
 
 def get_settings() -> AppSettings:
     return ConfigManager.get_instance().get_settings()
 
-def save_settings(settings: AppSettings):
-    ConfigManager.get_instance().save_config(settings)
+def save_settings(settings: AppSettings) -> dict:
+    return ConfigManager.get_instance().save_config(settings)
@@ -1,13 +1,39 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./info_get.db"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./info_get.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# Applied to every new connection, sync and async
+SQLITE_PRAGMAS = (
+    ("journal_mode", "WAL"),   # readers and the single writer no longer block each other
+    ("synchronous", "NORMAL"), # fsync at checkpoints only, still crash-safe under WAL
+    ("busy_timeout", "5000"),  # wait up to 5s for the write lock instead of "database is locked"
+    ("cache_size", "-20000"),  # ~20 MB page cache per connection
+    ("temp_store", "MEMORY"),
 )
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def configure_sqlite(engine):
+    """Run SQLITE_PRAGMAS on each connection the engine opens; accepts sync and async engines."""
+    event.listen(getattr(engine, "sync_engine", engine), "connect", apply_sqlite_pragmas)
+    return engine
+
+engine = configure_sqlite(create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async routes (chat, file ingest) use aiosqlite so queries don't block the event loop
+async_engine = configure_sqlite(create_async_engine(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,3 +42,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
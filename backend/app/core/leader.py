@@ -0,0 +1,102 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from backend.app.core.config import get_settings
+from backend.app.models import Lease
+
+
+class Leader:
+    """
+    Runs `on_elected` in one worker only, however many uvicorn started.
+
+    Workers compete for a row in the leases table: the holder renews it every third
+    of leader_lease_seconds, and when it stops renewing (shut down or crashed) the
+    next worker to try after it expires takes over. A shutdown releases the lease
+    right away. Losing the lease without shutting down, e.g. while the database was
+    unreachable, runs `on_deposed`.
+    """
+
+    def __init__(self, name: str, engine: Engine, on_elected: Callable[[], None], on_deposed: Callable[[], None]):
+        self.name = name
+        self.engine = engine
+        self.on_elected = on_elected
+        self.on_deposed = on_deposed
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; True while this worker holds it."""
+        now = time.time()
+        expires_at = now + get_settings().leader_lease_seconds
+        leases = Lease.__table__
+        try:
+            with self.engine.begin() as conn:
+                taken = conn.execute(
+                    update(leases)
+                    .where(leases.c.name == self.name, or_(leases.c.holder == self.holder, leases.c.expires_at < now))
+                    .values(holder=self.holder, expires_at=expires_at)
+                ).rowcount
+                if not taken and conn.execute(leases.select().where(leases.c.name == self.name)).first() is None:
+                    conn.execute(leases.insert().values(name=self.name, holder=self.holder, expires_at=expires_at))
+                    taken = 1
+        except IntegrityError:
+            taken = 0  # inserted concurrently by another worker
+        return bool(taken)
+
+    def release(self):
+        leases = Lease.__table__
+        with self.engine.begin() as conn:
+            conn.execute(update(leases).where(leases.c.name == self.name, leases.c.holder == self.holder).values(expires_at=0))
+
+    def _check(self):
+        with self._lock:
+            if self._stop.is_set():
+                return
+            try:
+                elected = self.try_acquire()
+            except Exception as e:
+                print(f"Lease '{self.name}' not renewed: {e}")
+                elected = False
+            if elected and not self.is_leader:
+                self.is_leader = True
+                print(f"Worker {self.holder} took the '{self.name}' lease")
+                self.on_elected()
+            elif not elected and self.is_leader:
+                self.is_leader = False
+                print(f"Worker {self.holder} lost the '{self.name}' lease")
+                self.on_deposed()
+
+    def start(self):
+        """Try once now, so a single worker starts its jobs with the app, then keep trying."""
+        self._stop.clear()
+        self._check()
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            if not self.is_leader:
+                return
+            self.is_leader = False
+            self.on_deposed()
+            try:
+                self.release()
+            except Exception as e:
+                print(f"Lease '{self.name}' not released: {e}")
+
+    def _run(self):
+        while not self._stop.wait(max(get_settings().leader_lease_seconds / 3, 0.01)):
+            self._check()
@@ -0,0 +1,344 @@
+import sys
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.app.core.config import AppSettings, get_settings
+
+
+class CircuitOpenError(Exception):
+    """The upstream has been failing; calls are rejected without being attempted."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's overall deadline ran out."""
+
+
+# Absolute time.monotonic() by which the current request must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+def set_deadline(seconds: Optional[float]):
+    """Start a deadline for the current request; nested calls inherit it through the context."""
+    return _deadline.set(time.monotonic() + seconds if seconds else None)
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    token = set_deadline(seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def _status(e: BaseException) -> Optional[int]:
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _transport_errors() -> tuple:
+    errors = [TimeoutError, ConnectionError]
+    # Only clients already imported can have raised; importing them here would cost a second
+    openai, httpx = sys.modules.get("openai"), sys.modules.get("httpx")
+    if openai is not None:
+        errors.append(openai.APIConnectionError)  # APITimeoutError too
+    if httpx is not None:
+        errors.append(httpx.TransportError)
+    return tuple(errors)
+
+
+def is_retryable(e: BaseException) -> bool:
+    """Transport errors, timeouts, 408, 429 and 5xx are worth retrying; other 4xx are not."""
+    if isinstance(e, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    status = _status(e)
+    if status is not None:
+        return status in (408, 429) or status >= 500
+    return isinstance(e, _transport_errors())
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures.
+
+    While open every call fails fast. After reset_seconds one trial call is let
+    through (half-open): success closes the breaker, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self.stats = {"rejected": 0, "opened": 0}
+
+    def before_call(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_started = None
+            # A trial that never reported back (e.g. cancelled) stops blocking after reset_seconds
+            trial_busy = self._trial_started is not None and now - self._trial_started < self.reset_seconds
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and trial_busy):
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is open, failing fast")
+            if self.state == self.HALF_OPEN:
+                self._trial_started = now
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats["opened"] += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_started = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def info(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0), 1)
+            return {"state": self.state, "consecutive_failures": self.failures, "retry_in_seconds": retry_in, **self.stats}
+
+
+class ResiliencePolicy:
+    """
+    Timeouts, jittered retries, hedging and a circuit breaker around one kind of upstream call.
+
+    Each attempt gets min(timeout, time left on the request deadline). With hedging
+    on, an attempt still running after the recent p95 latency gets a duplicate
+    request and whichever answers first wins.
+    """
+
+    HEDGE_MIN_SAMPLES = 20
+
+    def __init__(self, name: str, timeout: float = 60.0, max_retries: int = 2, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, hedge: bool = False, hedge_min_delay_ms: float = 200.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.breaker = breaker or CircuitBreaker(name)
+        self._latencies: List[float] = []
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "hedged": 0, "hedge_wins": 0, "failures": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _record_latency(self, elapsed_ms: float):
+        with self._lock:
+            self._latencies.append(elapsed_ms)
+            if len(self._latencies) > 200:
+                del self._latencies[0]
+
+    def p95_ms(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def _hedge_delay(self, hedge: Optional[bool]) -> Optional[float]:
+        if not (self.hedge if hedge is None else hedge):
+            return None
+        p95 = self.p95_ms()
+        return None if p95 is None else max(p95, self.hedge_min_delay_ms) / 1000
+
+    def _attempt_timeout(self) -> float:
+        left = remaining_time()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded before calling '{self.name}'")
+        return self.timeout if left is None else min(self.timeout, left)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from a burst of failed requests from arriving together
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        left = remaining_time()
+        return delay if left is None else max(min(delay, left), 0.0)
+
+    def _failed(self, e: BaseException, attempt: int) -> bool:
+        """Book a failed attempt; True when another attempt should follow."""
+        if isinstance(e, TimeoutError):
+            self._count("timeouts")
+        if not is_retryable(e):
+            if _status(e) is not None:
+                # The upstream answered, it just rejected this request: that counts as healthy
+                self.breaker.record_success()
+            # Anything else (a bug in our own code, a parser error) says nothing about the upstream
+            return False
+        self.breaker.record_failure()
+        if attempt >= self.max_retries or self.breaker.is_open:
+            return False
+        left = remaining_time()
+        if left is not None and left <= 0:
+            return False
+        self._count("retries")
+        return True
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], hedge: Optional[bool] = None) -> Any:
+        """Run the coroutine factory fn under this policy; hedge=False for calls that must not be duplicated."""
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            timeout = self._attempt_timeout()
+            self.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                result = await self._attempt(fn, timeout, self._hedge_delay(hedge))
+            except Exception as e:
+                if not self._failed(e, attempt):
+                    self._count("failures")
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            self._record_latency((time.perf_counter() - started) * 1000)
+            return result
+
+    async def _attempt(self, fn, timeout: float, hedge_delay: Optional[float]) -> Any:
+        self._count("attempts")
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        tasks = [asyncio.ensure_future(fn())]
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    self._count("hedged")
+                    tasks.append(asyncio.ensure_future(fn()))
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=end - loop.time(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError(f"'{self.name}' call timed out after {timeout:.1f}s")
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def call_sync(self, fn: Callable[..., Any], *args, hedge: Optional[bool] = None, **kwargs) -> Any:
+        """Blocking counterpart of call() for sync clients such as embeddings."""
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            timeout = self._attempt_timeout()
+            self.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                result = self._attempt_sync(fn, args, kwargs, timeout, self._hedge_delay(hedge))
+            except Exception as e:
+                if not self._failed(e, attempt):
+                    self._count("failures")
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            self._record_latency((time.perf_counter() - started) * 1000)
+            return result
+
+    def _attempt_sync(self, fn, args, kwargs, timeout: float, hedge_delay: Optional[float]) -> Any:
+        # Threads can't be cancelled: a timed-out attempt keeps running in the pool, we just stop waiting
+        self._count("attempts")
+        end = time.monotonic() + timeout
+        submit = lambda: _executor.submit(copy_context().run, fn, *args, **kwargs)
+        futures = [submit()]
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = wait_futures(futures, timeout=hedge_delay)
+            if not done:
+                self._count("hedged")
+                futures.append(submit())
+
+        pending, error = set(futures), None
+        while pending:
+            done, pending = wait_futures(pending, timeout=max(end - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"'{self.name}' call timed out after {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def configure(self, timeout: float, settings: AppSettings):
+        self.timeout = timeout
+        self.max_retries = settings.upstream_max_retries
+        self.backoff_base = settings.upstream_retry_backoff_seconds
+        self.hedge = settings.hedge_enabled
+        self.hedge_min_delay_ms = settings.hedge_min_delay_ms
+        self.breaker.failure_threshold = settings.breaker_failure_threshold
+        self.breaker.reset_seconds = settings.breaker_reset_seconds
+
+    def info(self) -> dict:
+        p95 = self.p95_ms()
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            "breaker": self.breaker.info(),
+            **stats,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "hedging": self.hedge,
+        }
+
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="resilience")
+_policies: Dict[str, ResiliencePolicy] = {}
+_policies_lock = threading.Lock()
+
+def get_policy(name: str) -> ResiliencePolicy:
+    """Shared policy per upstream ("llm", "embedding"), kept in sync with the current settings."""
+    settings = get_settings()
+    timeout = settings.embedding_timeout_seconds if name == "embedding" else settings.llm_timeout_seconds
+    with _policies_lock:
+        if name not in _policies:
+            _policies[name] = ResiliencePolicy(name)
+        policy = _policies[name]
+    policy.configure(timeout, settings)
+    return policy
+
+def resilience_stats() -> dict:
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {policy.name: policy.info() for policy in policies}
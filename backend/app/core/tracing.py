@@ -0,0 +1,134 @@
+import time
+import uuid
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from backend.app.core.config import get_settings
+
+
+class Span:
+    def __init__(self, name: str, offset_ms: float, attrs: Dict[str, Any]):
+        self.name = name
+        self.offset_ms = offset_ms
+        self.duration_ms: Optional[float] = None
+        self.attrs = attrs
+        self.error: Optional[str] = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "offset_ms": round(self.offset_ms, 2),
+            "duration_ms": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            **({"error": self.error} if self.error else {}),
+            **self.attrs,
+        }
+
+
+class Trace:
+    """Timeline of one request: spans are recorded relative to the trace start."""
+
+    def __init__(self, name: str, **attrs):
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.attrs = attrs
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        span = Span(name, (time.perf_counter() - self._start) * 1000, attrs)
+        with self._lock:
+            self.spans.append(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def finish(self):
+        if self.duration_ms is None:
+            self.duration_ms = self.elapsed_ms()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = [s.to_dict() for s in self.spans]
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms if self.duration_ms is not None else self.elapsed_ms(), 2),
+            **self.attrs,
+            "spans": spans,
+        }
+
+
+class TraceBuffer:
+    """Bounded in-memory store of finished traces, newest last."""
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces: deque = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def resize(self, max_traces: int):
+        with self._lock:
+            self.max_traces = max_traces
+            self._traces = deque(self._traces, maxlen=max_traces)
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def list(self, limit: int = 50, name: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            traces = [t for t in self._traces if name is None or t.name == name]
+        return [t.to_dict() for t in reversed(traces[-limit:])]
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        with self._lock:
+            for trace in self._traces:
+                if trace.id == trace_id:
+                    return trace.to_dict()
+        return None
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_trace_buffer = TraceBuffer()
+
+def get_trace_buffer() -> TraceBuffer:
+    size = get_settings().trace_buffer_size
+    if _trace_buffer.max_traces != size:
+        _trace_buffer.resize(size)
+    return _trace_buffer
+
+def set_current_trace(trace: Optional[Trace]):
+    return _current_trace.set(trace)
+
+def get_current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def trace_span(name: str, **attrs):
+    """Span on the current request's trace; a no-op outside a traced request."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attrs) as span:
+        yield span
@@ -1,4 +1,7 @@
-from pypdf import PdfReader
+def PdfReader(file_path: str):
+    """pypdf.PdfReader, imported with the first PDF rather than at startup."""
+    from pypdf import PdfReader as _PdfReader
+    return _PdfReader(file_path)
 
 class FileLoader:
     def load_markdown(self, file_path: str) -> str:
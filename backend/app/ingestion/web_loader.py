@@ -1,8 +1,8 @@
-import requests
-from bs4 import BeautifulSoup
-
 class WebLoader:
     def load(self, url: str) -> str:
+        import requests
+        from bs4 import BeautifulSoup
+
         response = requests.get(url)
         if response.status_code != 200:
             raise Exception(f"Failed to load URL: {url}")
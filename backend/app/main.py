@@ -1,13 +1,46 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.core.database import engine, Base
-from backend.app.api.routers import chat, documents, ingest, settings, retrieval, chats, memory
+from backend.app.api.routers import chat, documents, ingest, settings, retrieval, chats, memory, metrics, usage, history, maintenance, snapshot
 import backend.app.models  # Ensure models are registered
+from backend.app.rag.deletion import get_reconciler
+from backend.app.rag.reembed import get_reembedder
+from backend.app.rag.maintenance import get_maintenance
+from backend.app.api.warmup import get_readiness, warm_up
+from backend.app.core.config import get_settings
+from backend.app.core.leader import Leader
+
+def start_background_jobs():
+    get_reconciler().start()
+    get_reembedder().resume()
+    get_maintenance().start()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+def stop_background_jobs():
+    get_reconciler().stop()
+    get_reembedder().stop()
+    get_maintenance().stop()
 
-app = FastAPI(title="Info-Get API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables at startup rather than import, so importing the app stays cheap
+    Base.metadata.create_all(bind=engine)
+    # Services warm up in the background; requests are served meanwhile and /ready tells when it's done
+    warmup = asyncio.create_task(warm_up()) if get_settings().warmup_enabled else None
+    if warmup is None:
+        get_readiness().reset([])
+        get_readiness().finish()
+    # With several uvicorn workers, only the one holding the lease runs the background jobs
+    leader = Leader("background-jobs", engine, start_background_jobs, stop_background_jobs)
+    leader.start()
+    yield
+    leader.stop()
+    if warmup and not warmup.done():
+        warmup.cancel()
+
+app = FastAPI(title="Info-Get API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +48,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
@@ -24,7 +58,20 @@ app.include_router(settings.router, prefix="/api/settings", tags=["settings"])
 app.include_router(retrieval.router, prefix="/api", tags=["retrieval"]) # Mounts /api/search
 app.include_router(chats.router, prefix="/api/chats", tags=["chats"])
 app.include_router(memory.router, prefix="/api/memory", tags=["memory"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(usage.router, prefix="/api/usage", tags=["usage"])
+app.include_router(history.router, prefix="/api/history", tags=["history"])
+app.include_router(maintenance.router, prefix="/api/maintenance", tags=["maintenance"])
+app.include_router(snapshot.router, prefix="/api/snapshot", tags=["snapshot"])
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Info-Get API"}
+
+@app.get("/ready")
+def read_ready(response: Response):
+    """Per-component warmup state and timing; 503 until every component is ready."""
+    report = get_readiness().report()
+    if report["status"] != "ready":
+        response.status_code = 503
+    return report
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Boolean, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, Boolean, Integer, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime, timezone
@@ -8,11 +8,27 @@ class Document(Base):
     __tablename__ = "documents"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    name = Column(String, index=True)
+    name = Column(String)  # indexed with id below
     source = Column(String)
-    type = Column(String)  # 'file' or 'url'
+    type = Column(String, index=True)  # 'file' or 'url'
+    status = Column(String, default="active", index=True)  # 'active' or 'deleting' (chunks not purged yet)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
+    # Recorded at ingest so listings and stats never scan the vector store; 0 for older documents
+    byte_size = Column(Integer, default=0)  # uploaded file size, or extracted text size for URLs
+    char_count = Column(Integer, default=0)
+    chunk_count = Column(Integer, default=0)
+    embedding_model = Column(String, nullable=True, index=True)  # list filter
+    ingest_ms = Column(Float, nullable=True)  # parse + split + embed
+
+    # Sort keys of the document list, id breaks ties for keyset pagination
+    __table_args__ = (
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        Index("ix_documents_name_id", "name", "id"),
+        Index("ix_documents_byte_size_id", "byte_size", "id"),
+        Index("ix_documents_chunk_count_id", "chunk_count", "id"),
+    )
+
 class Chat(Base):
     __tablename__ = "chats"
 
@@ -24,6 +40,9 @@ class Chat(Base):
     
     messages = relationship("Message", back_populates="chat", cascade="all, delete-orphan")
 
+    # Chat list ordering and keyset pagination (id breaks ties)
+    __table_args__ = (Index("ix_chats_updated_at_id", "updated_at", "id"),)
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -32,14 +51,66 @@ class Message(Base):
     role = Column(String) # 'user', 'assistant', 'system'
     content = Column(Text)
     thought_steps = Column(Text, nullable=True) # JSON string of thought steps
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
     is_summarized = Column(Boolean, default=False)
+    is_indexed = Column(Boolean, default=False, index=True) # embedded into the 'chats' vector collection
+
+    # Turn accounting, filled in on assistant messages
+    model = Column(String, nullable=True, index=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    agent_iterations = Column(Integer, nullable=True)
+    tool_calls = Column(Integer, nullable=True)
+    latency_ms = Column(Float, nullable=True)
+    # Share of the totals above spent on the tool-selection model, when the turn was routed
+    tool_model = Column(String, nullable=True, index=True)
+    tool_prompt_tokens = Column(Integer, nullable=True)
+    tool_completion_tokens = Column(Integer, nullable=True)
+    tool_iterations = Column(Integer, nullable=True)
+    tool_latency_ms = Column(Float, nullable=True)
     
     chat = relationship("Chat", back_populates="messages")
 
+    # History of one chat in time order: context loading and keyset pagination
+    __table_args__ = (Index("ix_messages_chat_id_created_at_id", "chat_id", "created_at", "id"),)
+
 class GlobalMemory(Base):
     __tablename__ = "global_memory"
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text)
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class MemoryFact(Base):
+    """One remembered fact about the user, embedded into the 'memories' vector collection."""
+    __tablename__ = "memory_facts"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    content = Column(Text)
+    source = Column(String, default="agent")  # 'agent', 'user' or 'legacy'
+    mentions = Column(Integer, default=1)  # writes deduplicated or merged into this fact
+    is_indexed = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class CollectionVersion(Base):
+    """Which version of a vector collection serves queries, and the embedding model its vectors came from."""
+    __tablename__ = "collection_versions"
+
+    name = Column(String, primary_key=True)  # logical collection: 'documents', 'chats', 'memories'
+    version = Column(Integer, default=0)  # 0 is the unversioned collection from before versioning
+    embedding_model = Column(String)
+    # Also receives deletes while a re-embed moves the collection: the new version while it
+    # is copied, then the replaced one until it is dropped, so neither brings deleted chunks back
+    shadow_version = Column(Integer, nullable=True)
+    # Chunks deleted from the active version: its index keeps them as tombstones until a rebuild
+    deleted_chunks = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class Lease(Base):
+    """A role only one worker may hold at a time, such as running the background jobs (see core.leader)."""
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String)  # host:pid:nonce of the worker holding it
+    expires_at = Column(Float)  # time.time() after which another worker may take it over
@@ -0,0 +1,169 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import SessionLocal
+from backend.app.models import Document
+from backend.app.api.deps import get_services
+
+ACTIVE = "active"
+DELETING = "deleting"
+
+
+def _batches(items: List[str], size: int):
+    for start in range(0, len(items), max(size, 1)):
+        yield items[start:start + size]
+
+
+def _purge(db: Session, store, doc_ids: List[str], batch_size: int) -> int:
+    """Phase two: drop chunks per batch, then the rows of that batch. Returns rows deleted."""
+    if not doc_ids:
+        return 0
+    if store is None:
+        print(f"Vector store not available, {len(doc_ids)} document deletions left pending")
+        return 0
+    deleted = 0
+    for batch in _batches(doc_ids, batch_size):
+        try:
+            store.delete_documents(batch)
+        except Exception as e:
+            # Rows stay marked 'deleting'; the reconciler retries them
+            print(f"Failed to delete chunks of {len(batch)} documents: {e}")
+            continue
+        deleted += db.query(Document).filter(
+            Document.id.in_(batch), Document.status == DELETING,
+        ).delete(synchronize_session=False)
+        db.commit()
+    return deleted
+
+
+def delete_documents(db: Session, store, doc_ids: List[str], batch_size: Optional[int] = None) -> Dict:
+    """
+    Two-phase delete of many documents.
+
+    Rows are first marked 'deleting' in one commit, which hides them from listings.
+    Chunks are then removed from the vector store batch_size documents per call, and
+    a batch's rows are dropped only once its chunks are gone, so a failure never
+    leaves searchable chunks without a row pointing at them.
+    """
+    batch_size = batch_size or get_settings().doc_delete_batch_size
+    requested = list(dict.fromkeys(doc_ids))
+    found = set()
+    for batch in _batches(requested, 500):
+        found.update(i for (i,) in db.query(Document.id).filter(Document.id.in_(batch)).all())
+    ids = [i for i in requested if i in found]
+
+    for batch in _batches(ids, 500):
+        db.query(Document).filter(Document.id.in_(batch)).update(
+            {Document.status: DELETING}, synchronize_session=False
+        )
+    db.commit()
+
+    deleted = _purge(db, store, ids, batch_size)
+    return {
+        "deleted": deleted,
+        "pending": len(ids) - deleted,
+        "not_found": [i for i in requested if i not in found],
+    }
+
+
+class DocumentReconciler:
+    """
+    Keeps SQLite and the 'documents' vector collection consistent.
+
+    Each run finishes deletes left in the 'deleting' state, then scans chunk metadata
+    for doc_ids with no document row and purges those chunks. Runs every
+    doc_reconcile_interval_seconds on a daemon thread, or on demand.
+    """
+
+    def __init__(self):
+        self._run_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {
+            "runs": 0,
+            "resumed_deletes": 0,
+            "orphan_documents": 0,
+            "orphan_chunks": 0,
+            "failures": 0,
+            "last_run_at": None,
+            "last_run_seconds": 0.0,
+        }
+
+    def run_once(self, scan_batch: int = 1000) -> Dict:
+        with self._run_lock:
+            started = time.perf_counter()
+            store = get_services().vector_store
+            if store is None:
+                raise RuntimeError("Vector store not available.")
+            batch_size = get_settings().doc_delete_batch_size
+
+            db = SessionLocal()
+            try:
+                pending = [i for (i,) in db.query(Document.id).filter(Document.status == DELETING).all()]
+                resumed = _purge(db, store, pending, batch_size)
+
+                known = {i for (i,) in db.query(Document.id).all()}
+                candidates: Dict[str, int] = {}
+                for page in store.iter_metadata(scan_batch):
+                    for _, metadata in page:
+                        doc_id = (metadata or {}).get("doc_id")
+                        if doc_id and doc_id not in known:
+                            candidates[doc_id] = candidates.get(doc_id, 0) + 1
+
+                # A document ingested during the scan commits its row before adding chunks,
+                # so checking again now keeps its chunks from being taken for orphans
+                for batch in _batches(list(candidates), 500):
+                    for (doc_id,) in db.query(Document.id).filter(Document.id.in_(batch)).all():
+                        candidates.pop(doc_id, None)
+            finally:
+                db.close()
+
+            orphans = list(candidates)
+            for batch in _batches(orphans, batch_size):
+                store.delete_documents(batch)
+
+            report = {
+                "resumed_deletes": resumed,
+                "still_pending": len(pending) - resumed,
+                "orphan_documents": len(orphans),
+                "orphan_chunks": sum(candidates.values()),
+            }
+            self.stats["runs"] += 1
+            self.stats["resumed_deletes"] += resumed
+            self.stats["orphan_documents"] += len(orphans)
+            self.stats["orphan_chunks"] += report["orphan_chunks"]
+            self.stats["last_run_at"] = datetime.now(timezone.utc).isoformat()
+            self.stats["last_run_seconds"] = round(time.perf_counter() - started, 4)
+            return report
+
+    def start(self):
+        if get_settings().doc_reconcile_interval_seconds <= 0:
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="document-reconciler", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(max(get_settings().doc_reconcile_interval_seconds, 1.0)):
+            try:
+                report = self.run_once()
+                if report["orphan_chunks"] or report["resumed_deletes"]:
+                    print(f"Document reconciler: {report}")
+            except Exception as e:
+                self.stats["failures"] += 1
+                print(f"Document reconciler failed: {e}")
+
+
+_reconciler = DocumentReconciler()
+
+def get_reconciler() -> DocumentReconciler:
+    return _reconciler
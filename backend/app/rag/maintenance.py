@@ -0,0 +1,241 @@
+import os
+import re
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import engine as default_engine
+from backend.app.api.deps import get_container
+from backend.app.rag.deletion import get_reconciler
+from backend.app.rag.reembed import get_reembedder
+from backend.app.rag.store import DEFAULT_PERSIST_DIRECTORY
+
+# Uploads are parsed from temp_<uuid><ext> in the working directory (see ingest_file)
+TEMP_UPLOAD = re.compile(r"^temp_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(\.\w+)?$")
+
+# Read by the app on every listing; timed before and after VACUUM/ANALYZE
+PROBE_QUERIES = (
+    "SELECT id FROM documents WHERE status = 'active' ORDER BY created_at DESC, id DESC LIMIT 50",
+    "SELECT id FROM chats ORDER BY updated_at DESC, id DESC LIMIT 50",
+    "SELECT count(*) FROM messages",
+)
+
+
+def _file_bytes(*paths: str) -> int:
+    return sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += _file_bytes(*(os.path.join(root, f) for f in files))
+    return total
+
+
+class MaintenanceRunner:
+    """
+    Reclaims space that ingests and deletes leave behind.
+
+    Each run removes temp upload files older than maintenance_temp_max_age_seconds,
+    purges orphaned chunks (the document reconciler), rebuilds vector indexes whose
+    deleted share reached maintenance_rebuild_dead_ratio (the replaced index is
+    dropped once every worker has moved off it), and runs VACUUM and
+    ANALYZE on the app's SQLite database. The report gives the bytes reclaimed and query
+    latency before and after. Runs every maintenance_interval_seconds on a daemon
+    thread, or on demand.
+    """
+
+    def __init__(self, engine: Engine = None, temp_dir: str = ".", vector_dir: str = None):
+        self.engine = engine or default_engine
+        self.temp_dir = temp_dir
+        self.vector_dir = vector_dir  # embedded Chroma's directory, by default DEFAULT_PERSIST_DIRECTORY
+        self._run_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_report: Optional[Dict] = None
+        self.stats = {
+            "runs": 0,
+            "failures": 0,
+            "reclaimed_bytes": 0,
+            "temp_files_removed": 0,
+            "indexes_rebuilt": 0,
+            "last_run_at": None,
+            "last_run_seconds": 0.0,
+        }
+
+    def run_once(self) -> Dict:
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError("Maintenance is already running")
+        try:
+            started = time.perf_counter()
+            settings = get_settings()
+            report = {"started_at": datetime.now(timezone.utc).isoformat()}
+            report["temp_files"] = self._remove_temp_files(settings.maintenance_temp_max_age_seconds)
+            report["orphans"] = self._purge_orphans()
+
+            # Embedded Chroma only; a server manages its own storage
+            vector_dir = None if settings.vector_store_host else (self.vector_dir or DEFAULT_PERSIST_DIRECTORY)
+            vector_bytes = _dir_bytes(vector_dir) if vector_dir else None
+            report["collections"] = {
+                name: self._compact_collection(name, settings.maintenance_rebuild_dead_ratio)
+                for name in settings.maintenance_collections
+            }
+            report["vector_store"] = self._measure_vector_store(vector_dir, vector_bytes)
+            report["sqlite"] = self._vacuum_database()
+
+            reclaimed = report["temp_files"]["bytes"] + sum(
+                part.get("reclaimed_bytes", 0) for part in (report["vector_store"], report["sqlite"])
+            )
+            report["reclaimed_bytes"] = reclaimed
+            report["seconds"] = round(time.perf_counter() - started, 4)
+
+            self.stats["runs"] += 1
+            self.stats["reclaimed_bytes"] += reclaimed
+            self.stats["temp_files_removed"] += report["temp_files"]["removed"]
+            self.stats["indexes_rebuilt"] += sum(1 for c in report["collections"].values() if c.get("rebuilt"))
+            self.stats["last_run_at"] = report["started_at"]
+            self.stats["last_run_seconds"] = report["seconds"]
+            self.last_report = report
+            return report
+        finally:
+            self._run_lock.release()
+
+    def _remove_temp_files(self, max_age: float) -> Dict:
+        """Uploads left by ingests that crashed before their cleanup; recent ones may still be in use."""
+        removed, freed = 0, 0
+        cutoff = time.time() - max_age
+        for entry in os.scandir(self.temp_dir):
+            if not entry.is_file() or not TEMP_UPLOAD.match(entry.name):
+                continue
+            try:
+                stat = entry.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                os.remove(entry.path)
+            except OSError as e:
+                print(f"Failed to remove temp file {entry.name}: {e}")
+                continue
+            removed += 1
+            freed += stat.st_size
+        return {"removed": removed, "bytes": freed}
+
+    def _purge_orphans(self) -> Dict:
+        try:
+            return get_reconciler().run_once()
+        except Exception as e:
+            print(f"Maintenance orphan cleanup failed: {e}")
+            return {"error": str(e)}
+
+    def _compact_collection(self, name: str, dead_ratio: float) -> Dict:
+        with get_container() as services:
+            store = services.get_vector_store(name)
+            if store is None:
+                return {"error": services.init_errors.get(name) or "VectorStore init failed"}
+            before = store.index_stats()
+            latency_before = store.probe_latency()
+        if before is None:
+            return {"skipped": "vector store server manages its own storage", "query_ms_before": latency_before}
+
+        # A collection that never had deletes has nothing to reclaim, however small
+        deleted = before["deleted"]
+        dead = deleted / (before["chunks"] + deleted) if deleted else 0.0
+        result = {
+            "chunks": before["chunks"],
+            "deleted": deleted,
+            "dead_ratio": round(dead, 4),
+            "rebuilt": False,
+            "query_ms_before": latency_before,
+        }
+        reembedder = get_reembedder()
+        if reembedder.is_running(name):
+            return {**result, "skipped": "re-embedding in progress"}
+        if before["chunks"] == 0 or dead < dead_ratio:
+            return result
+
+        reembedder.rebuild(name)
+        reembedder.wait(name)
+        job = reembedder.job(name)
+        if job.error:
+            return {**result, "error": job.error}
+
+        # The rebuilt version is served by a fresh service generation
+        with get_container() as services:
+            latency_after = services.get_vector_store(name).probe_latency()
+        return {
+            **result,
+            "rebuilt": True,
+            "version": job.target_version,
+            "query_ms_after": latency_after,
+        }
+
+    def _measure_vector_store(self, directory: Optional[str], bytes_before: Optional[int]) -> Dict:
+        """
+        Size of the whole vector store directory before and after the run, rebuilt
+        indexes included; a negative reclaimed_bytes means the run grew it. Chroma's
+        SQLite file is in use by the vector service, so it is not vacuumed here.
+        """
+        if not directory or not os.path.isdir(directory):
+            return {"skipped": "no local vector store"}
+        after = _dir_bytes(directory)
+        return {"bytes_before": bytes_before, "bytes_after": after, "reclaimed_bytes": bytes_before - after}
+
+    def _probe(self, conn) -> float:
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            for query in PROBE_QUERIES:
+                conn.execute(text(query)).fetchall()
+            timings.append(time.perf_counter() - started)
+        return round(statistics.median(timings) * 1000, 3)
+
+    def _vacuum_database(self) -> Dict:
+        path = self.engine.url.database
+        before = _file_bytes(path, path + "-wal")
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            latency_before = self._probe(conn)
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.exec_driver_sql("VACUUM")
+            conn.exec_driver_sql("ANALYZE")
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            latency_after = self._probe(conn)
+        after = _file_bytes(path, path + "-wal")
+        return {
+            "bytes_before": before,
+            "bytes_after": after,
+            "reclaimed_bytes": max(before - after, 0),
+            "query_ms_before": latency_before,
+            "query_ms_after": latency_after,
+        }
+
+    def start(self):
+        if get_settings().maintenance_interval_seconds <= 0:
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="maintenance", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(max(get_settings().maintenance_interval_seconds, 1.0)):
+            try:
+                report = self.run_once()
+                print(f"Maintenance reclaimed {report['reclaimed_bytes']} bytes in {report['seconds']}s")
+            except Exception as e:
+                self.stats["failures"] += 1
+                print(f"Maintenance failed: {e}")
+
+
+_maintenance = MaintenanceRunner()
+
+def get_maintenance() -> MaintenanceRunner:
+    return _maintenance
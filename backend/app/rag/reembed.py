@@ -0,0 +1,246 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from backend.app.core.config import get_settings
+from backend.app.rag.store import VectorStore
+from backend.app.rag.versions import (
+    active_version, all_versions, get_version, retire_version, set_active, set_shadow, wait_for_swap,
+)
+from backend.app.api.deps import rebuild_components
+
+COPYING, CATCHING_UP, DONE, FAILED, CANCELLED = "copying", "catching_up", "done", "failed", "cancelled"
+
+
+class ReembedJob:
+    """Re-embedding of one collection into its next version, with progress for /api/metrics/reembed."""
+
+    def __init__(self, name: str, source_version: int, source_model: str, model: str, rebuild: bool = False):
+        self.name = name
+        self.rebuild = rebuild  # same model: vectors are copied instead of embedded
+        self.source_version = source_version
+        self.source_model = source_model
+        self.target_version = source_version + 1
+        self.model = model
+        self.state = COPYING
+        self.total = 0  # chunks in the source when the copy started
+        self.done = 0  # chunks scanned by the copy
+        self.embedded = 0  # chunks embedded (some may already be in the target from an interrupted run)
+        self.caught_up = 0  # chunks written to the old version during the copy, embedded after the swap
+        self.error: Optional[str] = None
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.finished_at: Optional[str] = None
+        self.cancelled = threading.Event()
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+
+    def finish(self, state: str, error: Optional[str] = None):
+        self.state, self.error = state, error
+        self.finished_at = datetime.now(timezone.utc).isoformat()
+        self._finished = time.perf_counter()
+
+    def info(self) -> dict:
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.done, 0)
+        return {
+            "collection": self.name,
+            "state": self.state,
+            "rebuild": self.rebuild,
+            "from": {"version": self.source_version, "embedding_model": self.source_model},
+            "to": {"version": self.target_version, "embedding_model": self.model},
+            "total": self.total,
+            "done": self.done,
+            "embedded": self.embedded,
+            "caught_up": self.caught_up,
+            "percent": round(100.0 * self.done / self.total, 1) if self.total else (100.0 if self.state == DONE else 0.0),
+            "chunks_per_second": round(rate, 2),
+            "eta_seconds": round(remaining / rate, 1) if self.state == COPYING and rate > 0 else None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+def _open_store(name: str, version: int, model: str) -> VectorStore:
+    return VectorStore(collection_name=name, version=version, embedding_model=model)
+
+
+class Reembedder:
+    """
+    Moves collections to a new embedding model without downtime.
+
+    A job embeds every chunk of the active version into the next version, at most
+    reembed_max_chunks_per_second, while the active version keeps serving queries
+    with the model it was built with. Then the next version is made active in one
+    database write and its service rebuilt. Chunks written to the old version
+    during the copy are embedded after the swap. Deletes reach both versions while
+    the job runs, and chunks the copy picked up before their delete are removed
+    before the swap. The replaced version is dropped once every worker has moved
+    off it (see versions.retire_version).
+
+    A rebuild (see rebuild) is the same move without a model change: stored vectors
+    are copied as they are into a fresh index, which leaves the old index's
+    tombstones behind.
+    """
+
+    def __init__(self, store_factory: Callable[[str, int, str], VectorStore] = None):
+        self.store_factory = store_factory or _open_store
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ReembedJob] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+
+    def start(self, name: str, model: Optional[str] = None, rebuild: bool = False) -> Optional[ReembedJob]:
+        """Re-embed `name` with `model` (default: the configured one). None when it already uses it."""
+        model = model or get_settings().embedding_model
+        with self._lock:
+            job = self._jobs.get(name)
+            if self.is_running(name):
+                if job.model == model:
+                    return job
+                job.cancelled.set()  # superseded; the new job waits for it to stop
+            version, current_model = active_version(name, model)
+            if current_model == model and not rebuild:
+                return None
+            job = ReembedJob(name, version, current_model, model, rebuild=rebuild)
+            self._jobs[name] = job
+            thread = threading.Thread(
+                target=self._run, args=(job, self._threads.get(name)), name=f"reembed-{name}", daemon=True,
+            )
+            self._threads[name] = thread
+            thread.start()
+            return job
+
+    def rebuild(self, name: str) -> Optional[ReembedJob]:
+        """Compact `name`: copy the active version's vectors into a new version, no embedding calls."""
+        _, model = active_version(name, get_settings().embedding_model)
+        return self.start(name, model, rebuild=True)
+
+    def start_all(self, model: Optional[str] = None) -> Dict[str, Optional[dict]]:
+        jobs = {name: self.start(name, model) for name in get_settings().reembed_collections}
+        return {name: job.info() if job else None for name, job in jobs.items()}
+
+    def resume(self):
+        """Restart jobs a shutdown interrupted: collections whose model isn't the configured one."""
+        settings = get_settings()
+        for name in settings.reembed_collections:
+            found = get_version(name)
+            if found and found[1] != settings.embedding_model:
+                print(f"Collection '{name}' is on {found[1]}, re-embedding with {settings.embedding_model}")
+                self.start(name, settings.embedding_model)
+
+    def stop(self):
+        """Cancel running jobs; resume() picks them up where they stopped."""
+        with self._lock:
+            for name, job in self._jobs.items():
+                if self.is_running(name):
+                    job.cancelled.set()
+
+    def job(self, name: str) -> Optional[ReembedJob]:
+        """The latest job for `name`, running or finished."""
+        return self._jobs.get(name)
+
+    def is_running(self, name: str) -> bool:
+        job = self._jobs.get(name)
+        return job is not None and job.state in (COPYING, CATCHING_UP)
+
+    def wait(self, name: str, timeout: Optional[float] = None):
+        thread = self._threads.get(name)
+        if thread:
+            thread.join(timeout)
+
+    def _run(self, job: ReembedJob, previous: Optional[threading.Thread]):
+        try:
+            if previous:
+                previous.join()
+                # The superseded job may have swapped before stopping
+                job.source_version, job.source_model = active_version(job.name, job.model)
+                job.target_version = job.source_version + 1
+                if job.source_model == job.model and not job.rebuild:
+                    job.finish(DONE)
+                    return
+            self._reembed(job)
+        except Exception as e:
+            job.finish(FAILED, str(e))
+            print(f"Re-embedding '{job.name}' failed: {e}")
+
+    def _copy_missing(self, source: VectorStore, target: VectorStore, job: ReembedJob, first_pass: bool) -> Optional[int]:
+        """
+        Embed (or for a rebuild, copy) source chunks the target lacks. The first pass
+        counts progress and is throttled. Returns the count, or None if cancelled.
+        """
+        settings = get_settings()
+        reuse = job.model == job.source_model
+        # Copying stored vectors makes no embedding calls, so it needs no throttle
+        per_second = settings.reembed_max_chunks_per_second if first_pass and not reuse else 0
+        copied = 0
+        for ids, texts, metadatas, vectors in source.iter_chunks(settings.reembed_batch_size, embeddings=reuse):
+            if job.cancelled.is_set():
+                return None
+            batch_started = time.perf_counter()
+            missing = set(target.missing_ids(ids))
+            if missing:
+                picked = [n for n, i in enumerate(ids) if i in missing]
+                batch = ([ids[n] for n in picked], [texts[n] for n in picked], [metadatas[n] for n in picked])
+                if reuse:
+                    target.add_embedded(*batch, [vectors[n] for n in picked])
+                else:
+                    target.add_chunks(*batch)
+                # Deleted from the source while this batch was embedded: the delete found nothing
+                # to repeat in the target yet, so it is repeated here
+                gone = source.missing_ids(batch[0])
+                if gone:
+                    target.delete(gone)
+                copied += len(picked) - len(gone)
+            if first_pass:
+                job.done += len(ids)
+                job.embedded += len(missing)
+            if per_second > 0:
+                time.sleep(max(0.0, len(missing) / per_second - (time.perf_counter() - batch_started)))
+        return copied
+
+    def _reembed(self, job: ReembedJob):
+        source = self.store_factory(job.name, job.source_version, job.source_model)
+        target = self.store_factory(job.name, job.target_version, job.model)
+        if target.tagged_model() != job.model:
+            # Left by an interrupted job for another model
+            target.reset()
+        job.total = source.count()
+        # Deletes from now on reach the target too
+        set_shadow(job.name, job.target_version)
+
+        # Resumable: chunks already in the target are skipped
+        if self._copy_missing(source, target, job, first_pass=True) is None:
+            set_shadow(job.name, None)
+            job.finish(CANCELLED)
+            return
+
+        job.state = CATCHING_UP
+        # Until the swap the target holds only copies, so anything the source lacks was deleted;
+        # after it, new chunks are written to the target alone
+        stale = sorted(set(target.ids()) - set(source.ids()))
+        if stale:
+            target.delete(stale)
+        # The replaced version keeps receiving deletes, so the catch-up below can't revive a chunk
+        set_active(job.name, job.target_version, job.model, shadow_version=job.source_version)
+        rebuild_components([f"collection:{job.name}"])
+        # Once every worker writes to the new version, pick up what reached the old one first
+        wait_for_swap()
+        job.caught_up = self._copy_missing(source, target, job, first_pass=False) or 0
+
+        retire_version(source, job.name, job.source_version)
+        job.finish(DONE)
+        action = "rebuilt" if job.rebuild else f"re-embedded with {job.model}"
+        print(f"Collection '{job.name}' {action} as version {job.target_version}")
+
+    def info(self) -> dict:
+        with self._lock:
+            jobs = {name: job.info() for name, job in self._jobs.items()}
+        return {"collections": all_versions(), "jobs": jobs}
+
+
+_reembedder = Reembedder()
+
+def get_reembedder() -> Reembedder:
+    return _reembedder
@@ -0,0 +1,324 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import DateTime, func, select
+from sqlalchemy.engine import Engine
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import Base, engine as default_engine
+from backend.app.models import CollectionVersion
+from backend.app.rag.store import VectorStore
+from backend.app.rag.versions import active_version, get_version, physical_name, retire_version, wait_for_swap
+from backend.app.api.deps import rebuild_components
+from backend.app.chat.context_cache import get_context_cache
+from backend.app.chat.memory import get_memory_store
+
+FORMAT = "info-get-snapshot"
+FORMAT_VERSION = 1
+COLLECTIONS = ("documents", "chats", "memories")
+BATCH_SIZE = 1000
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotConflict(SnapshotError):
+    """The target already holds data and replace wasn't asked for."""
+
+
+class _NoEmbeddings(Embeddings):
+    """Stands in for the embedding client: snapshots carry their vectors, so nothing is embedded."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def embed_query(self, text: str) -> List[float]:
+        raise RuntimeError("Snapshots never call the embedding model")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise RuntimeError("Snapshots never call the embedding model")
+
+
+def _open_store(name: str, version: int, model: str) -> VectorStore:
+    return VectorStore(collection_name=name, embedding_function=_NoEmbeddings(model), version=version, embedding_model=model)
+
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _from_json(column, value):
+    if value is not None and isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def create_snapshot(path: str, engine: Engine = None, store_factory: Callable[[str, int, str], VectorStore] = None) -> Dict:
+    """
+    Write every table and the active version of each collection (chunk texts,
+    metadata and raw float32 embeddings) to one zip archive at `path`.
+
+    Tables and collections are read one after another, with nothing holding off
+    ingests and deletes meanwhile: a snapshot is only consistent when taken from a
+    quiesced instance, with no uploads, deletes or chats in flight.
+    """
+    engine = engine or default_engine
+    store_factory = store_factory or _open_store
+    started = time.perf_counter()
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "tables": {},
+        "collections": {},
+    }
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with engine.connect() as conn:
+            for table in Base.metadata.sorted_tables:
+                columns = [c.name for c in table.columns]
+                rows = 0
+                with archive.open(f"tables/{table.name}.jsonl", "w") as out:
+                    for row in conn.execute(select(table)).yield_per(BATCH_SIZE):
+                        out.write((json.dumps([_to_json(v) for v in row]) + "\n").encode())
+                        rows += 1
+                manifest["tables"][table.name] = {"columns": columns, "rows": rows}
+
+        for name in COLLECTIONS:
+            version, model = active_version(name, get_settings().embedding_model)
+            store = store_factory(name, version, model)
+            chunks, dimensions = 0, None
+            # A zip takes one entry at a time, so the vectors are spooled while the texts are written
+            with tempfile.TemporaryFile() as vectors:
+                with archive.open(f"collections/{name}/chunks.jsonl", "w") as texts:
+                    for ids, documents, metadatas, embeddings in store.iter_chunks(BATCH_SIZE, embeddings=True):
+                        array = np.asarray(embeddings, dtype="<f4")
+                        dimensions = array.shape[1]
+                        vectors.write(array.tobytes())
+                        for chunk in zip(ids, documents, metadatas):
+                            texts.write((json.dumps(chunk) + "\n").encode())
+                        chunks += len(ids)
+                vectors.seek(0)
+                with archive.open(f"collections/{name}/embeddings.f32", "w") as out:
+                    shutil.copyfileobj(vectors, out)
+            manifest["collections"][name] = {
+                "version": version, "embedding_model": model, "chunks": chunks, "dimensions": dimensions,
+            }
+
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+    seconds = time.perf_counter() - started
+    return {
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "rows": sum(t["rows"] for t in manifest["tables"].values()),
+        "chunks": sum(c["chunks"] for c in manifest["collections"].values()),
+        "seconds": round(seconds, 4),
+    }
+
+
+def read_manifest(archive: zipfile.ZipFile) -> Dict:
+    try:
+        manifest = json.loads(archive.read("manifest.json"))
+    except KeyError:
+        raise SnapshotError("Not a snapshot: manifest.json is missing")
+    if manifest.get("format") != FORMAT:
+        raise SnapshotError("Not a snapshot: unknown format")
+    if manifest.get("version", 0) > FORMAT_VERSION:
+        raise SnapshotError(f"Snapshot format version {manifest['version']} is newer than this app supports ({FORMAT_VERSION})")
+    return manifest
+
+
+def _read_lines(archive: zipfile.ZipFile, name: str):
+    with archive.open(name) as f:
+        for line in io.TextIOWrapper(f, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+
+
+def _batches(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _check_entries(archive: zipfile.ZipFile, manifest: Dict):
+    """Every entry the manifest promises is there, and each embeddings file holds exactly its vectors."""
+    names = set(archive.namelist())
+    for table in manifest["tables"]:
+        if f"tables/{table}.jsonl" not in names:
+            raise SnapshotError(f"Snapshot is missing table '{table}'")
+    for name, info in manifest["collections"].items():
+        if not info["chunks"]:
+            continue
+        for entry in ("chunks.jsonl", "embeddings.f32"):
+            if f"collections/{name}/{entry}" not in names:
+                raise SnapshotError(f"Snapshot is missing collections/{name}/{entry}")
+        expected = info["chunks"] * (info["dimensions"] or 0) * 4
+        size = archive.getinfo(f"collections/{name}/embeddings.f32").file_size
+        if size != expected:
+            raise SnapshotError(
+                f"Snapshot embeddings for '{name}' are {size} bytes, expected {expected} "
+                f"({info['chunks']} chunks of {info['dimensions']} dimensions)"
+            )
+
+
+def _check_empty(conn, tables, stores: Dict[str, VectorStore]):
+    # Collection versions describe the vector store and are always taken from the snapshot
+    if any(conn.execute(select(func.count()).select_from(t)).scalar() for t in tables if t.name != CollectionVersion.__tablename__):
+        raise SnapshotConflict("Database is not empty; restore with replace to overwrite it")
+    for name, store in stores.items():
+        if store.count():
+            raise SnapshotConflict(f"Collection '{name}' is not empty; restore with replace to overwrite it")
+
+
+def _load_vectors(archive: zipfile.ZipFile, name: str, info: Dict, store: VectorStore) -> int:
+    store.reset()  # may be left by an interrupted restore
+    count = 0
+    if info["chunks"]:
+        row_bytes = info["dimensions"] * 4
+        with archive.open(f"collections/{name}/embeddings.f32") as vectors:
+            for batch in _batches(_read_lines(archive, f"collections/{name}/chunks.jsonl"), BATCH_SIZE):
+                array = np.frombuffer(vectors.read(row_bytes * len(batch)), dtype="<f4")
+                array = array.reshape(len(batch), info["dimensions"])
+                ids, texts, metadatas = zip(*batch)
+                store.add_embedded(list(ids), list(texts), list(metadatas), array)
+                count += len(batch)
+    if count != info["chunks"]:
+        raise SnapshotError(f"Snapshot has {count} chunks for '{name}', its manifest says {info['chunks']}")
+    return count
+
+
+def restore_snapshot(path: str, engine: Engine = None, store_factory: Callable[[str, int, str], VectorStore] = None,
+                     replace: bool = False) -> Dict:
+    """
+    Bulk-load an archive written by create_snapshot, vectors included, without any
+    embedding calls. Refuses to overwrite existing data unless `replace`.
+
+    All or nothing: the vectors go into versions no worker is serving, and the rows
+    and the swap to those versions are then committed in one transaction. A failure
+    before that commit drops the new versions and leaves the data as it was. As
+    with a re-embed, the replaced versions are dropped once every worker has moved
+    off them.
+    """
+    engine = engine or default_engine
+    store_factory = store_factory or _open_store
+    started = time.perf_counter()
+
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise SnapshotError("Not a snapshot: not a zip archive")
+    with archive:
+        manifest = read_manifest(archive)
+        _check_entries(archive, manifest)
+        Base.metadata.create_all(bind=engine)
+        tables = [t for t in Base.metadata.sorted_tables if t.name in manifest["tables"]]
+        # Load into versions above the ones being served (a collection without a version
+        # row was never opened); the manifest's version when that's already free
+        previous = {name: get_version(name) for name in manifest["collections"]}
+        serving = {name: store_factory(name, *found) for name, found in previous.items() if found and not replace}
+        if not replace:
+            with engine.connect() as conn:
+                _check_empty(conn, tables, serving)
+
+        targets = {
+            name: max(info["version"], previous[name][0] + 1) if previous[name] else info["version"]
+            for name, info in manifest["collections"].items()
+        }
+
+        chunks: Dict[str, int] = {}
+        try:
+            for name, info in manifest["collections"].items():
+                chunks[name] = _load_vectors(archive, name, info, store_factory(name, targets[name], info["embedding_model"]))
+            chunks_done = time.perf_counter()
+
+            with engine.begin() as conn:
+                if not replace:
+                    _check_empty(conn, tables, serving)
+                for table in reversed(tables):
+                    conn.execute(table.delete())
+
+                rows: Dict[str, int] = {}
+                for table in tables:
+                    columns = manifest["tables"][table.name]["columns"]
+                    # Columns this schema doesn't have are skipped; new ones take their defaults
+                    known = [(n, table.columns[c]) for n, c in enumerate(columns) if c in table.columns]
+                    count = 0
+                    for batch in _batches(_read_lines(archive, f"tables/{table.name}.jsonl"), BATCH_SIZE):
+                        conn.execute(table.insert(), [{c.name: _from_json(c, row[n]) for n, c in known} for row in batch])
+                        count += len(batch)
+                    rows[table.name] = count
+
+                # The swap to the loaded versions commits with the rows
+                versions = CollectionVersion.__table__
+                conn.execute(versions.delete().where(versions.c.name.in_(list(manifest["collections"]))))
+                conn.execute(versions.insert(), [
+                    {"name": name, "version": targets[name], "embedding_model": info["embedding_model"],
+                     "updated_at": datetime.now(timezone.utc)}
+                    for name, info in manifest["collections"].items()
+                ])
+        except Exception:
+            # Nothing serves the new versions yet
+            for name, info in manifest["collections"].items():
+                store_factory(name, targets[name], info["embedding_model"]).drop_collection(physical_name(name, targets[name]))
+            raise
+    finished = time.perf_counter()
+
+    # In-process copies of the old data
+    rebuild_components(f"collection:{name}" for name in chunks)
+    get_context_cache().clear()
+    get_memory_store().clear()
+
+    wait_for_swap()
+    for name, info in manifest["collections"].items():
+        if previous[name]:
+            retire_version(store_factory(name, targets[name], info["embedding_model"]), name, previous[name][0])
+
+    chunk_seconds, row_seconds = chunks_done - started, finished - chunks_done
+    total_rows, total_chunks = sum(rows.values()), sum(chunks.values())
+    return {
+        "created_at": manifest["created_at"],
+        "rows": rows,
+        "chunks": chunks,
+        "seconds": round(finished - started, 4),
+        "rows_per_second": round(total_rows / row_seconds, 1) if row_seconds > 0 else None,
+        "chunks_per_second": round(total_chunks / chunk_seconds, 1) if chunk_seconds > 0 else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Snapshot or restore the knowledge base, embeddings included.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="write a snapshot archive")
+    create.add_argument("path")
+    restore = commands.add_parser("restore", help="load a snapshot archive")
+    restore.add_argument("path")
+    restore.add_argument("--replace", action="store_true", help="overwrite existing data")
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        report = create_snapshot(args.path)
+    else:
+        report = restore_snapshot(args.path, replace=args.replace)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
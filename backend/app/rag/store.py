@@ -1,13 +1,94 @@
 import os
-from langchain_chroma import Chroma
+import statistics
+import threading
+import time
+from typing import Optional
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from backend.app.core.config import get_settings
+from backend.app.core.singleflight import get_group
+from backend.app.core.tracing import trace_span
+from backend.app.core.resilience import get_policy
+from backend.app.rag.versions import (
+    active_version, count_deletes, get_deleted, get_shadow, get_version, physical_name,
+)
+
+class ResilientEmbeddings(Embeddings):
+    """Embedding calls under the shared "embedding" policy: timeout, retries, hedging, circuit breaker."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+        self.model = getattr(inner, "model", None) or type(inner).__name__
+
+    def embed_query(self, text: str) -> list[float]:
+        return get_policy("embedding").call_sync(self.inner.embed_query, text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        One policy call per embedding_batch_size texts, so a large document doesn't
+        have to fit in one attempt's timeout and a retry only repeats its batch.
+        Not hedged: a duplicated bulk request doubles its cost, and query latencies
+        say nothing about how long a batch should take.
+        """
+        size = max(get_settings().embedding_batch_size, 1)
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), size):
+            batch = texts[start:start + size]
+            vectors.extend(get_policy("embedding").call_sync(self.inner.embed_documents, batch, hedge=False))
+        return vectors
+
+class SingleFlightEmbeddings(Embeddings):
+    """Concurrent embedding calls for the same model and input share one upstream request."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+        self.model = getattr(inner, "model", None) or type(inner).__name__
+
+    def embed_query(self, text: str) -> list[float]:
+        with trace_span("embed_query", model=self.model):
+            return get_group("embed_query").do((self.model, text), self.inner.embed_query, text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return get_group("embed_documents").do((self.model, tuple(texts)), self.inner.embed_documents, texts)
+
+DEFAULT_PERSIST_DIRECTORY = "./chroma_db"
+
+# Collections whose relevance scores are compared against thresholds use cosine distance
+COLLECTION_METADATA = {"memories": {"hnsw:space": "cosine"}}
 
 class VectorStore:
-    def __init__(self, collection_name: str = "documents", persist_directory: str = "./chroma_db", embedding_function: Embeddings = None):
+    def __init__(self, collection_name: str = "documents", persist_directory: str = None, embedding_function: Embeddings = None,
+                 version: Optional[int] = None, embedding_model: Optional[str] = None):
+        """
+        Opens `version` of the collection (default: the active one, see rag.versions).
+        Without an explicit embedding function, queries are embedded with the model
+        the version was built with, whatever embedding_model is configured now.
+
+        A store opened on the active version (no version or embedding function given)
+        follows it: a swap made by any worker is seen by the next write, and by reads
+        within config_poll_seconds.
+        """
+        settings = get_settings()
+        self.collection_name = collection_name
+        self._follows_active = version is None and embedding_function is None
+        self._checked_at = time.monotonic()
+        self._follow_lock = threading.Lock()
+        if self._follows_active:
+            version, tagged_model = active_version(collection_name, settings.embedding_model)
+            embedding_model = embedding_model or tagged_model
+
+        # With several workers, one Chroma server owns the data; an explicit
+        # persist_directory always means an embedded store
+        if persist_directory is None and settings.vector_store_host:
+            self.persist_directory = None
+            self._location = {"host": settings.vector_store_host, "port": settings.vector_store_port}
+        else:
+            self.persist_directory = persist_directory or DEFAULT_PERSIST_DIRECTORY
+            self._location = {"persist_directory": self.persist_directory}
+        self._open(version or 0, embedding_model, embedding_function)
+
+    def _open(self, version: int, embedding_model: Optional[str], embedding_function: Embeddings = None):
         settings = get_settings()
-        
         if embedding_function is None:
             # Default to OpenAI if not provided
             try:
@@ -15,7 +96,8 @@ class VectorStore:
                 embedding_function = OpenAIEmbeddings(
                     openai_api_key=settings.embedding_api_key or settings.openai_api_key,
                     openai_api_base=settings.embedding_base_url or settings.openai_base_url,
-                    model=settings.embedding_model or "text-embedding-ada-002"
+                    model=embedding_model or settings.embedding_model or "text-embedding-ada-002",
+                    max_retries=0
                 )
             except ImportError:
                 # Fallback or raise error
@@ -23,32 +105,186 @@ class VectorStore:
             except Exception as e:
                 print(f"Failed to load OpenAI embeddings: {e}")
                 raise e
-            
-        self.embeddings = embedding_function
-        self.persist_directory = persist_directory
-        self.collection_name = collection_name
-        
-        self.db = Chroma(
-            collection_name=collection_name,
-            persist_directory=persist_directory, 
-            embedding_function=self.embeddings
+
+        embeddings = SingleFlightEmbeddings(ResilientEmbeddings(embedding_function))
+        embedding_model = embedding_model or embeddings.model
+        metadata = COLLECTION_METADATA.get(self.collection_name)
+        if version:
+            # Versioned collections are tagged with their model; version 0 keeps its original metadata
+            metadata = {**(metadata or {}), "embedding_model": embedding_model, "version": version}
+
+        # chromadb takes most of a second to import, so it loads with the first store
+        from langchain_chroma import Chroma
+        db = Chroma(
+            collection_name=physical_name(self.collection_name, version),
+            embedding_function=embeddings,
+            collection_metadata=metadata,
+            **self._location,
         )
+        self.embeddings, self.version, self.embedding_model, self.db = embeddings, version, embedding_model, db
+
+    def _follow(self, writing: bool = False):
+        """
+        Move to the active version if another worker swapped it. Writes check every
+        time, so none lands in a replaced version; reads every config_poll_seconds.
+        """
+        if not self._follows_active:
+            return
+        if not writing and time.monotonic() - self._checked_at < get_settings().config_poll_seconds:
+            return
+        with self._follow_lock:
+            self._checked_at = time.monotonic()
+            found = get_version(self.collection_name)
+            if found and found != (self.version, self.embedding_model):
+                self._open(*found)
+                print(f"VectorStore '{self.collection_name}' moved to version {self.version} ({self.embedding_model})")
 
-    def add_documents(self, documents: list[Document]):
-        return self.db.add_documents(documents)
+    def add_documents(self, documents: list[Document], ids: list[str] = None):
+        self._follow(writing=True)
+        return self.db.add_documents(documents, ids=ids)
 
     def similarity_search(self, query: str, k: int = 4, filter: dict = None) -> list[Document]:
-        return self.db.similarity_search(query, k=k, filter=filter)
+        self._follow()
+        with trace_span("vector_search", collection=self.collection_name, k=k):
+            return self.db.similarity_search(query, k=k, filter=filter)
+
+    def similarity_search_with_relevance(self, query: str, k: int = 4, filter: dict = None) -> list[tuple[Document, float]]:
+        """Like similarity_search, with a relevance score per hit (higher is closer)."""
+        self._follow()
+        with trace_span("vector_search", collection=self.collection_name, k=k):
+            return self.db.similarity_search_with_relevance_scores(query, k=k, filter=filter)
+
+    def count(self) -> int:
+        """Number of chunks; also opens the collection's index files."""
+        self._follow()
+        return self.db._collection.count()
 
     def delete_document(self, doc_id: str):
         """Delete documents by doc_id metadata"""
         try:
-            # Access underlying collection to delete by metadata
             # This deletes all chunks associated with this doc_id
-            self.db._collection.delete(where={"doc_id": doc_id})
+            self.delete_documents([doc_id])
             print(f"Deleted document chunks for doc_id: {doc_id}")
         except Exception as e:
             print(f"Error deleting document from vector store: {e}")
-            
+
+    def delete_documents(self, doc_ids: list[str]):
+        """Delete every chunk of the given doc_ids in one call. Errors are raised, not printed."""
+        self.delete_where("doc_id", doc_ids)
+
+    def delete_where(self, field: str, values: list[str]):
+        """Delete every chunk whose `field` metadata is one of `values`. Errors are raised, not printed."""
+        if not values:
+            return
+        where = {field: values[0]} if len(values) == 1 else {field: {"$in": list(values)}}
+        self._follow(writing=True)
+        found = self.db._collection.get(where=where, include=[])["ids"]
+        self.db._collection.delete(where=where)
+        self._count_deletes(len(found))
+        self._delete_shadow(where=where)
+
+    def _count_deletes(self, deleted: int):
+        """Tombstones for index_stats; the delete itself is done either way."""
+        try:
+            count_deletes(self.collection_name, self.version, deleted)
+        except Exception as e:
+            print(f"Deletes from '{self.collection_name}' not counted: {e}")
+
+    def _delete_shadow(self, **kwargs):
+        """Repeat a delete in the version a running re-embed is filling or just replaced."""
+        if not self._follows_active:
+            return
+        shadow = get_shadow(self.collection_name)
+        if shadow is None or shadow == self.version:
+            return
+        try:
+            self.db._client.get_collection(physical_name(self.collection_name, shadow)).delete(**kwargs)
+        except Exception as e:
+            # Dropped meanwhile: nothing left to bring the chunks back
+            print(f"Delete not repeated in version {shadow} of '{self.collection_name}': {e}")
+
+    def ids(self) -> list[str]:
+        """Every chunk id, sorted."""
+        self._follow()
+        return sorted(self.db._collection.get(include=[])["ids"])
+
+    def _pages(self, batch_size: int, include: list[str]):
+        # Paged by the ids present at the start, not by offset: a delete meanwhile would shift
+        # every later page and skip chunks. Chunks deleted since are left out of their page.
+        ids = self.ids()
+        for start in range(0, len(ids), batch_size):
+            page = self.db._collection.get(ids=ids[start:start + batch_size], include=include)
+            if page["ids"]:
+                yield page
+
+    def iter_metadata(self, batch_size: int = 1000):
+        """Pages of (chunk_id, metadata) over the whole collection, without documents or embeddings."""
+        for page in self._pages(batch_size, ["metadatas"]):
+            yield list(zip(page["ids"], page["metadatas"]))
+
+    def iter_chunks(self, batch_size: int = 1000, embeddings: bool = False):
+        """Pages of (chunk_ids, texts, metadatas, vectors) over the whole collection; vectors only if asked for."""
+        include = ["documents", "metadatas"] + (["embeddings"] if embeddings else [])
+        for page in self._pages(batch_size, include):
+            yield page["ids"], page["documents"], page["metadatas"], page["embeddings"] if embeddings else None
+
+    def missing_ids(self, ids: list[str]) -> list[str]:
+        """The given chunk ids this collection doesn't have, in order."""
+        present = set(self.db._collection.get(ids=list(ids), include=[])["ids"])
+        return [i for i in ids if i not in present]
+
+    def add_chunks(self, ids: list[str], texts: list[str], metadatas: list[dict]):
+        """Embed and store chunks under the given ids (overwriting existing ones)."""
+        self._follow(writing=True)
+        return self.db.add_texts(texts, metadatas=metadatas, ids=ids)
+
+    def add_embedded(self, ids: list[str], texts: list[str], metadatas: list[dict], embeddings: list):
+        """Store chunks with vectors computed before, without calling the embedding model."""
+        self._follow(writing=True)
+        self.db._collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings)
+
+    def index_stats(self) -> Optional[dict]:
+        """
+        Chunks and tombstones of this version's index. The HNSW index only marks
+        deletes, so the chunks our deletes removed since the version became active
+        are counted (see versions.count_deletes). None for a Chroma server.
+        """
+        if not self.persist_directory:
+            return None
+        return {"chunks": self.count(), "deleted": get_deleted(self.collection_name, self.version)}
+
+    def probe_latency(self, samples: int = 5, k: int = 4) -> Optional[float]:
+        """Median milliseconds of a top-k query with a stored vector (no embedding call). None when empty."""
+        page = self.db._collection.get(limit=1, include=["embeddings"])
+        if not page["ids"]:
+            return None
+        vector = page["embeddings"][0]
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            self.db._collection.query(query_embeddings=[vector], n_results=k, include=["distances"])
+            timings.append(time.perf_counter() - started)
+        return round(statistics.median(timings) * 1000, 3)
+
+    def tagged_model(self) -> Optional[str]:
+        """The embedding model recorded on the collection itself (versioned collections only)."""
+        return (self.db._collection.metadata or {}).get("embedding_model")
+
+    def reset(self):
+        """Drop every chunk, keeping the collection and its metadata."""
+        self.db.reset_collection()
+
+    def drop_collection(self, name: str) -> bool:
+        """Delete another Chroma collection on the same client; False if it doesn't exist."""
+        try:
+            self.db._client.delete_collection(name)
+            return True
+        except Exception:
+            return False
+
     def delete(self, ids: list[str]):
+        self._follow(writing=True)
+        found = len(ids) - len(self.missing_ids(ids))
         self.db.delete(ids)
+        self._count_deletes(found)
+        self._delete_shadow(ids=list(ids))
@@ -0,0 +1,140 @@
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from backend.app.core.config import get_settings
+from backend.app.core.database import SessionLocal
+from backend.app.models import CollectionVersion
+
+
+def physical_name(name: str, version: int) -> str:
+    """The Chroma collection holding `version` of logical collection `name`."""
+    return f"{name}__v{version}" if version else name
+
+
+def get_version(name: str) -> Optional[Tuple[int, str]]:
+    """(version, embedding_model) serving `name`, or None before its first use."""
+    db = SessionLocal()
+    try:
+        row = db.get(CollectionVersion, name)
+        return (row.version, row.embedding_model) if row else None
+    finally:
+        db.close()
+
+
+def active_version(name: str, default_model: str) -> Tuple[int, str]:
+    """
+    (version, embedding_model) serving `name`. On first use the existing collection
+    is recorded as version 0, embedded with the configured model.
+    """
+    found = get_version(name)
+    if found:
+        return found
+    db = SessionLocal()
+    try:
+        db.add(CollectionVersion(name=name, version=0, embedding_model=default_model))
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # recorded concurrently by another thread or worker
+    finally:
+        db.close()
+    return get_version(name)
+
+
+def set_active(name: str, version: int, embedding_model: str, shadow_version: Optional[int] = None):
+    db = SessionLocal()
+    try:
+        row = db.get(CollectionVersion, name) or CollectionVersion(name=name)
+        row.version, row.embedding_model, row.shadow_version = version, embedding_model, shadow_version
+        row.deleted_chunks = 0  # a fresh index
+        db.add(row)
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_shadow(name: str) -> Optional[int]:
+    """The version that receives `name`'s deletes besides the active one (see CollectionVersion)."""
+    db = SessionLocal()
+    try:
+        row = db.get(CollectionVersion, name)
+        return row.shadow_version if row else None
+    finally:
+        db.close()
+
+
+def set_shadow(name: str, version: Optional[int]):
+    db = SessionLocal()
+    try:
+        row = db.get(CollectionVersion, name)
+        if row is not None:
+            row.shadow_version = version
+            db.commit()
+    finally:
+        db.close()
+
+
+def count_deletes(name: str, version: int, deleted: int):
+    """Record chunks deleted from `version` of `name`; only the active version's count is kept."""
+    if deleted <= 0:
+        return
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(CollectionVersion)
+            .where(CollectionVersion.name == name, CollectionVersion.version == version)
+            # updated_at tells when the version became active
+            .values(deleted_chunks=func.coalesce(CollectionVersion.deleted_chunks, 0) + deleted,
+                    updated_at=CollectionVersion.updated_at)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_deleted(name: str, version: int) -> int:
+    """Chunks deleted from `version` of `name` since it became active (0 if it isn't)."""
+    db = SessionLocal()
+    try:
+        row = db.get(CollectionVersion, name)
+        return (row.deleted_chunks or 0) if row and row.version == version else 0
+    finally:
+        db.close()
+
+
+def wait_for_swap():
+    """
+    After set_active, wait until no worker can still be using the replaced version:
+    stores check the active version before every write and at least every
+    config_poll_seconds before reads, and a query started just before may still run.
+    """
+    time.sleep(2 * get_settings().config_poll_seconds)
+
+
+def retire_version(store, name: str, version: int):
+    """
+    Drop `version` of `name` after a swap replaced it. Call it once wait_for_swap()
+    has returned: no worker reads or writes the version any more, so its space is
+    given back right away instead of on the next swap.
+    """
+    if get_shadow(name) == version:
+        set_shadow(name, None)
+    store.drop_collection(physical_name(name, version))
+
+
+def all_versions() -> Dict[str, dict]:
+    db = SessionLocal()
+    try:
+        return {
+            row.name: {
+                "version": row.version,
+                "collection": physical_name(row.name, row.version),
+                "embedding_model": row.embedding_model,
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+            }
+            for row in db.query(CollectionVersion).all()
+        }
+    finally:
+        db.close()
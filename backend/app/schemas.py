@@ -7,16 +7,41 @@ class DocumentBase(BaseModel):
     source: str
     type: str
 
+class DocumentBulkDelete(BaseModel):
+    doc_ids: List[str]
+
 class DocumentCreate(DocumentBase):
     pass
 
 class Document(DocumentBase):
     id: str
     created_at: datetime
+    byte_size: Optional[int] = None
+    char_count: Optional[int] = None
+    chunk_count: Optional[int] = None
+    embedding_model: Optional[str] = None
+    ingest_ms: Optional[float] = None
 
     class Config:
         from_attributes = True
 
+class DocumentTypeStats(BaseModel):
+    type: Optional[str] = None
+    documents: int
+    total_bytes: int
+    total_chunks: int
+
+class DocumentStats(BaseModel):
+    documents: int
+    total_bytes: int
+    total_chars: int
+    total_chunks: int
+    without_stats: int  # ingested before stats were recorded
+    avg_ingest_ms: Optional[float] = None
+    bytes_per_second: Optional[float] = None
+    chunks_per_second: Optional[float] = None
+    by_type: List[DocumentTypeStats]
+
 class RagConfig(BaseModel):
     enabled: bool = True
     selected_doc_ids: Optional[List[str]] = None
@@ -25,6 +50,8 @@ class ChatRequest(BaseModel):
     message: str
     chat_id: Optional[str] = None
     rag_config: Optional[RagConfig] = None
+    use_cache: bool = True  # set False to bypass the LLM response cache (e.g. regenerate)
+    include_timing: bool = False  # emit a 'timing' SSE event with the per-step trace
 
 class IngestURLRequest(BaseModel):
     url: str
@@ -44,6 +71,12 @@ class Message(MessageBase):
     chat_id: str
     created_at: datetime
     is_summarized: bool = False
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    agent_iterations: Optional[int] = None
+    tool_calls: Optional[int] = None
+    latency_ms: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -72,3 +105,33 @@ class GlobalMemory(GlobalMemoryBase):
 
     class Config:
         from_attributes = True
+
+class MemoryFactCreate(BaseModel):
+    content: str
+
+class MemoryFact(MemoryFactCreate):
+    id: str
+    source: Optional[str] = None
+    mentions: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MemoryFactWrite(BaseModel):
+    fact_id: str
+    action: str  # 'added', 'merged' or 'duplicate'
+
+class UsageRollup(BaseModel):
+    day: Optional[str] = None
+    model: Optional[str] = None
+    chat_id: Optional[str] = None
+    turns: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    tool_calls: int
+    avg_iterations: Optional[float] = None
+    avg_latency_ms: Optional[float] = None
+    p95_latency_ms: Optional[float] = None
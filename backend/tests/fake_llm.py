@@ -0,0 +1,49 @@
+"""Fake chat model for exercising the agent loop in /api/chat without a real LLM."""
+import json
+import time
+from typing import Any, List
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult, ChatGeneration
+
+class FakeToolModel(BaseChatModel):
+    """
+    First turn asks for search_documents with the user's message (or `query`) as the query,
+    the turn after a tool result answers with the tool output's first line.
+    Every call is recorded in `calls` (shared list, pass one in).
+    """
+    calls: Any  # not `list`: pydantic would copy it
+    model_name: str = "fake-model"
+    latency: float = 0.0
+    query: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls.append(messages)
+        time.sleep(self.latency)
+        if messages[-1].type == "tool":
+            message = AIMessage(
+                content=f"Answer based on: {messages[-1].content.splitlines()[0]}",
+                usage_metadata={"input_tokens": 50, "output_tokens": 8, "total_tokens": 58},
+            )
+        else:
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": "search_documents", "args": {"query": self.query or messages[-1].content}, "id": f"call_{len(self.calls)}"}],
+                usage_metadata={"input_tokens": 40, "output_tokens": 5, "total_tokens": 45},
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+def parse_sse(body: str) -> list:
+    events = []
+    for line in body.splitlines():
+        if line.startswith("data: ") and line != "data: [DONE]":
+            events.append(json.loads(line[len("data: "):]))
+    return events
@@ -0,0 +1,87 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+
+class FakeOpenAIServer:
+    """
+    Minimal OpenAI-compatible /v1/chat/completions endpoint for tests, streaming only.
+
+    responder(body) decides each reply from the request body and returns one of:
+      {"tool_call": {"name": ..., "arguments": {...}}}
+      {"content": "..."}
+      {"status": 400}
+    Every request body is kept in .requests.
+    """
+
+    def __init__(self, responder: Callable[[dict], dict]):
+        self.responder = responder
+        self.requests: List[dict] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append(body)
+                reply = server.responder(body)
+                if "status" in reply:
+                    payload = json.dumps({"error": {"message": "fake failure", "type": "invalid_request_error"}}).encode()
+                    self.send_response(reply["status"])
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for chunk in server._chunks(body["model"], reply):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/v1"
+
+    def models(self) -> List[str]:
+        return [r["model"] for r in self.requests]
+
+    def _chunks(self, model: str, reply: dict):
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        if "tool_call" in reply:
+            call = reply["tool_call"]
+            yield chunk({"role": "assistant", "content": None, "tool_calls": [{
+                "index": 0, "id": f"call_{len(self.requests)}", "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }]})
+            yield chunk({}, "tool_calls")
+        else:
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(reply["content"].split(" ")):
+                yield chunk({"content": word if i == 0 else " " + word})
+            yield chunk({}, "stop")
+        yield {
+            "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model, "choices": [],
+            "usage": {"prompt_tokens": 30, "completion_tokens": 6, "total_tokens": 36},
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
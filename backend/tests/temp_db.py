@@ -0,0 +1,59 @@
+import os
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from backend.app.core.database import Base, get_db, get_async_db, configure_sqlite
+from backend.app.chat.context_cache import get_context_cache
+from backend.app.chat.memory import get_memory_store
+
+
+class TempDatabase:
+    """
+    Sync and async engines on one temporary SQLite file.
+
+    Async routes write through aiosqlite while tests seed and inspect rows with a
+    sync session, so both need the same database; in-memory SQLite is per connection.
+    """
+
+    def __init__(self, directory):
+        path = os.path.join(str(directory), "test.db")
+        self.engine = configure_sqlite(create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}))
+        # TestClient may run each request on a fresh event loop, so don't pool aiosqlite connections
+        self.async_engine = configure_sqlite(create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool))
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.AsyncSessionLocal = async_sessionmaker(self.async_engine, expire_on_commit=False, autoflush=False)
+        Base.metadata.create_all(bind=self.engine)
+        # Cached chat context and memory facts from another test's database would leak into this one
+        get_context_cache().clear()
+        get_memory_store().session_factory = self.SessionLocal
+        get_memory_store().clear()
+
+    def override(self, app, db):
+        """Point get_db at the given sync session and get_async_db at this database."""
+        async def get_test_async_db():
+            async with self.AsyncSessionLocal() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_async_db] = get_test_async_db
+
+    @contextmanager
+    def app_globals(self):
+        """
+        Point the app's own uses of the default database here too: table creation in
+        the lifespan, the warmup probe and collection versions. Without this, tests
+        that start the app or build a real vector store create ./info_get.db.
+        """
+        with ExitStack() as stack:
+            stack.enter_context(patch("backend.app.main.engine", self.engine))
+            stack.enter_context(patch("backend.app.api.warmup.engine", self.engine))
+            stack.enter_context(patch("backend.app.rag.versions.SessionLocal", self.SessionLocal))
+            yield
+
+    def close(self):
+        self.engine.dispose()
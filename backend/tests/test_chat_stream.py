@@ -1,10 +1,22 @@
+import pytest
 from fastapi.testclient import TestClient
 from backend.app.main import app
+from backend.tests.temp_db import TempDatabase
 from unittest.mock import patch, MagicMock
 
-client = TestClient(app)
+@pytest.fixture
+def client(tmp_path):
+    # A temporary database, so the suite leaves no info_get.db behind
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    with database.app_globals():
+        yield TestClient(app)
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
 
-def test_chat_streaming():
+def test_chat_streaming(client):
     # Mock the LLM service to return a generator
     with patch('backend.app.chat.llm.LLMService.stream_chat') as mock_stream:
         # Define a generator that yields chunks
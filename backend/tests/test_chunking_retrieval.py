@@ -7,24 +7,12 @@ from unittest.mock import patch
 from fastapi.testclient import TestClient
 from langchain_community.embeddings import FakeEmbeddings
 from langchain_core.documents import Document
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 
 from backend.app.main import app
-from backend.app.core.database import Base, get_db
 from backend.app.core.config import AppSettings, get_settings
 from backend.app.api.deps import get_services, ServiceContainer
 from backend.app.rag.store import VectorStore
-
-# Setup in-memory DB
-SQLALCHEMY_DATABASE_URL = "sqlite://"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from backend.tests.temp_db import TempDatabase
 
 # Setup fake services
 class FakeServiceContainer:
@@ -41,25 +29,11 @@ class FakeServiceContainer:
             self.vector_store = None
 
 @pytest.fixture(scope="function")
-def db_session():
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
-
-@pytest.fixture(scope="function")
-def client(db_session, tmp_path):
-    # Override DB dependency
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
-    
-    app.dependency_overrides[get_db] = override_get_db
+def client(tmp_path):
+    # Override DB dependencies (sync and async) with a temporary database
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
     
     # Override Services dependency
     chroma_path = tmp_path / "chroma"
@@ -78,9 +52,12 @@ def client(db_session, tmp_path):
     
     # We patch the get_settings where it is IMPORTED or USED
     # Ingest module has already imported get_settings, so we must patch it there.
-    with patch("backend.app.api.routers.ingest.get_settings", return_value=mock_settings):
+    # The lifespan and collection versions use the app's own database
+    with patch("backend.app.api.routers.ingest.get_settings", return_value=mock_settings), database.app_globals():
         with TestClient(app) as c:
             yield c
+    db.close()
+    database.close()
     
     # Cleanup
     app.dependency_overrides.clear()
@@ -0,0 +1,80 @@
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from backend.app.chat.context import BUDGET_EXHAUSTED, ContextBuilder, TokenCounter
+
+def test_small_context_is_kept_whole():
+    builder = ContextBuilder(model="gpt-3.5-turbo", budget=4000, tool_output_tokens=100)
+    history = [("user", "Hi"), ("assistant", "Hello! How can I help?")]
+    messages = builder.build(memory="Likes tea", summary="Talked about tea.", history=history, user_message="And coffee?")
+
+    assert isinstance(messages[0], SystemMessage)
+    assert "Likes tea" in messages[0].content
+    assert "Talked about tea." in messages[0].content
+    assert isinstance(messages[1], HumanMessage) and messages[1].content == "Hi"
+    assert isinstance(messages[2], AIMessage)
+    assert messages[-1].content == "And coffee?"
+    assert builder.breakdown["history_dropped"] == 0
+    assert not builder.breakdown["memory_truncated"]
+
+def test_budget_trims_by_priority():
+    counter = TokenCounter("gpt-3.5-turbo")
+    memory = "\n".join(f"[2024-01-01] old fact number {i}" for i in range(300)) + "\nnewest fact"
+    history = []
+    for i in range(10):
+        history.append(("user", f"question {i} " + "word " * 100))
+        history.append(("assistant", f"answer {i} " + "word " * 100))
+
+    builder = ContextBuilder(model="gpt-3.5-turbo", budget=1200, tool_output_tokens=50)
+    messages = builder.build(memory=memory, summary="short summary", history=history, user_message="latest?")
+    breakdown = builder.breakdown
+
+    # Whole prompt fits the budget
+    assert counter.count_messages(messages) <= 1200
+    assert breakdown["prompt_total"] <= 1200
+    # Memory is capped and keeps its most recent lines
+    assert breakdown["memory_truncated"]
+    assert "newest fact" in messages[0].content
+    assert "old fact number 0\n" not in messages[0].content
+    # Summary is small enough to survive untouched
+    assert "short summary" in messages[0].content
+    # Oldest history goes first, the newest turn survives
+    assert breakdown["history_dropped"] > 0
+    assert messages[-2].content.startswith("answer 9")
+    assert messages[-1].content == "latest?"
+
+def test_tool_output_is_clipped_and_counted():
+    builder = ContextBuilder(model="gpt-3.5-turbo", budget=1000, tool_output_tokens=20)
+    builder.build(memory="", summary="", history=[], user_message="hi")
+
+    clipped = builder.fit_tool_output("chunk " * 500)
+    assert builder.counter.count(clipped) <= 20
+    assert builder.breakdown["tool_results_truncated"] == 1
+    assert builder.breakdown["tool_results"] > 0
+
+    short = builder.fit_tool_output("ok")
+    assert short == "ok"
+    assert builder.breakdown["tool_results_truncated"] == 1
+
+def test_memory_is_trimmed_between_facts():
+    memory = "\n".join(f"fact {i}: the user likes colour number {i} quite a lot" for i in range(200))
+    builder = ContextBuilder(model="gpt-3.5-turbo", budget=1000, tool_output_tokens=50)
+    messages = builder.build(memory=memory, summary="", history=[], user_message="hi")
+
+    assert builder.breakdown["memory_truncated"]
+    assert builder.breakdown["memory"] <= 250
+    kept = [line for line in messages[0].content.splitlines() if line.strip().startswith("fact ")]
+    assert kept and kept[-1].strip() == "fact 199: the user likes colour number 199 quite a lot"
+    # Every fact is either whole or gone
+    assert all(line.strip() in memory.splitlines() for line in kept)
+
+def test_tool_outputs_share_the_remaining_budget():
+    builder = ContextBuilder(model="gpt-3.5-turbo", budget=600, tool_output_tokens=200)
+    builder.build(memory="", summary="", history=[], user_message="hi")
+
+    outputs = [builder.fit_tool_output("chunk " * 500) for _ in range(3)]
+    breakdown = builder.breakdown
+    assert breakdown["prompt_total"] + breakdown["tool_results"] <= 600
+    assert builder.counter.count(outputs[0]) <= 200
+    assert builder.counter.count(outputs[2]) < 200
+    # Once the budget is spent, a further result is only a short notice, for which room was kept
+    assert builder.fit_tool_output("chunk " * 500) == BUDGET_EXHAUSTED
+    assert breakdown["prompt_total"] + breakdown["tool_results"] <= 600
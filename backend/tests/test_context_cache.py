@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.models import Chat, Message
+from backend.app.chat.context_cache import ChatContext, ContextCache, get_context_cache, load_chat_context
+from backend.tests.fake_llm import FakeToolModel, parse_sse
+from backend.tests.temp_db import TempDatabase
+
+
+class FakeSearch:
+    name = "search_documents"
+
+    def invoke(self, args):
+        return "Content: found it\nSource: a.md"
+
+
+def count_statements(engine) -> list:
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda conn, cursor, stmt, *a: statements.append(stmt))
+    return statements
+
+
+def test_load_chat_context_is_one_query(tmp_path):
+    database = TempDatabase(tmp_path)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with database.SessionLocal() as db:
+        db.add_all([
+            Chat(id="c1", title="t", summary="earlier stuff"),
+            Chat(id="empty", title="e"),
+        ])
+        for i in range(15):
+            db.add(Message(chat_id="c1", role="user" if i % 2 == 0 else "assistant", content=f"m{i}",
+                           created_at=base + timedelta(seconds=i), is_summarized=i < 3))
+        db.commit()
+
+    statements = count_statements(database.async_engine)
+
+    async def load(chat_id):
+        async with database.AsyncSessionLocal() as db:
+            return await load_chat_context(db, chat_id, 10)
+
+    context = asyncio.run(load("c1"))
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    assert context.summary == "earlier stuff"
+    assert [content for _, content in context.history] == [f"m{i}" for i in range(5, 15)]
+
+    empty = asyncio.run(load("empty"))
+    assert (empty.summary, empty.history) == (None, [])
+    assert asyncio.run(load("missing")) is None
+    database.close()
+
+
+def test_cache_updates_incrementally_and_ignores_stale_loads():
+    cache = ContextCache(max_chats=2)
+    version = cache.version("c1")
+    cache.store("c1", ChatContext("sum", [("user", "a"), ("assistant", "b")]), 3, version)
+
+    cache.append("c1", [("user", "c"), ("assistant", "d")])
+    assert cache.get("c1", 3).history == [("assistant", "b"), ("user", "c"), ("assistant", "d")]
+    # Asked with a different window: reload
+    assert cache.get("c1", 10) is None
+
+    # A load that started before a write must not overwrite the newer state
+    stale = cache.version("c2")
+    cache.append("c2", [("user", "x")])
+    cache.store("c2", ChatContext(None, []), 3, stale)
+    assert cache.get("c2", 3) is None
+
+    cache.invalidate("c1")
+    assert cache.get("c1", 3) is None
+
+    # LRU bound
+    for chat_id in ("a", "b", "c"):
+        cache.store(chat_id, ChatContext(None, []), 3, cache.version(chat_id))
+    assert cache.info()["chats"] == 2 and cache.get("a", 3) is None
+
+
+def test_write_tracking_is_bounded():
+    cache = ContextCache(max_chats=3)
+    stale = cache.version("old")
+    for i in range(1000):
+        cache.append(f"chat-{i}", [("user", "hi")])
+        cache.invalidate(f"chat-{i}")
+    assert cache.info()["tracked_writes"] == 3
+
+    # Writes that were forgotten still turn away loads that started before them
+    cache.store("chat-0", ChatContext(None, []), 3, stale)
+    assert cache.get("chat-0", 3) is None
+    cache.store("chat-0", ChatContext(None, []), 3, cache.version("chat-0"))
+    assert cache.get("chat-0", 3) is not None
+
+
+@pytest.fixture
+def client(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    calls = []
+    settings = AppSettings(openai_api_key="fake")
+    with patch("backend.app.api.routers.chat.ChatOpenAI", lambda **kw: FakeToolModel(calls=calls)), \
+         patch("backend.app.api.routers.chat.search_documents", FakeSearch()), \
+         patch("backend.app.api.routers.chat.get_settings", return_value=settings), \
+         patch("backend.app.api.routers.chat.get_summarizer"), \
+         patch("backend.app.api.routers.chat.get_indexer"):
+        yield TestClient(app), calls, database
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+
+def test_hot_chat_skips_database_reads(client):
+    c, calls, database = client
+    chat_id = parse_sse(c.post("/api/chat/", json={"message": "first question"}).text)[0]["chat_id"]
+
+    statements = count_statements(database.async_engine)
+    c.post("/api/chat/", json={"message": "second question", "chat_id": chat_id})
+
+    # Only the turn's inserts hit the database
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    # The cached history still carries the first turn
+    prompt = calls[-2]
+    assert [m.content for m in prompt[1:-1]] == ["first question", "Answer based on: Content: found it"]
+
+    # Editing the chat invalidates; the next turn reloads in a single query
+    assert c.put(f"/api/chats/{chat_id}", json={"title": "renamed", "summary": "new summary"}).status_code == 200
+    statements.clear()
+    c.post("/api/chat/", json={"message": "third question", "chat_id": chat_id})
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    assert "new summary" in calls[-2][0].content
+    assert get_context_cache().info()["hits"] >= 1
@@ -2,9 +2,20 @@ from fastapi.testclient import TestClient
 from backend.app.main import app
 import pytest
 
-client = TestClient(app)
+from backend.tests.temp_db import TempDatabase
 
-def test_document_lifecycle_file():
+@pytest.fixture
+def client(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    with database.app_globals():
+        yield TestClient(app)
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+def test_document_lifecycle_file(client):
     # Create a dummy file
     content = b"This is a test file content for unit testing."
     files = {"file": ("test_unit.txt", content, "text/plain")}
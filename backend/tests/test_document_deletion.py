@@ -0,0 +1,94 @@
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_core.documents import Document as LangChainDocument
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.api.deps import get_services
+from backend.app.models import Document
+from backend.app.rag.store import VectorStore
+from backend.app.rag.deletion import get_reconciler
+from backend.tests.temp_db import TempDatabase
+
+
+@pytest.fixture
+def env(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    store = VectorStore(collection_name="documents", persist_directory=str(tmp_path / "chroma"),
+                        embedding_function=FakeEmbeddings(size=8))
+    services = MagicMock()
+    services.vector_store = store
+    app.dependency_overrides[get_services] = lambda: services
+    settings = AppSettings(doc_delete_batch_size=2)
+    with patch("backend.app.rag.deletion.get_settings", return_value=settings), \
+         patch("backend.app.rag.deletion.get_services", return_value=services), \
+         patch("backend.app.rag.deletion.SessionLocal", database.SessionLocal):
+        yield TestClient(app), db, store
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+
+def add_document(db, store, doc_id, chunks=3):
+    db.add(Document(id=doc_id, name=f"{doc_id}.md", source=f"{doc_id}.md", type="file"))
+    db.commit()
+    store.add_documents([
+        LangChainDocument(page_content=f"{doc_id} chunk {i}", metadata={"doc_id": doc_id, "chunk_index": i})
+        for i in range(chunks)
+    ])
+
+
+def chunk_doc_ids(store):
+    return sorted({m["doc_id"] for m in store.db.get(include=["metadatas"])["metadatas"]})
+
+
+def test_bulk_delete_batches_vector_deletes(env):
+    client, db, store = env
+    for i in range(5):
+        add_document(db, store, f"d{i}")
+
+    with patch.object(store, "delete_documents", wraps=store.delete_documents) as spy:
+        result = client.post("/api/documents/bulk-delete", json={"doc_ids": ["d0", "d1", "d2", "d3", "missing"]}).json()
+
+    assert result == {"deleted": 4, "pending": 0, "not_found": ["missing"]}
+    assert spy.call_count == 2  # batch size 2
+    assert chunk_doc_ids(store) == ["d4"]
+    assert [d["id"] for d in client.get("/api/documents").json()] == ["d4"]
+
+    assert client.delete("/api/documents/d4").json() == {"message": "Document deleted"}
+    assert client.delete("/api/documents/d4").status_code == 404
+
+
+def test_failed_vector_delete_stays_pending_until_reconciled(env):
+    client, db, store = env
+    add_document(db, store, "d0")
+    add_document(db, store, "d1")
+
+    with patch.object(store, "delete_documents", side_effect=RuntimeError("chroma down")):
+        result = client.post("/api/documents/bulk-delete", json={"doc_ids": ["d0", "d1"]}).json()
+    assert (result["deleted"], result["pending"]) == (0, 2)
+    # Hidden from the list, but the rows stay until their chunks are gone
+    assert client.get("/api/documents").json() == []
+    db.expire_all()
+    assert {d.status for d in db.query(Document).all()} == {"deleting"}
+
+    report = client.post("/api/documents/reconcile").json()
+    assert (report["resumed_deletes"], report["still_pending"]) == (2, 0)
+    assert chunk_doc_ids(store) == []
+    assert db.query(Document).count() == 0
+
+
+def test_reconciler_purges_orphan_chunks(env):
+    client, db, store = env
+    add_document(db, store, "kept")
+    # Chunks whose row was deleted behind the vector store's back
+    store.add_documents([LangChainDocument(page_content=f"orphan {i}", metadata={"doc_id": "gone"}) for i in range(4)])
+
+    report = get_reconciler().run_once(scan_batch=2)
+    assert (report["orphan_documents"], report["orphan_chunks"]) == (1, 4)
+    assert chunk_doc_ids(store) == ["kept"]
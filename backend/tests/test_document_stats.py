@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_community.embeddings import FakeEmbeddings
+
+from backend.app.main import app
+from backend.app.api.deps import get_services
+from backend.app.models import Document
+from backend.app.rag.store import VectorStore
+from backend.tests.temp_db import TempDatabase
+
+
+@pytest.fixture
+def env(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    services = MagicMock()
+    services.vector_store = VectorStore(collection_name="documents", persist_directory=str(tmp_path / "chroma"),
+                                        embedding_function=FakeEmbeddings(size=8))
+    app.dependency_overrides[get_services] = lambda: services
+    yield TestClient(app), db
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+
+def test_ingest_records_document_stats(env):
+    client, db = env
+    content = ("word " * 500).encode()
+    doc_id = client.post("/api/ingest/file", files={"file": ("notes.md", content, "text/markdown")}).json()["doc_id"]
+
+    doc = db.get(Document, doc_id)
+    assert doc.byte_size == len(content)
+    assert doc.char_count > 0 and doc.chunk_count >= 3
+    assert doc.embedding_model == "FakeEmbeddings"
+    assert doc.ingest_ms > 0
+
+
+def test_list_filters_sorts_and_pages(env):
+    client, db = env
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(7):
+        db.add(Document(id=f"d{i}", name=f"doc{i}.md", source=f"doc{i}.md", type="url" if i % 3 == 0 else "file",
+                        byte_size=100 * (i % 4), chunk_count=i, created_at=base + timedelta(days=i), ingest_ms=50.0))
+    db.add(Document(id="gone", name="gone.md", source="gone.md", type="file", status="deleting"))
+    db.commit()
+
+    # Unpaged by default, as the UI expects
+    assert len(client.get("/api/documents").json()) == 7
+    assert [d["id"] for d in client.get("/api/documents", params={"type": "url"}).json()] == ["d0", "d3", "d6"]
+    assert [d["id"] for d in client.get("/api/documents", params={"min_chunks": 2, "max_chunks": 4}).json()] == ["d2", "d3", "d4"]
+    assert [d["id"] for d in client.get("/api/documents", params={"created_after": "2024-01-06T00:00:00Z"}).json()] == ["d5", "d6"]
+
+    # Ties on byte_size are paged through by id without gaps or repeats
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "byte_size", "order": "desc", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/documents", params=params)
+        seen += [d["id"] for d in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ["d3", "d6", "d2", "d5", "d1", "d4", "d0"]
+
+    assert client.get("/api/documents", params={"sort": "source"}).status_code == 400
+
+    stats = client.get("/api/documents/stats").json()
+    assert (stats["documents"], stats["total_bytes"], stats["total_chunks"]) == (7, 900, 21)
+    assert stats["without_stats"] == 0
+    assert stats["chunks_per_second"] == round(21 / 0.35, 2)
+    assert {t["type"]: t["documents"] for t in stats["by_type"]} == {"file": 4, "url": 3}
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.models import Chat, Message
+from backend.tests.temp_db import TempDatabase
+
+
+def seed(db):
+    base = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    db.add_all([
+        Chat(id="c1", title="Trip", summary="Planning a trip", updated_at=base),
+        Chat(id="c2", title="标题", updated_at=base),
+    ])
+    for i in range(30):
+        db.add(Message(
+            id=f"m{i:02d}", chat_id="c1" if i < 20 else "c2", role="user" if i % 2 == 0 else "assistant",
+            content=f"message {i} 内容", created_at=base + timedelta(seconds=i),
+            model="gpt-4o" if i % 2 else None, prompt_tokens=10 * i if i % 2 else None, is_indexed=True,
+        ))
+    db.commit()
+
+
+def test_export_import_roundtrip(tmp_path):
+    (tmp_path / "a").mkdir()
+    source = TempDatabase(tmp_path / "a")
+    db = source.SessionLocal()
+    seed(db)
+    source.override(app, db)
+    client = TestClient(app)
+
+    response = client.get("/api/history/export")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(l) for l in response.text.splitlines()]
+    assert lines[0]["type"] == "meta"
+    assert [l["type"] for l in lines[1:]] == ["chat"] * 2 + ["message"] * 30
+    # Compact: unset columns are left out, local index state is not exported
+    assert "model" not in lines[3] and "is_indexed" not in lines[3]
+
+    one_chat = [json.loads(l) for l in client.get("/api/history/export", params={"chat_id": "c2"}).text.splitlines()]
+    assert {l.get("chat_id", l.get("id")) for l in one_chat[1:]} == {"c2"}
+    app.dependency_overrides.clear()
+    db.close()
+
+    target_dir = tmp_path / "b"
+    target_dir.mkdir()
+    target = TempDatabase(target_dir)
+    target_db = target.SessionLocal()
+    target.override(app, target_db)
+
+    # Small batches exercise the flush path; a broken line is reported, not fatal
+    body = response.content + b'{"type":"message","content":"no id"}\nnot json\n'
+    result = client.post("/api/history/import", params={"batch_size": 7}, content=body).json()
+    assert (result["chats"], result["messages"], result["skipped"], result["errors"]) == (2, 30, 0, 2)
+
+    copied = target_db.query(Message).order_by(Message.id).all()
+    assert len(copied) == 30
+    assert copied[1].model == "gpt-4o" and copied[1].prompt_tokens == 10
+    assert copied[0].content == "message 0 内容"
+    assert copied[0].created_at == datetime(2024, 3, 1)
+    assert not any(m.is_indexed for m in copied)
+    assert target_db.get(Chat, "c1").summary == "Planning a trip"
+
+    # Importing again is a no-op
+    again = client.post("/api/history/import", content=response.content).json()
+    assert (again["chats"], again["messages"], again["skipped"]) == (0, 0, 32)
+
+    app.dependency_overrides.clear()
+    target_db.close()
+    source.close()
+    target.close()
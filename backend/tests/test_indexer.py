@@ -0,0 +1,111 @@
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+from langchain_community.embeddings import FakeEmbeddings
+
+from backend.app.main import app
+from backend.app.core.database import Base, get_db
+from backend.app.core.config import AppSettings
+from backend.app.models import Chat, Message
+from backend.app.rag.store import VectorStore
+from backend.app.chat.indexer import ChatHistoryIndexer
+from backend.app.agent.tools import search_chat_history
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def env(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    store = VectorStore(collection_name="chats", persist_directory=str(tmp_path), embedding_function=FakeEmbeddings(size=10))
+    services = MagicMock()
+    services.get_vector_store.return_value = store
+    settings = AppSettings(chat_index_batch_size=8, chat_index_flush_seconds=0.05)
+    with patch("backend.app.chat.indexer.SessionLocal", TestingSessionLocal), \
+         patch("backend.app.chat.indexer.get_settings", return_value=settings), \
+         patch("backend.app.chat.indexer.get_services", return_value=services), \
+         patch("backend.app.agent.tools.get_services", return_value=services):
+        yield store
+    Base.metadata.drop_all(bind=engine)
+
+def add_messages(chat_id, count):
+    db = TestingSessionLocal()
+    rows = [Message(chat_id=chat_id, role="user" if i % 2 == 0 else "assistant", content=f"note {i}") for i in range(count)]
+    db.add_all(rows)
+    db.commit()
+    for r in rows:
+        db.refresh(r)
+    db.expunge_all()
+    db.close()
+    return rows
+
+def test_enqueued_messages_are_indexed_in_background(env):
+    db = TestingSessionLocal()
+    chat = Chat(title="t")
+    db.add(chat)
+    db.commit()
+    chat_id = chat.id
+    db.close()
+
+    indexer = ChatHistoryIndexer()
+    indexer.enqueue(add_messages(chat_id, 3))
+    indexer._queue.join()
+
+    status = indexer.status()
+    assert status["indexed"] == 3
+    assert status["queue_depth"] == 0
+    assert status["unindexed_messages"] == 0
+    assert status["last_lag_seconds"] >= 0
+
+    result = search_chat_history.invoke({"query": "note", "chat_id": chat_id})
+    assert "note" in result
+    assert "Role: " in result
+
+def test_backfill_indexes_existing_history(env):
+    add_messages("old-chat", 20)
+    indexer = ChatHistoryIndexer()
+    assert indexer.status()["unindexed_messages"] == 20
+
+    assert indexer.backfill() == 20
+    assert indexer.status()["unindexed_messages"] == 0
+    assert indexer.stats["batches"] == 3
+
+    docs = env.similarity_search("note", k=20, filter={"chat_id": "old-chat"})
+    assert len(docs) == 20
+    assert {d.metadata["role"] for d in docs} == {"user", "assistant"}
+    assert all("timestamp" in d.metadata for d in docs)
+
+    # Idempotent: nothing left to do
+    assert indexer.backfill() == 0
+
+def test_deleted_chat_leaves_the_history_index(env):
+    db = TestingSessionLocal()
+    chats = [Chat(title="kept"), Chat(title="deleted")]
+    db.add_all(chats)
+    db.commit()
+    kept, deleted = chats[0].id, chats[1].id
+    db.close()
+
+    indexer = ChatHistoryIndexer()
+    indexer.index_batch([(m.id, m.chat_id, m.role, m.content, m.created_at) for m in add_messages(kept, 2) + add_messages(deleted, 2)])
+    late = add_messages(deleted, 1)
+
+    db = TestingSessionLocal()
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        with patch("backend.app.api.routers.chats.get_indexer", return_value=indexer):
+            assert TestClient(app).delete(f"/api/chats/{deleted}").status_code == 200
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+
+    assert search_chat_history.invoke({"query": "note", "chat_id": deleted}) == "No relevant chat history found."
+    assert "note" in search_chat_history.invoke({"query": "note", "chat_id": kept})
+    # Queued before the delete, indexed after it
+    assert indexer.index_batch([(m.id, m.chat_id, m.role, m.content, m.created_at) for m in late]) == 0
+    assert {d.metadata["chat_id"] for d in env.similarity_search("note", k=10)} == {kept}
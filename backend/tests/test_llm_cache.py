@@ -0,0 +1,71 @@
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.chat.cache import ResponseCache, make_cache_key
+from backend.tests.fake_llm import FakeToolModel, parse_sse
+from backend.tests.temp_db import TempDatabase
+
+def test_cache_key_normalization():
+    a = [SystemMessage(content="sys"), HumanMessage(content="hello "),
+         AIMessage(content="", tool_calls=[{"name": "search_documents", "args": {"query": "x"}, "id": "call_1"}])]
+    b = [SystemMessage(content="sys"), HumanMessage(content="hello"),
+         AIMessage(content="", tool_calls=[{"name": "search_documents", "args": {"query": "x"}, "id": "call_999"}])]
+    assert make_cache_key(a, "m") == make_cache_key(b, "m")
+    assert make_cache_key(a, "m") != make_cache_key(a, "other-model")
+    assert make_cache_key(a, "m", temperature=0) != make_cache_key(a, "m", temperature=1)
+
+def test_lru_and_ttl_eviction():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats["evictions"] == 1
+
+    cache = ResponseCache(max_entries=10, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats["expired"] == 1
+
+@pytest.fixture
+def client(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    calls = []
+    settings = AppSettings(openai_api_key="fake", llm_cache_enabled=True)
+    with patch("backend.app.api.routers.chat.ChatOpenAI", lambda **kw: FakeToolModel(calls=calls)), \
+         patch("backend.app.api.routers.chat.get_settings", return_value=settings), \
+         patch("backend.app.chat.cache.get_settings", return_value=settings), \
+         patch("backend.app.api.routers.chat.get_summarizer"), \
+         patch("backend.app.api.routers.chat.get_indexer"), \
+         database.app_globals():
+        yield TestClient(app), calls
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+def test_cached_turn_replays_same_events(client):
+    c, calls = client
+    first = parse_sse(c.post("/api/chat/", json={"message": "What is in my notes?"}).text)
+    assert len(calls) == 2
+
+    second = parse_sse(c.post("/api/chat/", json={"message": "What is in my notes?"}).text)
+    assert len(calls) == 2  # both agent turns served from cache
+
+    strip = lambda events: [e for e in events if e["type"] not in ("meta", "context")]
+    assert strip(first) == strip(second)
+    assert [e["type"] for e in strip(second)] == ["tool_call", "tool_output", "answer"]
+
+    # Per-request bypass goes back to the model
+    c.post("/api/chat/", json={"message": "What is in my notes?", "use_cache": False})
+    assert len(calls) == 4
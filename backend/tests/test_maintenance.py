@@ -0,0 +1,163 @@
+import os
+import time
+import uuid
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.models import Message
+from backend.app.rag.maintenance import MaintenanceRunner, get_maintenance
+from backend.app.rag.reembed import Reembedder
+from backend.app.rag.store import VectorStore
+from backend.app.rag.versions import active_version, get_version
+from backend.tests.test_memory import BagOfWordsEmbeddings
+from backend.tests.temp_db import TempDatabase
+
+MODEL = "bag-of-words"
+
+
+class FakeContainer:
+    """Serves the active version of each collection, as a service generation would."""
+
+    def __init__(self, open_store):
+        self.open_store = open_store
+        self.init_errors = {}
+
+    def get_vector_store(self, name):
+        version, model = get_version(name)
+        return self.open_store(name, version, model)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+@pytest.fixture
+def env(tmp_path):
+    database = TempDatabase(tmp_path)
+    chroma = str(tmp_path / "chroma")
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+
+    def open_store(name, version, model):
+        return VectorStore(collection_name=name, persist_directory=chroma, embedding_function=BagOfWordsEmbeddings(),
+                           version=version, embedding_model=model)
+
+    settings = AppSettings(maintenance_collections=["documents"], maintenance_rebuild_dead_ratio=0.3,
+                           maintenance_temp_max_age_seconds=60, reembed_batch_size=500, config_poll_seconds=0)
+    runner = MaintenanceRunner(engine=database.engine, temp_dir=str(uploads), vector_dir=chroma)
+    reconciler = MagicMock()
+    reconciler.run_once.return_value = {"orphan_chunks": 0}
+    with patch("backend.app.rag.versions.SessionLocal", database.SessionLocal), \
+         patch("backend.app.rag.maintenance.get_settings", return_value=settings), \
+         patch("backend.app.rag.reembed.get_settings", return_value=settings), \
+         patch("backend.app.rag.versions.get_settings", return_value=settings), \
+         patch("backend.app.rag.reembed.rebuild_components"), \
+         patch("backend.app.rag.maintenance.get_reconciler", return_value=reconciler), \
+         patch("backend.app.rag.maintenance.get_reembedder", return_value=Reembedder(open_store)), \
+         patch("backend.app.rag.maintenance.get_container", side_effect=lambda: FakeContainer(open_store)):
+        yield runner, database, open_store, uploads
+    database.close()
+
+
+def test_maintenance_reclaims_space(env):
+    runner, database, open_store, uploads = env
+
+    # Enough chunks for Chroma to flush the index to disk, then most of them deleted
+    active_version("documents", MODEL)
+    store = open_store("documents", 0, MODEL)
+    store.add_chunks([f"c{i}" for i in range(3000)], [f"chunk {i} about topic{i % 97}" for i in range(3000)],
+                     [{"doc_id": f"d{i % 300}"} for i in range(3000)])
+    store.delete_documents([f"d{i}" for i in range(200)])
+
+    with database.SessionLocal() as db:
+        db.add_all(Message(chat_id="c", role="user", content="x" * 2000) for _ in range(1000))
+        db.commit()
+        db.query(Message).delete()
+        db.commit()
+
+    stale = uploads / f"temp_{uuid.uuid4()}.pdf"
+    stale.write_bytes(b"%PDF" * 256)
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+    in_use = uploads / f"temp_{uuid.uuid4()}.md"
+    in_use.write_text("still parsing")
+    unrelated = uploads / "temp_notes.txt"
+    unrelated.write_text("not an upload")
+
+    report = runner.run_once()
+
+    assert report["temp_files"] == {"removed": 1, "bytes": 1024}
+    assert not stale.exists() and in_use.exists() and unrelated.exists()
+
+    documents = report["collections"]["documents"]
+    assert documents["rebuilt"] and documents["version"] == 1
+    assert documents["chunks"] == 1000 and documents["deleted"] == 2000
+    assert documents["dead_ratio"] == pytest.approx(2 / 3, abs=0.01)
+    assert documents["query_ms_before"] is not None and documents["query_ms_after"] is not None
+    assert get_version("documents") == (1, MODEL)
+    rebuilt = open_store("documents", 1, MODEL)
+    assert rebuilt.count() == 1000
+    assert rebuilt.similarity_search("topic5", k=1)[0].metadata["doc_id"] not in {f"d{i}" for i in range(200)}
+
+    vector_store = report["vector_store"]
+    assert vector_store["reclaimed_bytes"] == vector_store["bytes_before"] - vector_store["bytes_after"]
+    sqlite = report["sqlite"]
+    assert sqlite["bytes_after"] < sqlite["bytes_before"]
+    assert sqlite["query_ms_before"] is not None and sqlite["query_ms_after"] is not None
+    assert report["reclaimed_bytes"] == 1024 + vector_store["reclaimed_bytes"] + sqlite["reclaimed_bytes"]
+    assert runner.stats["runs"] == 1 and runner.stats["indexes_rebuilt"] == 1
+
+    # Nothing left to compact
+    again = runner.run_once()
+    assert not again["collections"]["documents"]["rebuilt"]
+    assert again["collections"]["documents"]["dead_ratio"] == 0.0
+    assert again["temp_files"]["removed"] == 0
+
+
+def test_small_collection_without_deletes_is_not_rebuilt(env):
+    runner, database, open_store, uploads = env
+
+    # Far below the index's preallocated capacity, and nothing ever deleted
+    active_version("documents", MODEL)
+    store = open_store("documents", 0, MODEL)
+    store.add_chunks([f"c{i}" for i in range(20)], [f"chunk {i}" for i in range(20)], [{"doc_id": "d0"}] * 20)
+
+    for _ in range(2):
+        documents = runner.run_once()["collections"]["documents"]
+        assert documents["chunks"] == 20 and documents["deleted"] == 0
+        assert documents["dead_ratio"] == 0.0 and not documents["rebuilt"]
+    assert get_version("documents") == (0, MODEL)
+    assert runner.stats["indexes_rebuilt"] == 0
+
+
+def test_only_chunks_actually_deleted_count_as_tombstones(env):
+    runner, database, open_store, uploads = env
+    active_version("documents", MODEL)
+    store = open_store("documents", 0, MODEL)
+    store.add_chunks([f"c{i}" for i in range(10)], [f"chunk {i}" for i in range(10)],
+                     [{"doc_id": f"d{i % 2}"} for i in range(10)])
+
+    store.delete(["c0", "c1", "gone"])
+    store.delete_documents(["d0", "unknown"])  # c2, c4, c6, c8
+    store.delete(["c0"])  # already deleted
+    # A version that isn't active keeps no count
+    open_store("documents", 1, MODEL).add_chunks(["x"], ["x"], [{"doc_id": "d9"}])
+    open_store("documents", 1, MODEL).delete(["x"])
+
+    assert store.index_stats() == {"chunks": 4, "deleted": 6}
+    assert open_store("documents", 1, MODEL).index_stats() == {"chunks": 0, "deleted": 0}
+
+
+def test_maintenance_endpoint_rejects_overlapping_runs():
+    maintenance = get_maintenance()
+    client = TestClient(app)
+    assert client.get("/api/maintenance").json()["stats"]["runs"] == maintenance.stats["runs"]
+    with maintenance._run_lock:
+        response = client.post("/api/maintenance/run")
+    assert response.status_code == 409
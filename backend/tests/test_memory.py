@@ -0,0 +1,171 @@
+import hashlib
+import math
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import Embeddings
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.models import GlobalMemory, MemoryFact
+from backend.app.rag.store import VectorStore
+from backend.app.chat.memory import get_memory_store, split_facts
+from backend.tests.fake_llm import FakeToolModel
+from backend.tests.temp_db import TempDatabase
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Texts sharing words land close together, unrelated texts are orthogonal."""
+
+    def embed_query(self, text):
+        vector = [0.0] * 256
+        for word in text.lower().replace("?", "").split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 256] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+class FakeSearch:
+    name = "search_documents"
+
+    def invoke(self, args):
+        return "Content: green tea notes\nSource: tea.md"
+
+
+@pytest.fixture
+def env(tmp_path):
+    database = TempDatabase(tmp_path)
+    store = VectorStore(collection_name="memories", persist_directory=str(tmp_path / "chroma"),
+                        embedding_function=BagOfWordsEmbeddings())
+    services = MagicMock()
+    services.get_vector_store.return_value = store
+    settings = AppSettings(memory_top_k=2, memory_merge_threshold=0.75, memory_min_relevance=0.15)
+    with patch("backend.app.chat.memory.get_services", return_value=services), \
+         patch("backend.app.chat.memory.get_settings", return_value=settings):
+        yield database, store
+    database.close()
+
+
+def test_split_facts_strips_legacy_timestamps():
+    blob = "likes tea\n[2024-01-01 10:00:00] lives in Paris\n\n- owns a cat"
+    assert split_facts(blob) == ["likes tea", "lives in Paris", "owns a cat"]
+
+
+def test_writes_deduplicate_and_merge(env):
+    database, store = env
+    memory = get_memory_store()
+
+    tea, action = memory.add("user likes green tea")
+    assert action == "added"
+    assert memory.add("User likes  green tea") == (tea, "duplicate")
+    # Close enough to be the same fact: newer wording replaces the old one
+    assert memory.add("user likes green tea a lot") == (tea, "merged")
+    paris, action = memory.add("lives in Paris")
+    assert action == "added"
+
+    with database.SessionLocal() as db:
+        facts = {f.id: f for f in db.query(MemoryFact).all()}
+    assert len(facts) == 2
+    assert (facts[tea].content, facts[tea].mentions) == ("user likes green tea a lot", 3)
+    assert all(f.is_indexed for f in facts.values())
+    assert len(store.db.get()["ids"]) == 2
+
+
+def test_lookup_returns_only_relevant_facts(env):
+    database, _ = env
+    memory = get_memory_store()
+    for fact in ["user likes green tea", "lives in Paris", "works as a nurse"]:
+        memory.add(fact)
+    before = memory.info()
+
+    assert memory.relevant("which tea do I like?") == ["user likes green tea"]
+    assert memory.info()["lookups"] == before["lookups"] + 1
+
+    # No more facts than top_k: all are used and nothing is searched
+    memory.delete(memory.add("works as a nurse")[0])
+    assert memory.relevant("anything") == ["user likes green tea", "lives in Paris"]
+    assert memory.info()["lookups"] == before["lookups"] + 1
+    assert memory.info()["lookups_skipped"] == before["lookups_skipped"] + 1
+
+
+def test_legacy_blob_is_migrated_and_indexed(env):
+    database, store = env
+    with database.SessionLocal() as db:
+        db.add(GlobalMemory(content="[2024-01-01 10:00:00] likes tea\n[2024-01-02 10:00:00] likes tea\nlives in Paris"))
+        db.commit()
+
+    memory = get_memory_store()
+    assert sorted(f.content for f in memory.facts()) == ["likes tea", "lives in Paris"]
+    with database.SessionLocal() as db:
+        assert db.query(GlobalMemory).first().content == ""
+    assert memory.info()["unindexed"] == 2
+
+    # Embedded on the next lookup that needs the index
+    memory.add("works as a nurse")
+    assert memory.info()["unindexed"] == 0
+    assert len(store.db.get()["ids"]) == 3
+
+
+def test_memory_api_and_chat_prompt(env):
+    database, _ = env
+    db = database.SessionLocal()
+    database.override(app, db)
+    client = TestClient(app)
+
+    response = client.put("/api/memory/", json={"content": "user likes green tea\nlives in Paris\nworks as a nurse"})
+    assert response.status_code == 200
+    assert response.json()["content"] == "- user likes green tea\n- lives in Paris\n- works as a nurse"
+    assert len(client.get("/api/memory/facts").json()) == 3
+    assert client.post("/api/memory/facts", json={"content": "lives in Paris"}).json()["action"] == "duplicate"
+    assert client.post("/api/memory/facts", json={"content": " "}).status_code == 400
+    assert client.get("/api/memory/search", params={"q": "nurse shifts"}).json() == ["works as a nurse"]
+
+    calls = []
+    with patch("backend.app.api.routers.chat.ChatOpenAI", lambda **kw: FakeToolModel(calls=calls)), \
+         patch("backend.app.api.routers.chat.get_settings", return_value=AppSettings(openai_api_key="fake")), \
+         patch("backend.app.api.routers.chat.search_documents", FakeSearch()), \
+         patch("backend.app.api.routers.chat.get_summarizer"), \
+         patch("backend.app.api.routers.chat.get_indexer"):
+        client.post("/api/chat/", json={"message": "recommend some tea"})
+    system_prompt = calls[0][0].content
+    assert "user likes green tea" in system_prompt
+    assert "Paris" not in system_prompt and "nurse" not in system_prompt
+
+    fact_id = client.get("/api/memory/facts").json()[0]["id"]
+    assert client.delete(f"/api/memory/facts/{fact_id}").status_code == 200
+    assert client.delete(f"/api/memory/facts/{fact_id}").status_code == 404
+    app.dependency_overrides.clear()
+    db.close()
+
+
+def test_replace_diffs_facts_and_keeps_lines_as_typed(env):
+    database, store = env
+    memory = get_memory_store()
+    memory.replace("user likes green tea\nlives in Paris")
+    kept_id = next(f.id for f in memory.facts() if f.content == "lives in Paris")
+
+    # Near duplicates of each other, but typed by the user: both stay, verbatim
+    count = memory.replace("lives in Paris\nuser likes green tea a lot\nuser likes green tea very much")
+    assert count == 3
+    facts = {f.content: f for f in memory.facts()}
+    assert set(facts) == {"lives in Paris", "user likes green tea a lot", "user likes green tea very much"}
+    assert facts["lives in Paris"].id == kept_id
+    assert sorted(store.db.get()["ids"]) == sorted(f.id for f in facts.values())
+
+
+def test_mention_of_a_fact_deleted_elsewhere_adds_it_again(env):
+    database, _ = env
+    memory = get_memory_store()
+    fact_id, _ = memory.add("owns a cat")
+    # Another worker deletes it; this process still has it loaded
+    with database.SessionLocal() as db:
+        db.query(MemoryFact).delete()
+        db.commit()
+
+    new_id, action = memory.add("owns a cat")
+    assert action == "added" and new_id != fact_id
+    assert [f.content for f in memory.facts()] == ["owns a cat"]
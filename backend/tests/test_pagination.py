@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.app.main import app
+from backend.app.models import Chat, Message
+from backend.tests.temp_db import TempDatabase
+
+
+@pytest.fixture
+def client(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    chats = [Chat(id=f"chat-{i:03d}", title=f"Chat {i}", updated_at=base + timedelta(minutes=i // 2)) for i in range(25)]
+    # Pairs of messages share a timestamp so the id tie-break matters
+    messages = [
+        Message(id=f"msg-{i:03d}", chat_id="chat-000", role="user", content=f"m{i}", created_at=base + timedelta(seconds=i // 2))
+        for i in range(45)
+    ]
+    db.add_all(chats + messages)
+    db.commit()
+    database.override(app, db)
+    yield TestClient(app), db
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+
+def collect(client, url, limit):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_message_keyset_pages_cover_everything_in_order(client):
+    c, _ = client
+    pages = collect(c, "/api/chats/chat-000/messages", limit=10)
+    ids = [m["id"] for page in pages for m in page]
+    assert ids == [f"msg-{i:03d}" for i in range(45)]
+    assert [len(p) for p in pages] == [10, 10, 10, 10, 5]
+
+
+def test_chat_keyset_pages_newest_first(client):
+    c, _ = client
+    pages = collect(c, "/api/chats/", limit=7)
+    ids = [chat["id"] for page in pages for chat in page]
+    assert ids == [f"chat-{i:03d}" for i in reversed(range(25))]
+
+
+def test_offset_pagination_still_works_and_bad_cursor_rejected(client):
+    c, _ = client
+    page = c.get("/api/chats/chat-000/messages", params={"skip": 40, "limit": 10})
+    assert [m["id"] for m in page.json()] == [f"msg-{i:03d}" for i in range(40, 45)]
+    assert "X-Next-Cursor" not in page.headers
+    assert c.get("/api/chats/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_queries_use_composite_indexes(client):
+    _, db = client
+    plan = " ".join(str(row) for row in db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM messages WHERE chat_id = 'chat-000' "
+        "AND (created_at, id) > ('2024-01-01 00:00:05', 'msg-010') ORDER BY created_at, id LIMIT 11"
+    )))
+    assert "ix_messages_chat_id_created_at_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = " ".join(str(row) for row in db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM chats ORDER BY updated_at DESC, id DESC LIMIT 11"
+    )))
+    assert "ix_chats_updated_at_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_document_sorts_and_filters_use_indexes(client):
+    _, db = client
+    plan = " ".join(str(row) for row in db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM documents WHERE (name, id) > ('b', 'x') ORDER BY name, id LIMIT 11"
+    )))
+    assert "ix_documents_name_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = " ".join(str(row) for row in db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM documents WHERE embedding_model = 'text-embedding-3-small'"
+    )))
+    assert "ix_documents_embedding_model" in plan
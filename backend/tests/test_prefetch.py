@@ -0,0 +1,80 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.agent.prefetch import query_similarity, prefetch_stats
+from backend.tests.fake_llm import FakeToolModel, parse_sse
+from backend.tests.temp_db import TempDatabase
+
+class SlowSearch:
+    name = "search_documents"
+
+    def __init__(self):
+        self.queries = []
+
+    def invoke(self, args):
+        self.queries.append(args["query"])
+        time.sleep(0.3)
+        return f"Content: notes about {args['query']}\nSource: notes.md"
+
+def test_query_similarity():
+    assert query_similarity("What is the refund policy?", "refund policy") == 1.0
+    assert query_similarity("退款政策是什么", "退款政策") == 1.0
+    assert query_similarity("weather today", "refund policy") == 0.0
+    # A narrower search is not the same search
+    assert query_similarity("refund", "refund policy for damaged items") < 0.6
+
+@pytest.fixture
+def client(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    search = SlowSearch()
+    settings = AppSettings(openai_api_key="fake", speculative_retrieval=True)
+    with patch("backend.app.api.routers.chat.ChatOpenAI", lambda **kw: FakeToolModel(calls=[], latency=0.3)), \
+         patch("backend.app.api.routers.chat.search_documents", search), \
+         patch("backend.app.api.routers.chat.get_settings", return_value=settings), \
+         patch("backend.app.api.routers.chat.get_summarizer"), \
+         patch("backend.app.api.routers.chat.get_indexer"):
+        yield TestClient(app), search
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+def test_prefetched_search_is_reused(client):
+    c, search = client
+    before = prefetch_stats.info()
+
+    events = parse_sse(c.post("/api/chat/", json={"message": "refund policy", "rag_config": {"enabled": True}}).text)
+
+    # The model's search_documents call was answered by the prefetch, no second search
+    assert search.queries == ["refund policy"]
+    outputs = [e for e in events if e["type"] == "tool_output"]
+    assert outputs[0]["content"].startswith("Content: notes about refund policy")
+
+    after = prefetch_stats.info()
+    assert after["hits"] == before["hits"] + 1
+    # Search (0.3s) fully overlapped the first model call (0.3s)
+    assert after["saved_ms_total"] - before["saved_ms_total"] > 150
+
+def test_no_prefetch_without_rag(client):
+    c, search = client
+    before = prefetch_stats.info()["started"]
+    c.post("/api/chat/", json={"message": "refund policy", "rag_config": {"enabled": False}})
+    assert prefetch_stats.info()["started"] == before
+    assert search.queries == ["refund policy"]  # searched normally by the tool call
+
+def test_narrower_search_does_not_reuse_prefetch(client):
+    c, search = client
+    before = prefetch_stats.info()
+
+    with patch("backend.app.api.routers.chat.ChatOpenAI",
+               lambda **kw: FakeToolModel(calls=[], latency=0.3, query="refund")):
+        c.post("/api/chat/", json={"message": "refund policy for damaged items", "rag_config": {"enabled": True}})
+
+    assert search.queries == ["refund policy for damaged items", "refund"]
+    assert prefetch_stats.info()["misses"] == before["misses"] + 1
@@ -0,0 +1,176 @@
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.rag.reembed import Reembedder, DONE, COPYING
+from backend.app.rag.store import VectorStore
+from backend.app.rag.versions import active_version, get_version
+from backend.tests.test_memory import BagOfWordsEmbeddings
+from backend.tests.temp_db import TempDatabase
+
+
+class ModelEmbeddings(BagOfWordsEmbeddings):
+    """Bag of words in a model-specific order, so vectors of two models don't line up."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed_query(self, text):
+        vector = super().embed_query(text)
+        shift = sum(map(ord, self.model)) % len(vector)
+        return vector[shift:] + vector[:shift]
+
+
+TEXTS = [f"note {i} about topic{i}" for i in range(10)]
+
+
+@pytest.fixture
+def env(tmp_path):
+    database = TempDatabase(tmp_path)
+    chroma = str(tmp_path / "chroma")
+
+    def open_store(name, version, model):
+        return VectorStore(collection_name=name, persist_directory=chroma, embedding_function=ModelEmbeddings(model),
+                           version=version, embedding_model=model)
+
+    settings = AppSettings(embedding_model="model-b", reembed_collections=["documents"],
+                           reembed_batch_size=4, reembed_max_chunks_per_second=0, config_poll_seconds=0)
+    with patch("backend.app.rag.versions.SessionLocal", database.SessionLocal), \
+         patch("backend.app.rag.reembed.get_settings", return_value=settings), \
+         patch("backend.app.rag.versions.get_settings", return_value=settings), \
+         patch("backend.app.rag.reembed.rebuild_components") as rebuild:
+        assert active_version("documents", "model-a") == (0, "model-a")
+        source = open_store("documents", 0, "model-a")
+        source.add_chunks([f"c{i}" for i in range(len(TEXTS))], TEXTS, [{"doc_id": f"d{i}"} for i in range(len(TEXTS))])
+        yield Reembedder(open_store), open_store, source, settings, rebuild
+    database.close()
+
+
+def test_model_change_reembeds_into_a_new_version(env):
+    reembedder, open_store, source, _, rebuild = env
+
+    job = reembedder.start("documents", "model-b")
+    reembedder.wait("documents", timeout=10)
+
+    info = job.info()
+    assert info["state"] == DONE
+    assert (info["total"], info["done"], info["embedded"], info["percent"]) == (10, 10, 10, 100.0)
+    assert get_version("documents") == (1, "model-b")
+    rebuild.assert_called_once_with(["collection:documents"])
+
+    target = open_store("documents", 1, "model-b")
+    assert target.count() == 10 and target.tagged_model() == "model-b"
+    assert target.similarity_search("topic7", k=1)[0].metadata["doc_id"] == "d7"
+    # The replaced version is dropped once every worker has moved off it
+    assert "documents" not in {c.name for c in source.db._client.list_collections()}
+
+    # Already on that model: nothing to do
+    assert reembedder.start("documents", "model-b") is None
+    assert reembedder.info()["collections"]["documents"]["collection"] == "documents__v1"
+
+
+def test_rebuild_drops_the_replaced_version(env):
+    reembedder, open_store, source, _, _ = env
+
+    for version in (1, 2):
+        reembedder.rebuild("documents")
+        reembedder.wait("documents", timeout=10)
+        assert get_version("documents") == (version, "model-a")
+
+    names = {c.name for c in source.db._client.list_collections()}
+    assert "documents__v2" in names and not names & {"documents", "documents__v1"}
+    assert open_store("documents", 2, "model-a").count() == 10
+
+
+def test_old_version_serves_until_the_throttled_copy_is_done(env):
+    reembedder, open_store, source, settings, _ = env
+    settings.reembed_max_chunks_per_second = 20  # 10 chunks take about half a second
+
+    job = reembedder.start("documents", "model-b")
+    time.sleep(0.25)
+    info = job.info()
+    assert info["state"] == COPYING and 0 < info["done"] < 10
+    assert info["eta_seconds"] is not None and info["eta_seconds"] > 0
+    assert get_version("documents") == (0, "model-a")
+
+    # Written to the old version while the copy runs
+    source.add_chunks(["late"], ["late note about topic42"], [{"doc_id": "late"}])
+    reembedder.wait("documents", timeout=10)
+
+    assert job.info()["state"] == DONE and job.info()["eta_seconds"] is None
+    assert open_store("documents", 1, "model-b").count() == 11
+
+
+def test_swap_reaches_stores_opened_before_it(env, tmp_path):
+    reembedder, open_store, source, settings, _ = env
+    chroma = str(tmp_path / "chroma")
+    # Another worker's store, following the active version
+    with patch("backend.app.rag.store.get_settings", return_value=settings), \
+         patch("langchain_openai.OpenAIEmbeddings", side_effect=lambda **kw: ModelEmbeddings(kw["model"])):
+        worker = VectorStore(collection_name="documents", persist_directory=chroma)
+        assert (worker.version, worker.embedding_model, worker.count()) == (0, "model-a", 10)
+
+        reembedder.start("documents", "model-b")
+        reembedder.wait("documents", timeout=10)
+
+        # Written after the swap: lands in the active version, embedded with its model
+        worker.add_chunks(["new"], ["new note about topic99"], [{"doc_id": "new"}])
+        assert (worker.version, worker.embedding_model) == (1, "model-b")
+        assert worker.similarity_search("topic99", k=1)[0].metadata["doc_id"] == "new"
+    assert open_store("documents", 1, "model-b").count() == 11
+
+
+def test_chunks_deleted_during_the_job_stay_deleted(env, tmp_path):
+    reembedder, open_store, source, settings, _ = env
+    settings.reembed_max_chunks_per_second = 20  # 10 chunks take about half a second
+    settings.config_poll_seconds = 0.3  # the catch-up waits 0.6s after the swap
+    with patch("backend.app.rag.store.get_settings", return_value=settings), \
+         patch("langchain_openai.OpenAIEmbeddings", side_effect=lambda **kw: ModelEmbeddings(kw["model"])):
+        worker = VectorStore(collection_name="documents", persist_directory=str(tmp_path / "chroma"))
+
+        reembedder.start("documents", "model-b")
+        time.sleep(0.3)
+        source.delete(["c0"])  # already copied, and the delete isn't repeated in the new version
+        worker.delete_where("doc_id", ["d1"])  # repeated there by the worker
+        deadline = time.monotonic() + 5
+        while get_version("documents")[0] != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Before the catch-up: the chunk is still in the old version
+        worker.delete_where("doc_id", ["d8"])
+        reembedder.wait("documents", timeout=10)
+
+    target = open_store("documents", 1, "model-b")
+    assert target.ids() == sorted(f"c{i}" for i in range(10) if i not in (0, 1, 8))
+    assert reembedder.job("documents").info()["state"] == DONE
+
+
+def test_queries_use_the_model_the_collection_was_built_with(tmp_path):
+    database = TempDatabase(tmp_path)
+    settings = AppSettings(embedding_model="model-b", openai_api_key="fake")
+    try:
+        with patch("backend.app.rag.versions.SessionLocal", database.SessionLocal), \
+             patch("backend.app.rag.store.get_settings", return_value=settings), \
+             patch("langchain_openai.OpenAIEmbeddings") as embeddings:
+            embeddings.return_value = MagicMock(model=None)
+            active_version("documents", "model-a")
+            store = VectorStore(collection_name="documents", persist_directory=str(tmp_path / "chroma"))
+        assert embeddings.call_args.kwargs["model"] == "model-a"
+        assert (store.version, store.embedding_model) == (0, "model-a")
+    finally:
+        database.close()
+
+
+def test_settings_change_starts_reembedding():
+    reembedder = MagicMock()
+    reembedder.start_all.return_value = {"documents": {"state": "copying"}}
+    changes = {"fields": ["embedding_model"], "components": ["embeddings"]}
+    with patch("backend.app.api.routers.settings.save_settings", return_value=changes), \
+         patch("backend.app.api.routers.settings.reload_services", return_value={}), \
+         patch("backend.app.api.routers.settings.get_reembedder", return_value=reembedder):
+        body = TestClient(app).post("/api/settings", json=AppSettings(embedding_model="model-b").model_dump()).json()
+    reembedder.start_all.assert_called_once_with("model-b")
+    assert body["reembed"] == {"documents": {"state": "copying"}}
@@ -0,0 +1,228 @@
+import time
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from backend.app.core.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResiliencePolicy, deadline, get_policy, is_retryable,
+)
+from backend.app.core.config import AppSettings
+from backend.app.rag.store import ResilientEmbeddings
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class Flaky:
+    """Fails the first `failures` calls with `error`, then returns "ok"."""
+
+    def __init__(self, failures: int, error: Exception = None, delay: float = 0.0):
+        self.failures = failures
+        self.error = error or StatusError(503)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+def policy(**kw) -> ResiliencePolicy:
+    kw.setdefault("backoff_base", 0.001)
+    return ResiliencePolicy("test", **kw)
+
+
+def test_retryable_classification():
+    assert is_retryable(StatusError(503))
+    assert is_retryable(StatusError(429))
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ConnectionResetError())
+    assert not is_retryable(StatusError(400))
+    assert not is_retryable(CircuitOpenError())
+    assert not is_retryable(ValueError("bad output"))
+    assert not is_retryable(TypeError())
+
+
+def test_local_errors_are_not_retried_or_counted_against_the_upstream():
+    p = policy(max_retries=2, breaker=CircuitBreaker("test", failure_threshold=2))
+    for _ in range(3):
+        fn = Flaky(failures=1, error=ValueError("could not parse tool call"))
+        with pytest.raises(ValueError):
+            asyncio.run(p.call(fn))
+        assert fn.calls == 1
+    assert p.breaker.state == CircuitBreaker.CLOSED and p.breaker.failures == 0
+    assert p.stats["retries"] == 0
+
+
+def test_retries_transient_errors():
+    p, fn = policy(max_retries=2), Flaky(failures=2)
+    assert asyncio.run(p.call(fn)) == "ok"
+    assert fn.calls == 3
+    assert p.stats["retries"] == 2
+
+
+def test_client_errors_are_not_retried():
+    p, fn = policy(max_retries=2), Flaky(failures=1, error=StatusError(400))
+    with pytest.raises(StatusError):
+        asyncio.run(p.call(fn))
+    assert fn.calls == 1
+    assert p.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_attempt_timeout_then_retry():
+    p = policy(timeout=0.05, max_retries=1)
+    calls = []
+
+    async def slow_then_fast():
+        calls.append(1)
+        await asyncio.sleep(1.0 if len(calls) == 1 else 0)
+        return "ok"
+
+    started = time.perf_counter()
+    assert asyncio.run(p.call(slow_then_fast)) == "ok"
+    assert time.perf_counter() - started < 0.5
+    assert p.stats["timeouts"] == 1
+
+
+def test_deadline_caps_retries():
+    p, fn = policy(timeout=5, max_retries=10, backoff_base=0.05), Flaky(failures=100, delay=0.02)
+
+    async def run():
+        with deadline(0.2):
+            await p.call(fn)
+
+    started = time.perf_counter()
+    with pytest.raises(Exception):
+        asyncio.run(run())
+    assert time.perf_counter() - started < 0.5
+    assert fn.calls < 11
+
+
+def test_deadline_already_spent():
+    async def run():
+        with deadline(0.001):
+            await asyncio.sleep(0.01)
+            await policy().call(Flaky(failures=0))
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    p = policy(max_retries=0, breaker=CircuitBreaker("test", failure_threshold=3, reset_seconds=0.1))
+    failing = Flaky(failures=100)
+    for _ in range(3):
+        with pytest.raises(StatusError):
+            asyncio.run(p.call(failing))
+    assert p.breaker.state == CircuitBreaker.OPEN
+
+    # Open: rejected without touching the upstream
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(p.call(failing))
+    assert failing.calls == 3
+    assert p.breaker.info()["rejected"] == 1
+
+    # After reset_seconds a trial call goes through and closes the breaker
+    time.sleep(0.15)
+    assert asyncio.run(p.call(Flaky(failures=0))) == "ok"
+    assert p.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_failure_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_hedged_request_wins_over_slow_primary():
+    p = policy(hedge=True, hedge_min_delay_ms=20)
+    for _ in range(ResiliencePolicy.HEDGE_MIN_SAMPLES):
+        p._record_latency(10.0)
+    calls = []
+
+    async def first_slow():
+        calls.append(1)
+        await asyncio.sleep(1.0 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    started = time.perf_counter()
+    assert asyncio.run(p.call(first_slow)) == 2
+    assert time.perf_counter() - started < 0.5
+    assert p.stats["hedged"] == 1 and p.stats["hedge_wins"] == 1
+
+    # hedge=False (streams) never duplicates
+    calls.clear()
+    assert asyncio.run(p.call(first_slow, hedge=False)) == 1
+
+
+def test_call_sync_retries_and_hedges():
+    p = policy(max_retries=1, hedge=True, hedge_min_delay_ms=20)
+    attempts = []
+
+    def embed(text):
+        attempts.append(text)
+        if len(attempts) == 1:
+            raise StatusError(502)
+        return [0.1, 0.2]
+
+    assert p.call_sync(embed, "hello") == [0.1, 0.2]
+    assert attempts == ["hello", "hello"]
+
+    for _ in range(ResiliencePolicy.HEDGE_MIN_SAMPLES):
+        p._record_latency(10.0)
+    attempts.clear()
+
+    def slow_first(text):
+        attempts.append(text)
+        time.sleep(0.5 if len(attempts) == 1 else 0)
+        return "fast"
+
+    started = time.perf_counter()
+    assert p.call_sync(slow_first, "q") == "fast"
+    assert time.perf_counter() - started < 0.4
+
+
+def test_policy_follows_settings_and_metrics_endpoint():
+    settings = AppSettings(llm_timeout_seconds=7, upstream_max_retries=4, breaker_failure_threshold=9)
+    with patch("backend.app.core.resilience.get_settings", return_value=settings):
+        p = get_policy("llm")
+    assert (p.timeout, p.max_retries, p.breaker.failure_threshold) == (7, 4, 9)
+
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+    breakers = TestClient(app).get("/api/metrics/breakers").json()
+    assert breakers["llm"]["breaker"]["state"] == "closed"
+
+
+def test_bulk_embedding_is_retried_per_batch():
+    batches = []
+
+    class Inner:
+        def embed_documents(self, texts):
+            batches.append(list(texts))
+            if len(batches) == 2:
+                raise StatusError(503)  # only this batch is sent again
+            return [[float(t)] for t in texts]
+
+    settings = AppSettings(embedding_batch_size=3, upstream_max_retries=1, upstream_retry_backoff_seconds=0.001,
+                           hedge_enabled=True)
+    with patch("backend.app.core.resilience.get_settings", return_value=settings), \
+         patch("backend.app.rag.store.get_settings", return_value=settings):
+        vectors = ResilientEmbeddings(Inner()).embed_documents([str(i) for i in range(7)])
+
+    assert vectors == [[float(i)] for i in range(7)]
+    assert batches == [["0", "1", "2"], ["3", "4", "5"], ["3", "4", "5"], ["6"]]
@@ -0,0 +1,114 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.tools import tool
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.models import Message
+from backend.app.agent.routing import ModelRouter, route_stats, TOOL_ROUTE, ANSWER_ROUTE
+from backend.tests.fake_openai_server import FakeOpenAIServer
+from backend.tests.fake_llm import parse_sse
+from backend.tests.temp_db import TempDatabase
+
+FAST = "fast-model"
+MAIN = "main-model"
+
+@tool
+def search_documents(query: str) -> str:
+    """Search the uploaded documents."""
+    return f"Content: notes about {query}\nSource: notes.md"
+
+def routing_responder(body):
+    has_tool_result = any(m["role"] == "tool" for m in body["messages"])
+    if body["model"] == FAST and not has_tool_result:
+        return {"tool_call": {"name": "search_documents", "arguments": {"query": "refund policy"}}}
+    if body["model"] == FAST:
+        return {"content": "fast draft"}
+    return {"content": "MAIN answer"}
+
+def test_router_escalation_rules():
+    settings = AppSettings(routing_enabled=True, routing_tool_model=FAST, routing_max_fast_turns=2,
+                           routing_escalate_prompt_tokens=100)
+    router = ModelRouter(settings, MAIN)
+    assert router.next_route(10) == (TOOL_ROUTE, FAST)
+    assert router.next_route(10) == (TOOL_ROUTE, FAST)
+    assert router.next_route(10) == (ANSWER_ROUTE, MAIN)
+    assert router.escalated == "max_fast_turns"
+
+    router = ModelRouter(settings, MAIN)
+    assert router.next_route(500) == (ANSWER_ROUTE, MAIN)
+    assert router.escalated == "prompt_too_long"
+
+    # Disabled, or the fast model is the main model: everything goes to the main model
+    assert not ModelRouter(AppSettings(routing_tool_model=FAST), MAIN).enabled
+    assert not ModelRouter(AppSettings(routing_enabled=True, routing_tool_model=MAIN), MAIN).enabled
+
+@pytest.fixture
+def client(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    with FakeOpenAIServer(routing_responder) as server:
+        settings = AppSettings(
+            openai_api_key="fake", openai_base_url=server.base_url, openai_model=MAIN,
+            routing_enabled=True, routing_tool_model=FAST,
+        )
+        with patch("backend.app.api.routers.chat.search_documents", search_documents), \
+             patch("backend.app.api.routers.chat.get_settings", return_value=settings), \
+             patch("backend.app.api.routers.chat.get_summarizer"), \
+             patch("backend.app.api.routers.chat.get_indexer"):
+            yield TestClient(app), server, db
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+def test_fast_model_picks_tools_main_model_answers(client):
+    c, server, db = client
+    before = route_stats.info()["routes"].get(f"{TOOL_ROUTE}:{FAST}", {}).get("calls", 0)
+
+    events = parse_sse(c.post("/api/chat/", json={"message": "What is the refund policy?"}).text)
+
+    # Fast model chose the search, then stopped calling tools; its draft was replaced by the main model's answer
+    assert server.models() == [FAST, FAST, MAIN]
+    assert [e["name"] for e in events if e["type"] == "tool_call"] == ["search_documents"]
+    assert [e["content"] for e in events if e["type"] == "answer"] == ["MAIN answer"]
+
+    stored = db.query(Message).filter(Message.role == "assistant").one()
+    assert stored.content == "MAIN answer"
+    assert stored.model == MAIN
+    assert stored.agent_iterations == 3
+    # Two of the three calls (30 prompt, 6 completion tokens each) were the fast model's
+    assert (stored.prompt_tokens, stored.completion_tokens) == (90, 18)
+    assert (stored.tool_model, stored.tool_prompt_tokens, stored.tool_completion_tokens, stored.tool_iterations) == (FAST, 60, 12, 2)
+    models = {m["model"]: m for m in c.get("/api/usage/models").json()}
+    assert (models[FAST]["prompt_tokens"], models[MAIN]["prompt_tokens"]) == (60, 30)
+
+    routes = c.get("/api/metrics/routing").json()["routes"]
+    assert routes[f"{TOOL_ROUTE}:{FAST}"]["calls"] == before + 2
+    assert routes[f"{ANSWER_ROUTE}:{MAIN}"]["calls"] >= 1
+
+def test_fast_model_failure_escalates(client):
+    c, server, _ = client
+    server.responder = lambda body: {"status": 400} if body["model"] == FAST else routing_responder(body)
+    before = route_stats.info()["escalations"].get("fast_model_error", 0)
+
+    events = parse_sse(c.post("/api/chat/", json={"message": "hello"}).text)
+
+    # One failed fast call, then the rest of the turn stays on the main model
+    assert server.models() == [FAST, MAIN]
+    assert [e["content"] for e in events if e["type"] == "answer"] == ["MAIN answer"]
+    assert route_stats.info()["escalations"]["fast_model_error"] == before + 1
+
+def test_unknown_tool_escalates(client):
+    c, server, _ = client
+    server.responder = lambda body: (
+        {"tool_call": {"name": "delete_everything", "arguments": {}}} if body["model"] == FAST else routing_responder(body)
+    )
+
+    events = parse_sse(c.post("/api/chat/", json={"message": "hello"}).text)
+
+    assert server.models() == [FAST, MAIN]
+    assert not [e for e in events if e["type"] == "tool_call"]
+    assert [e["content"] for e in events if e["type"] == "answer"] == ["MAIN answer"]
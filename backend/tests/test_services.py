@@ -0,0 +1,115 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings, ConfigManager
+from backend.app.api.deps import ServiceRegistry, get_services, reset_services, get_registry, reload_services
+
+
+class FakeStore:
+    built = []
+
+    def __init__(self, collection_name="documents"):
+        time.sleep(0.1)
+        self.collection_name = collection_name
+        FakeStore.built.append(collection_name)
+
+
+@pytest.fixture
+def registry():
+    FakeStore.built = []
+    registry = ServiceRegistry()
+    with patch("backend.app.api.deps.VectorStore", FakeStore), \
+         patch("backend.app.api.deps.LLMService", lambda: object()), \
+         patch("backend.app.api.deps._registry", registry):
+        yield registry
+
+
+def test_concurrent_first_use_builds_each_collection_once(registry):
+    results = []
+
+    def use(name):
+        results.append(get_services().get_vector_store(name))
+
+    threads = [threading.Thread(target=use, args=(name,)) for name in ["chats"] * 8 + ["memories"] * 4]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(FakeStore.built) == ["chats", "documents", "memories"]
+    assert len({id(s) for s in results if s.collection_name == "chats"}) == 1
+    # Every handle was released once its caller was done with it
+    assert registry.info()["active_handles"] == 0
+
+
+def test_swap_lets_inflight_requests_finish_on_old_services(registry):
+    handle = get_services()
+    old_store = handle.vector_store
+
+    reset_services()
+    new_store = get_services().vector_store
+    assert new_store is not old_store
+    # The pinned handle still sees its own generation
+    assert handle.vector_store is old_store
+    assert registry.info()["draining"] == [{"generation": 1, "handles": 1}]
+
+    del handle
+    info = registry.info()
+    assert info["draining"] == [] and info["drained"] == 1 and info["generation"] == 2
+
+
+def test_failed_init_is_recorded_and_retried(registry):
+    with patch("backend.app.api.deps.VectorStore", side_effect=RuntimeError("no chroma")):
+        with get_registry().acquire() as services:
+            assert services.get_vector_store("chats") is None
+            assert services.init_errors == {"chats": "no chroma"}
+    with get_registry().acquire() as services:
+        assert services.get_vector_store("chats").collection_name == "chats"
+        assert services.init_errors == {}
+
+
+def test_settings_diff_maps_fields_to_services():
+    old = AppSettings(openai_api_key="k1", openai_model="gpt-4o")
+    assert ConfigManager.diff(old, old.model_copy(update={"chunk_size": 500})) == {"fields": ["chunk_size"], "components": []}
+    assert ConfigManager.diff(old, old.model_copy(update={"openai_model": "gpt-4o-mini"}))["components"] == ["llm"]
+    # Embeddings fall back to the OpenAI key, so changing it affects both
+    assert ConfigManager.diff(old, old.model_copy(update={"openai_api_key": "k2"}))["components"] == ["embeddings", "llm"]
+    own_key = old.model_copy(update={"embedding_api_key": "e1"})
+    assert ConfigManager.diff(own_key, own_key.model_copy(update={"openai_api_key": "k2"}))["components"] == ["llm"]
+
+
+def test_reload_rebuilds_only_changed_components(registry):
+    services = get_services()
+    chats, llm = services.get_vector_store("chats"), services.llm_service
+
+    result = reload_services(["llm"])
+    assert result["reloaded"] == ["llm"]
+    assert result["kept"] == ["collection:chats", "collection:documents"]
+    fresh = get_services()
+    assert fresh.get_vector_store("chats") is chats and fresh.llm_service is not llm
+    # Requests already running keep the client they started with
+    assert services.llm_service is llm
+
+    built = len(FakeStore.built)
+    assert reload_services(["embeddings"])["reloaded"] == ["collection:chats", "collection:documents"]
+    assert len(FakeStore.built) == built + 2
+
+    # Nothing affected: no new generation
+    generation = registry.info()["generation"]
+    assert reload_services([])["reloaded"] == []
+    assert registry.info()["generation"] == generation
+
+
+def test_settings_endpoint_reports_reload(registry):
+    get_services()
+    changes = {"fields": ["chunk_size", "openai_model"], "components": ["llm"]}
+    with patch("backend.app.api.routers.settings.save_settings", return_value=changes):
+        body = TestClient(app).post("/api/settings", json=AppSettings().model_dump()).json()
+    assert body["changed"] == ["chunk_size", "openai_model"]
+    assert body["reloaded"] == ["llm"] and body["kept"] == ["collection:documents"]
+    assert body["seconds"] >= 0
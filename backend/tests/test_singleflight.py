@@ -0,0 +1,71 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.app.core.singleflight import SingleFlight
+from backend.app.rag.store import SingleFlightEmbeddings
+
+def test_concurrent_identical_calls_share_one_execution():
+    group = SingleFlight("test")
+    executions = []
+
+    def slow_search(query):
+        executions.append(query)
+        time.sleep(0.2)
+        return [query.upper()]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: group.do("q", slow_search, "hello"), range(8)))
+
+    assert executions == ["hello"]
+    assert all(r == ["HELLO"] for r in results)
+    assert group.stats == {"calls": 8, "executions": 1, "shared": 7}
+    assert group.info()["in_flight"] == 0
+
+    # Nothing is cached once the flight has landed
+    group.do("q", slow_search, "hello")
+    assert len(executions) == 2
+
+def test_errors_are_shared_and_keys_are_independent():
+    group = SingleFlight("test")
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(group.do, "a", failing)
+        started.wait()
+        follower = pool.submit(group.do, "a", failing)
+        other = pool.submit(group.do, "b", lambda: "ok")
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+        assert other.result() == "ok"
+
+    assert group.stats["executions"] == 2
+
+def test_embeddings_are_coalesced():
+    class SlowEmbeddings:
+        model = "fake-embed"
+        def __init__(self):
+            self.calls = 0
+        def embed_query(self, text):
+            self.calls += 1
+            time.sleep(0.2)
+            return [float(len(text))]
+        def embed_documents(self, texts):
+            return [self.embed_query(t) for t in texts]
+
+    inner = SlowEmbeddings()
+    embeddings = SingleFlightEmbeddings(inner)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        vectors = list(pool.map(embeddings.embed_query, ["same query"] * 4))
+
+    assert inner.calls == 1
+    assert vectors == [[10.0]] * 4
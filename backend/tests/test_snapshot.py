@@ -0,0 +1,187 @@
+import json
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.models import Chat, Document, MemoryFact, Message
+from backend.app.rag.snapshot import SnapshotConflict, SnapshotError, _NoEmbeddings, create_snapshot, restore_snapshot
+from backend.app.rag.store import VectorStore
+from backend.app.rag.versions import active_version, get_version, set_active
+from backend.tests.test_memory import BagOfWordsEmbeddings
+from backend.tests.temp_db import TempDatabase
+
+MODEL = "bag-of-words"
+TEXTS = [f"note {i} about topic{i}" for i in range(50)]
+
+
+def store_factory(chroma, embeddings):
+    def open_store(name, version, model):
+        return VectorStore(collection_name=name, persist_directory=chroma, embedding_function=embeddings(model),
+                           version=version, embedding_model=model)
+    return open_store
+
+
+def vectors(store):
+    found = {}
+    for ids, _, metadatas, embeddings in store.iter_chunks(embeddings=True):
+        found.update({i: (m, list(v)) for i, m, v in zip(ids, metadatas, embeddings)})
+    return found
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """A knowledge base with rows and chunks, written to a snapshot."""
+    (tmp_path / "source").mkdir()
+    database = TempDatabase(tmp_path / "source")
+    open_store = store_factory(str(tmp_path / "source" / "chroma"), lambda model: BagOfWordsEmbeddings())
+    with database.SessionLocal() as db:
+        db.add(Document(id="d1", name="notes.md", source="notes.md", type="file", chunk_count=len(TEXTS)))
+        db.add(Chat(id="c1", title="Topics"))
+        db.add(Message(chat_id="c1", role="user", content="what about topic7?", prompt_tokens=12))
+        db.add(MemoryFact(content="prefers short answers", source="user"))
+        db.commit()
+
+    path = str(tmp_path / "kb.snapshot")
+    with patch("backend.app.rag.versions.SessionLocal", database.SessionLocal):
+        active_version("documents", MODEL)
+        set_active("documents", 2, MODEL)  # as after a couple of re-embeds
+        documents = open_store("documents", 2, MODEL)
+        documents.add_chunks([f"c{i}" for i in range(len(TEXTS))], TEXTS, [{"doc_id": "d1", "n": i} for i in range(len(TEXTS))])
+        active_version("memories", MODEL)
+        memories = open_store("memories", 0, MODEL)
+        memories.add_chunks(["m1"], ["prefers short answers"], [{"fact_id": "m1"}])
+        report = create_snapshot(path, engine=database.engine, store_factory=open_store)
+        expected = {"documents": vectors(documents), "memories": vectors(memories)}
+    database.close()
+    return path, report, expected
+
+
+@pytest.fixture
+def target(tmp_path):
+    (tmp_path / "target").mkdir()
+    database = TempDatabase(tmp_path / "target")
+    chroma = str(tmp_path / "target" / "chroma")
+    with patch("backend.app.rag.versions.SessionLocal", database.SessionLocal), \
+         patch("backend.app.rag.versions.get_settings", return_value=AppSettings(config_poll_seconds=0)), \
+         patch("backend.app.rag.snapshot.rebuild_components") as rebuild:
+        yield database, chroma, rebuild
+    database.close()
+
+
+def test_restore_loads_rows_and_vectors_without_embedding(snapshot, target):
+    path, report, expected = snapshot
+    database, chroma, rebuild = target
+    assert report["rows"] == 6 and report["chunks"] == 51
+
+    # Restoring embeds nothing: these embeddings raise if called
+    restored = restore_snapshot(path, engine=database.engine, store_factory=store_factory(chroma, _NoEmbeddings))
+
+    assert restored["chunks"] == {"documents": 50, "chats": 0, "memories": 1}
+    assert restored["rows"]["documents"] == 1 and restored["rows"]["messages"] == 1
+    assert restored["chunks_per_second"] > 0 and restored["rows_per_second"] > 0
+    rebuild.assert_called_once()
+    with database.SessionLocal() as db:
+        assert db.get(Document, "d1").chunk_count == 50
+        message = db.query(Message).one()
+        assert (message.content, message.prompt_tokens, message.chat_id) == ("what about topic7?", 12, "c1")
+        assert message.created_at is not None
+        assert db.query(MemoryFact).one().source == "user"
+
+    assert get_version("documents") == (2, MODEL)
+    open_store = store_factory(chroma, lambda model: BagOfWordsEmbeddings())
+    documents = open_store("documents", 2, MODEL)
+    assert vectors(documents) == expected["documents"]
+    assert vectors(open_store("memories", 0, MODEL)) == expected["memories"]
+    # Equidistant test chunks can leave some unreachable in the HNSW graph, so no exact nearest is asserted
+    assert documents.similarity_search("topic7", k=1)[0].metadata["doc_id"] == "d1"
+
+
+def test_restore_refuses_to_overwrite_unless_asked(snapshot, target):
+    path, _, _ = snapshot
+    database, chroma, _ = target
+    open_store = store_factory(chroma, _NoEmbeddings)
+    restore_snapshot(path, engine=database.engine, store_factory=open_store)
+
+    with pytest.raises(SnapshotConflict):
+        restore_snapshot(path, engine=database.engine, store_factory=open_store)
+
+    # Replaced, not appended to, in a version no one was serving
+    restored = restore_snapshot(path, engine=database.engine, store_factory=open_store, replace=True)
+    assert restored["chunks"]["documents"] == 50
+    assert get_version("documents") == (3, MODEL)
+    assert open_store("documents", 3, MODEL).count() == 50
+    # The version it replaced is dropped once no worker can be serving it
+    names = {c.name for c in open_store("documents", 3, MODEL).db._client.list_collections()}
+    assert "documents__v2" not in names and "memories" not in names
+    with database.SessionLocal() as db:
+        assert db.query(Message).count() == 1
+
+
+def test_restore_refuses_vectors_without_rows(snapshot, target):
+    path, _, _ = snapshot
+    database, chroma, _ = target
+    open_store = store_factory(chroma, _NoEmbeddings)
+    # Chunks left by an instance whose database was reset
+    active_version("memories", MODEL)
+    store_factory(chroma, lambda model: BagOfWordsEmbeddings())("memories", 0, MODEL).add_chunks(
+        ["m9"], ["left behind"], [{"fact_id": "m9"}])
+
+    with pytest.raises(SnapshotConflict, match="memories"):
+        restore_snapshot(path, engine=database.engine, store_factory=open_store)
+    assert get_version("documents") is None
+    assert open_store("memories", 0, MODEL).count() == 1
+
+
+def test_restore_rejects_unknown_archives(tmp_path, target):
+    database, chroma, _ = target
+    newer = tmp_path / "newer.snapshot"
+    with zipfile.ZipFile(newer, "w") as archive:
+        archive.writestr("manifest.json", json.dumps({"format": "info-get-snapshot", "version": 99}))
+    with pytest.raises(SnapshotError, match="newer"):
+        restore_snapshot(str(newer), engine=database.engine, store_factory=store_factory(chroma, _NoEmbeddings))
+
+    response = TestClient(app).post("/api/snapshot/restore", files={"file": ("kb.snapshot", b"not a zip")})
+    assert response.status_code == 400
+
+
+def damage(path, out, entry, change):
+    """A copy of the archive at `path` with `change` applied to one entry's bytes."""
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(out, "w") as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            target.writestr(item.filename, change(data) if item.filename == entry else data)
+    return str(out)
+
+
+@pytest.mark.parametrize("entry, change, error", [
+    # Rejected from the manifest before anything is touched
+    ("collections/documents/embeddings.f32", lambda data: data[:-4], "expected"),
+    # Found while loading the vectors, after a few went into the new version
+    ("collections/documents/chunks.jsonl", lambda data: data[:data.index(b"\n") + 1], "manifest says"),
+    # Found while loading the rows, after every vector was loaded
+    ("tables/messages.jsonl", lambda data: data + b"not json\n", None),
+])
+def test_failed_restore_leaves_the_data_as_it_was(snapshot, target, tmp_path, entry, change, error):
+    path, _, _ = snapshot
+    database, chroma, rebuild = target
+    open_store = store_factory(chroma, _NoEmbeddings)
+    restore_snapshot(path, engine=database.engine, store_factory=open_store)
+    with database.SessionLocal() as db:
+        db.query(Message).one().content = "edited since"
+        db.commit()
+
+    damaged = damage(path, tmp_path / "damaged.snapshot", entry, change)
+    with pytest.raises(Exception, match=error):
+        restore_snapshot(damaged, engine=database.engine, store_factory=open_store, replace=True)
+
+    assert get_version("documents") == (2, MODEL)
+    assert open_store("documents", 2, MODEL).count() == 50
+    names = {c.name for c in open_store("documents", 2, MODEL).db._client.list_collections()}
+    assert "documents__v3" not in names and "memories__v1" not in names
+    with database.SessionLocal() as db:
+        assert db.query(Message).one().content == "edited since"
+    rebuild.assert_called_once()  # by the first restore only
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from backend.app.api.warmup import LAZY_MODULES
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Generous against the ~1.5s measured, so only a heavy import sneaking back in trips them
+IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET", "3.0"))
+FIRST_RESPONSE_BUDGET_SECONDS = float(os.getenv("STARTUP_FIRST_RESPONSE_BUDGET", "1.0"))
+
+HEAVY_MODULES = ("langchain_chroma", "chromadb", "openai", "tiktoken") + LAZY_MODULES
+
+BENCHMARK = """
+import json, os, sys, time
+started = time.perf_counter()
+from backend.app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(app)
+request_started = time.perf_counter()
+status = client.get("/").status_code
+print(json.dumps({
+    "import_seconds": imported - started,
+    "first_response_seconds": time.perf_counter() - request_started,
+    "status": status,
+    "loaded": [m for m in %r if m in sys.modules],
+    "database_created": os.path.exists("info_get.db"),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_benchmark(cwd):
+    # A fresh interpreter: this process has imported everything already
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    result = subprocess.run([sys.executable, "-c", BENCHMARK], cwd=cwd, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_and_first_response_stay_fast(tmp_path):
+    report = run_benchmark(tmp_path)
+    print(f"\nstartup: import {report['import_seconds']:.3f}s, first response {report['first_response_seconds']:.3f}s")
+
+    assert report["status"] == 200
+    # Heavy dependencies load on first use or during warmup, never at import
+    assert report["loaded"] == []
+    # Tables are created by the lifespan, not by importing the app
+    assert not report["database_created"]
+    assert report["import_seconds"] < IMPORT_BUDGET_SECONDS
+    assert report["first_response_seconds"] < FIRST_RESPONSE_BUDGET_SECONDS
@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.core.database import Base
+from backend.app.core.config import AppSettings
+from backend.app.models import Chat, Message
+from backend.app.chat.summarizer import ConversationSummarizer
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class FakeLLMService:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_response(self, prompt, system_prompt=None):
+        self.calls.append(prompt)
+        await asyncio.sleep(0.01)
+        return f"summary #{len(self.calls)}"
+
+@pytest.fixture
+def env():
+    Base.metadata.create_all(bind=engine)
+    settings = AppSettings(context_recent_messages=4, summary_min_batch=2, summary_debounce_seconds=0.05)
+    llm = FakeLLMService()
+    services = MagicMock(llm_service=llm)
+    with patch("backend.app.chat.summarizer.SessionLocal", TestingSessionLocal), \
+         patch("backend.app.chat.summarizer.get_settings", return_value=settings), \
+         patch("backend.app.chat.summarizer.get_services", return_value=services):
+        yield llm
+    Base.metadata.drop_all(bind=engine)
+
+def add_chat(n_messages):
+    db = TestingSessionLocal()
+    chat = Chat(title="t")
+    db.add(chat)
+    db.commit()
+    start = datetime.now(timezone.utc)
+    for i in range(n_messages):
+        db.add(Message(chat_id=chat.id, role="user" if i % 2 == 0 else "assistant",
+                       content=f"message {i}", created_at=start + timedelta(seconds=i)))
+    db.commit()
+    chat_id = chat.id
+    db.close()
+    return chat_id
+
+def test_folds_only_older_unsummarized_messages(env):
+    chat_id = add_chat(10)
+    summarizer = ConversationSummarizer()
+
+    folded = asyncio.run(summarizer.summarize(chat_id))
+    assert folded == 6
+    assert "message 5" in env.calls[0]
+    assert "message 6" not in env.calls[0]
+
+    db = TestingSessionLocal()
+    chat = db.query(Chat).filter(Chat.id == chat_id).first()
+    assert chat.summary == "summary #1"
+    flags = [m.is_summarized for m in db.query(Message).order_by(Message.created_at).all()]
+    assert flags == [True] * 6 + [False] * 4
+    db.close()
+
+    # Nothing new to fold: no LLM call
+    assert asyncio.run(summarizer.summarize(chat_id)) == 0
+    assert len(env.calls) == 1
+
+def test_burst_of_turns_is_coalesced(env):
+    chat_id = add_chat(10)
+    summarizer = ConversationSummarizer()
+
+    async def burst():
+        for _ in range(5):
+            summarizer.schedule(chat_id)
+        await summarizer.wait_idle()
+
+    asyncio.run(burst())
+    assert summarizer.stats["coalesced"] == 4
+    # One pass folds everything; the coalesced follow-up finds nothing left to fold
+    assert len(env.calls) == 1
+    assert summarizer.stats["runs"] == 1
@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.app.core.tracing import Trace, TraceBuffer, trace_span, set_current_trace
+from backend.app.models import Message
+from backend.tests.fake_llm import FakeToolModel, parse_sse
+from backend.tests.temp_db import TempDatabase
+
+class FakeSearch:
+    name = "search_documents"
+
+    def invoke(self, args):
+        # Nested spans from deeper layers attach to the request's trace
+        with trace_span("vector_search", collection="documents"):
+            return "Content: found it\nSource: a.md"
+
+def test_trace_buffer_is_bounded():
+    buffer = TraceBuffer(max_traces=3)
+    traces = [Trace("chat") for _ in range(5)]
+    for t in traces:
+        t.finish()
+        buffer.add(t)
+    listed = buffer.list()
+    assert [t["trace_id"] for t in listed] == [t.id for t in reversed(traces[-3:])]
+    assert buffer.get(traces[0].id) is None
+
+def test_span_records_errors():
+    trace = Trace("x")
+    with pytest.raises(ValueError):
+        with trace.span("boom"):
+            raise ValueError("bad")
+    assert trace.to_dict()["spans"][0]["error"] == "ValueError: bad"
+
+    # No current trace: helper is a no-op
+    set_current_trace(None)
+    with trace_span("nothing") as span:
+        assert span is None
+
+@pytest.fixture
+def client(tmp_path):
+    database = TempDatabase(tmp_path)
+    db = database.SessionLocal()
+    database.override(app, db)
+    settings = AppSettings(openai_api_key="fake")
+    with patch("backend.app.api.routers.chat.ChatOpenAI", lambda **kw: FakeToolModel(calls=[])), \
+         patch("backend.app.api.routers.chat.search_documents", FakeSearch()), \
+         patch("backend.app.api.routers.chat.get_settings", return_value=settings), \
+         patch("backend.app.api.routers.chat.get_summarizer"), \
+         patch("backend.app.api.routers.chat.get_indexer"):
+        yield TestClient(app), db
+    app.dependency_overrides.clear()
+    db.close()
+    database.close()
+
+def test_chat_emits_timing_and_stores_trace(client):
+    client, db = client
+    events = parse_sse(client.post("/api/chat/", json={"message": "hi", "include_timing": True}).text)
+    timing = next(e for e in events if e["type"] == "timing")
+
+    names = [s["name"] for s in timing["spans"]]
+    assert names == ["chat_session", "context_query", "memory_lookup", "context_build", "llm", "tool", "vector_search", "llm", "db_commit"]
+    llm_span = timing["spans"][4]
+    assert llm_span["ttft_ms"] >= 0
+    assert llm_span["prompt_tokens"] == 40 and llm_span["completion_tokens"] == 5
+    assert timing["spans"][5]["tool"] == "search_documents"
+
+    stored = client.get(f"/api/metrics/traces/{timing['trace_id']}").json()
+    assert [s["name"] for s in stored["spans"]] == names
+    assert stored["duration_ms"] >= timing["duration_ms"]
+
+    # Timing event is opt-in, the trace is recorded either way
+    events = parse_sse(client.post("/api/chat/", json={"message": "hi"}).text)
+    assert not any(e["type"] == "timing" for e in events)
+    assert len(client.get("/api/metrics/traces", params={"name": "chat"}).json()) >= 2
+
+def test_turn_accounting_is_persisted(client):
+    client, db = client
+    client.post("/api/chat/", json={"message": "hi"})
+    reply = db.query(Message).filter(Message.role == "assistant").one()
+    assert reply.model == "gpt-3.5-turbo"
+    assert (reply.prompt_tokens, reply.completion_tokens) == (90, 13)
+    assert reply.agent_iterations == 2
+    assert reply.tool_calls == 1
+    assert reply.latency_ms > 0
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.main import app
+from backend.app.core.database import Base, get_db
+from backend.app.models import Message
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    now = datetime.now(timezone.utc).replace(hour=12)
+    yesterday = now - timedelta(days=1)
+    rows = []
+    # 20 turns today on gpt-4o with latencies 100..2000ms, 2 cheap turns yesterday on gpt-4o-mini
+    for i in range(20):
+        rows.append(Message(chat_id="chat-a", role="assistant", content="a", created_at=now, model="gpt-4o",
+                            prompt_tokens=100, completion_tokens=10, agent_iterations=2, tool_calls=1,
+                            latency_ms=100.0 * (i + 1)))
+    for i in range(2):
+        rows.append(Message(chat_id="chat-b", role="assistant", content="b", created_at=yesterday, model="gpt-4o-mini",
+                            prompt_tokens=10, completion_tokens=1, agent_iterations=1, tool_calls=0, latency_ms=50.0))
+    # A routed turn: 60 of its 100 prompt tokens went to the tool-selection model
+    rows.append(Message(chat_id="chat-c", role="assistant", content="c", created_at=yesterday, model="gpt-4o-mini",
+                        prompt_tokens=100, completion_tokens=10, agent_iterations=3, tool_calls=1, latency_ms=900.0,
+                        tool_model="tool-model", tool_prompt_tokens=60, tool_completion_tokens=4, tool_iterations=2,
+                        tool_latency_ms=300.0))
+    # User messages carry no accounting and are ignored
+    rows.append(Message(chat_id="chat-a", role="user", content="q", created_at=now))
+    db.add_all(rows)
+    db.commit()
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app), now.date().isoformat(), yesterday.date().isoformat()
+    app.dependency_overrides.clear()
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+def test_daily_rollup(client):
+    c, today, yesterday = client
+    days = c.get("/api/usage/daily").json()
+    assert [d["day"] for d in days] == [yesterday, today]
+
+    today_row = days[1]
+    assert today_row["turns"] == 20
+    assert today_row["prompt_tokens"] == 2000
+    assert today_row["total_tokens"] == 2200
+    assert today_row["tool_calls"] == 20
+    assert today_row["avg_iterations"] == 2
+    assert today_row["avg_latency_ms"] == pytest.approx(1050.0)
+    # Nearest rank: ceil(0.95 * 20) = 19th value
+    assert today_row["p95_latency_ms"] == 1900.0
+
+    per_model = c.get("/api/usage/daily", params={"per_model": True, "model": "gpt-4o-mini"}).json()
+    assert len(per_model) == 1
+    assert (per_model[0]["day"], per_model[0]["model"], per_model[0]["turns"]) == (yesterday, "gpt-4o-mini", 3)
+    # Per day, a routed turn counts once with both models' tokens
+    assert days[0]["turns"] == 3 and days[0]["prompt_tokens"] == 120
+
+def test_model_and_chat_rollups(client):
+    c, _, _ = client
+    models = {m["model"]: m for m in c.get("/api/usage/models").json()}
+    assert models["gpt-4o"]["turns"] == 20
+    assert models["gpt-4o-mini"]["p95_latency_ms"] == 600.0
+    # The tool-selection model's share of the routed turn is its own, not the main model's
+    assert (models["gpt-4o-mini"]["prompt_tokens"], models["gpt-4o-mini"]["completion_tokens"]) == (60, 8)
+    tool = models["tool-model"]
+    assert (tool["turns"], tool["prompt_tokens"], tool["completion_tokens"], tool["avg_iterations"]) == (1, 60, 4, 2)
+    assert tool["avg_latency_ms"] == 300.0
+
+    chats = c.get("/api/usage/chats", params={"limit": 1}).json()
+    assert len(chats) == 1
+    assert chats[0]["chat_id"] == "chat-a"
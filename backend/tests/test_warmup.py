@@ -0,0 +1,85 @@
+import time
+from unittest.mock import patch, MagicMock
+
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.core.config import AppSettings
+from backend.tests.temp_db import TempDatabase
+
+
+class SlowContainer:
+    """Each component takes `delay` seconds to build; `broken` collections fail."""
+
+    def __init__(self, delay=0.2, broken=()):
+        self.delay = delay
+        self.broken = set(broken)
+        self.init_errors = {}
+
+    def get_vector_store(self, name):
+        time.sleep(self.delay)
+        if name in self.broken:
+            self.init_errors[name] = "chroma unavailable"
+            return None
+        return MagicMock(count=MagicMock(return_value=3))
+
+    def get_llm_service(self):
+        time.sleep(self.delay)
+        return MagicMock(model="fake-model")
+
+
+def wait_until_finished(client, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get("/ready")
+        if response.json()["finished_at"]:
+            return response
+        time.sleep(0.02)
+    raise AssertionError("warmup did not finish")
+
+
+def run_app(container, **settings):
+    return patch("backend.app.api.warmup.get_container", return_value=container), \
+        patch("backend.app.api.warmup.get_settings", return_value=AppSettings(**settings))
+
+
+def test_lifespan_warms_components_in_parallel(tmp_path):
+    database = TempDatabase(tmp_path)
+    container_patch, settings_patch = run_app(SlowContainer(), warmup_collections=["documents", "chats", "memories"])
+    with database.app_globals(), container_patch, settings_patch, TestClient(app) as client:
+        started = time.perf_counter()
+        # The app serves requests while warming up
+        assert client.get("/").status_code == 200
+        response = wait_until_finished(client)
+        elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["status"] == "ready"
+    components = report["components"]
+    assert set(components) == {"database", "imports", "llm", "collection:documents", "collection:chats", "collection:memories", "embeddings"}
+    assert components["collection:chats"]["chunks"] == 3
+    assert components["llm"]["model"] == "fake-model"
+    assert components["collection:documents"]["seconds"] >= 0.2
+    assert components["embeddings"]["state"] == "skipped"
+    assert components["imports"]["modules"] == ["langchain_openai", "langchain_text_splitters", "pypdf", "bs4"]
+    # Four 0.2s builds run side by side
+    assert elapsed < 0.6
+    database.close()
+
+
+def test_failed_component_is_reported(tmp_path):
+    database = TempDatabase(tmp_path)
+    container_patch, settings_patch = run_app(SlowContainer(delay=0, broken={"memories"}),
+                                              warmup_collections=["documents", "memories"])
+    with database.app_globals(), container_patch, settings_patch, TestClient(app) as client:
+        response = wait_until_finished(client)
+
+    assert response.status_code == 503
+    report = response.json()
+    assert report["status"] == "degraded"
+    assert report["components"]["collection:memories"] == {
+        "state": "failed", "seconds": report["components"]["collection:memories"]["seconds"], "error": "chroma unavailable",
+    }
+    assert report["components"]["collection:documents"]["state"] == "ready"
+    database.close()
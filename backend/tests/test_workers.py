@@ -0,0 +1,147 @@
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from backend.app.core import config
+from backend.app.core.config import AppSettings, ConfigManager
+from backend.app.core.leader import Leader
+from backend.app.api import deps
+from backend.app.chat.memory import MemoryStore
+from backend.app.models import MemoryFact
+from backend.app.rag.store import VectorStore
+from backend.tests.test_memory import BagOfWordsEmbeddings
+from backend.tests.temp_db import TempDatabase
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(AppSettings(config_poll_seconds=0.01).model_dump_json())
+    with patch("backend.app.core.config.CONFIG_FILE", str(path)), \
+         patch("backend.app.core.config._listeners", []):
+        yield path
+
+
+def test_config_saved_by_one_worker_reaches_the_others(config_file):
+    # Two managers on one file stand in for two worker processes
+    saver, watcher = ConfigManager(), ConfigManager()
+    changes = []
+    config.on_config_change(changes.append)
+
+    new = saver.get_settings().model_copy(update={"openai_model": "gpt-4o-mini", "chunk_size": 500})
+    saver.save_config(new)
+    assert not list(config_file.parent.glob(".config-*"))  # temp file renamed into place
+
+    time.sleep(0.02)
+    settings = watcher.get_settings()
+    assert (settings.openai_model, settings.chunk_size) == ("gpt-4o-mini", 500)
+    assert changes == [{"fields": ["chunk_size", "openai_model"], "components": ["llm"]}]
+
+    # The writer doesn't notify itself, and an unchanged file isn't re-read
+    time.sleep(0.02)
+    saver.get_settings()
+    watcher.get_settings()
+    assert len(changes) == 1
+
+
+def test_broken_config_file_keeps_the_current_settings(config_file):
+    config_file.write_text(AppSettings(config_poll_seconds=0.01, openai_api_key="sk-test").model_dump_json())
+    manager = ConfigManager()
+    changes = []
+    config.on_config_change(changes.append)
+
+    for broken in ('{"openai_api_key": "sk-test", "chunk_size": ', '{"chunk_size": "lots"}'):
+        config_file.write_text(broken)
+        time.sleep(0.02)
+        assert manager.get_settings().openai_api_key == "sk-test"
+    assert changes == []
+
+    # Fixed by the next write
+    config_file.write_text(AppSettings(config_poll_seconds=0.01, openai_api_key="sk-test", chunk_size=500).model_dump_json())
+    time.sleep(0.02)
+    assert manager.get_settings().chunk_size == 500
+    assert changes == [{"fields": ["chunk_size"], "components": []}]
+
+
+def test_config_change_rebuilds_services_in_the_background():
+    with patch("backend.app.api.deps.reload_services") as reload:
+        deps._reload_on_config_change({"fields": ["chunk_size"], "components": []})
+        deps._reload_on_config_change({"fields": ["vector_store_host"], "components": ["vector_store"]})
+        deadline = time.monotonic() + 2.0
+        while not reload.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+    reload.assert_called_once_with(["vector_store"])
+    # Moving to another vector server rebuilds the collections only
+    assert deps._is_stale("collection:documents", ["vector_store"])
+    assert not deps._is_stale(deps.LLM_COMPONENT, ["vector_store"])
+
+
+def test_background_jobs_run_in_one_worker_at_a_time(tmp_path):
+    database = TempDatabase(tmp_path)
+    events = []
+
+    def worker(name):
+        return Leader("background-jobs", database.engine,
+                      lambda: events.append(f"{name} started"), lambda: events.append(f"{name} stopped"))
+
+    try:
+        with patch("backend.app.core.leader.get_settings", return_value=AppSettings(leader_lease_seconds=0.3)):
+            first, second, third = worker("first"), worker("second"), worker("third")
+            first.start()
+            second.start()
+            assert (first.is_leader, second.is_leader) == (True, False)
+            time.sleep(0.5)  # renewed meanwhile
+            assert events == ["first started"] and not second.try_acquire()
+
+            # Shut down: the lease is released and taken by the next try
+            first.stop()
+            deadline = time.monotonic() + 2.0
+            while not second.is_leader and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert events == ["first started", "first stopped", "second started"]
+
+            # Crashed without releasing: taken over once the lease expires
+            second._stop.set()
+            assert not third.try_acquire()
+            time.sleep(0.35)
+            assert third.try_acquire()
+            second._stop.clear()
+            second._check()
+            assert events[-1] == "second stopped"
+    finally:
+        for leader in (first, second, third):
+            leader._stop.set()
+        database.close()
+
+
+def test_vector_store_uses_the_shared_server_when_configured(tmp_path):
+    settings = AppSettings(vector_store_host="vectors.internal", vector_store_port=9000)
+    with patch("backend.app.rag.store.get_settings", return_value=settings), \
+         patch("langchain_chroma.Chroma") as chroma:
+        remote = VectorStore(collection_name="chats", embedding_function=BagOfWordsEmbeddings())
+        local = VectorStore(collection_name="chats", persist_directory=str(tmp_path),
+                            embedding_function=BagOfWordsEmbeddings())
+
+    server_kwargs, local_kwargs = chroma.call_args_list[0].kwargs, chroma.call_args_list[1].kwargs
+    assert (server_kwargs["host"], server_kwargs["port"]) == ("vectors.internal", 9000)
+    assert "persist_directory" not in server_kwargs and remote.persist_directory is None
+    # An explicit directory stays embedded, as in tests and single-process runs
+    assert local_kwargs["persist_directory"] == str(tmp_path) and "host" not in local_kwargs
+    assert local.persist_directory == str(tmp_path)
+
+
+def test_multi_worker_rereads_memory_facts(tmp_path):
+    database = TempDatabase(tmp_path)
+    memory = MemoryStore(database.SessionLocal)
+    try:
+        with patch("backend.app.chat.memory.get_settings", return_value=AppSettings(multi_worker=True)), \
+             patch("backend.app.chat.memory.get_services", return_value=MagicMock(get_vector_store=lambda name: None)):
+            assert memory.relevant("tea") == []
+            # Written by another worker
+            with database.SessionLocal() as db:
+                db.add(MemoryFact(content="likes green tea", source="agent"))
+                db.commit()
+            assert memory.relevant("tea") == ["likes green tea"]
+    finally:
+        database.close()
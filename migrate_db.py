@@ -3,6 +3,47 @@ import os
 
 DB_PATH = "info_get.db"
 
+# (table, column, column definition) added to databases created by older versions
+COLUMN_MIGRATIONS = [
+    ("messages", "thought_steps", "TEXT"),
+    ("messages", "is_indexed", "BOOLEAN DEFAULT 0"),
+    ("messages", "model", "VARCHAR"),
+    ("messages", "prompt_tokens", "INTEGER"),
+    ("messages", "completion_tokens", "INTEGER"),
+    ("messages", "agent_iterations", "INTEGER"),
+    ("messages", "tool_calls", "INTEGER"),
+    ("messages", "latency_ms", "FLOAT"),
+    ("messages", "tool_model", "VARCHAR"),
+    ("messages", "tool_prompt_tokens", "INTEGER"),
+    ("messages", "tool_completion_tokens", "INTEGER"),
+    ("messages", "tool_iterations", "INTEGER"),
+    ("messages", "tool_latency_ms", "FLOAT"),
+    ("documents", "status", "VARCHAR DEFAULT 'active'"),
+    ("documents", "byte_size", "INTEGER DEFAULT 0"),
+    ("documents", "char_count", "INTEGER DEFAULT 0"),
+    ("documents", "chunk_count", "INTEGER DEFAULT 0"),
+    ("documents", "embedding_model", "VARCHAR"),
+    ("documents", "ingest_ms", "FLOAT"),
+    ("collection_versions", "shadow_version", "INTEGER"),
+    ("collection_versions", "deleted_chunks", "INTEGER DEFAULT 0"),
+]
+
+INDEX_MIGRATIONS = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_is_indexed ON messages (is_indexed)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_created_at ON messages (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_model ON messages (model)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_tool_model ON messages (tool_model)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_chat_id_created_at_id ON messages (chat_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_chats_updated_at_id ON chats (updated_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_status ON documents (status)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_type ON documents (type)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_created_at_id ON documents (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_name_id ON documents (name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_embedding_model ON documents (embedding_model)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_byte_size_id ON documents (byte_size, id)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_chunk_count_id ON documents (chunk_count, id)",
+]
+
 def migrate_db():
     if not os.path.exists(DB_PATH):
         print("Database not found, nothing to migrate.")
@@ -10,20 +51,28 @@ def migrate_db():
 
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    
+
     try:
-        print("Checking if 'thought_steps' column exists in 'messages' table...")
-        cursor.execute("PRAGMA table_info(messages)")
-        columns = [info[1] for info in cursor.fetchall()]
-        
-        if "thought_steps" not in columns:
-            print("Adding 'thought_steps' column...")
-            cursor.execute("ALTER TABLE messages ADD COLUMN thought_steps TEXT")
-            conn.commit()
-            print("Migration successful.")
-        else:
-            print("'thought_steps' column already exists.")
-            
+        for table, column, definition in COLUMN_MIGRATIONS:
+            print(f"Checking if '{column}' column exists in '{table}' table...")
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [info[1] for info in cursor.fetchall()]
+
+            if not columns:
+                # Created with every column when the app starts
+                print(f"'{table}' table does not exist yet.")
+            elif column not in columns:
+                print(f"Adding '{column}' column...")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            else:
+                print(f"'{column}' column already exists.")
+
+        for statement in INDEX_MIGRATIONS:
+            cursor.execute(statement)
+
+        conn.commit()
+        print("Migration successful.")
+
     except Exception as e:
         print(f"Migration failed: {e}")
     finally: